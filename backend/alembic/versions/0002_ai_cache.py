@@ -0,0 +1,37 @@
+"""ai cache table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ai_cache_entries",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("profile_a_hash", sa.String(64), nullable=False),
+        sa.Column("profile_b_hash", sa.String(64), nullable=False),
+        sa.Column("result", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_ai_cache_entries_profile_a_hash", "ai_cache_entries", ["profile_a_hash"])
+    op.create_index("ix_ai_cache_entries_profile_b_hash", "ai_cache_entries", ["profile_b_hash"])
+    op.create_index("ix_ai_cache_entries_last_used_at", "ai_cache_entries", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_cache_entries_last_used_at", table_name="ai_cache_entries")
+    op.drop_index("ix_ai_cache_entries_profile_b_hash", table_name="ai_cache_entries")
+    op.drop_index("ix_ai_cache_entries_profile_a_hash", table_name="ai_cache_entries")
+    op.drop_table("ai_cache_entries")
@@ -0,0 +1,63 @@
+"""matching indexes and canonical match pair key
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("matches", sa.Column("pair_key", sa.String(73)))
+    op.execute(
+        "UPDATE matches SET pair_key = LEAST(user_a_id, user_b_id) || ':' || GREATEST(user_a_id, user_b_id)"
+    )
+    # Collapse duplicate pairs, keeping an answered match over a pending one,
+    # then the oldest
+    op.execute(
+        """
+        DELETE FROM matches
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, ROW_NUMBER() OVER (
+                    PARTITION BY pair_key
+                    ORDER BY (status = 'pending'), created_at, id
+                ) AS rn
+                FROM matches
+            ) ranked
+            WHERE rn > 1
+        )
+        """
+    )
+    op.alter_column("matches", "pair_key", nullable=False)
+    op.create_unique_constraint("uq_matches_pair_key", "matches", ["pair_key"])
+
+    op.create_index(
+        "ix_matches_user_a_status_score", "matches", ["user_a_id", "status", "compatibility_score"]
+    )
+    op.create_index(
+        "ix_matches_user_b_status_score", "matches", ["user_b_id", "status", "compatibility_score"]
+    )
+    op.create_index("ix_availabilities_user_id", "availabilities", ["user_id"])
+    op.create_index(
+        "ix_profiles_sport_city_skill",
+        "profiles",
+        [sa.text("lower(sport)"), sa.text("lower(city)"), "skill_level"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_profiles_sport_city_skill", table_name="profiles")
+    op.drop_index("ix_availabilities_user_id", table_name="availabilities")
+    op.drop_index("ix_matches_user_b_status_score", table_name="matches")
+    op.drop_index("ix_matches_user_a_status_score", table_name="matches")
+    op.drop_constraint("uq_matches_pair_key", "matches", type_="unique")
+    op.drop_column("matches", "pair_key")
@@ -0,0 +1,30 @@
+"""rule score and refinement state on matches
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("matches", sa.Column("rule_score", sa.Float()))
+    # Every match created before two-stage ranking went through AI refinement
+    op.add_column(
+        "matches",
+        sa.Column("ai_refined", sa.Boolean(), nullable=False, server_default=sa.true()),
+    )
+    op.alter_column("matches", "ai_refined", server_default=sa.false())
+
+
+def downgrade() -> None:
+    op.drop_column("matches", "ai_refined")
+    op.drop_column("matches", "rule_score")
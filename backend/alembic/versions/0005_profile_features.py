@@ -0,0 +1,38 @@
+"""profile features table
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows are rebuilt on every profile or availability write. Existing
+    # profiles are backfilled by `python -m app.batch.rebuild_features`,
+    # which must be run once after upgrading.
+    op.create_table(
+        "profile_features",
+        sa.Column("user_id", sa.String(36), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("sport_key", sa.String(100), nullable=False),
+        sa.Column("city_key", sa.String(100), nullable=False, server_default=""),
+        sa.Column("skill_level", sa.Integer(), nullable=False),
+        sa.Column("weight", sa.Float()),
+        sa.Column("experience_years", sa.Integer()),
+        sa.Column("goal_tokens", sa.LargeBinary(), nullable=False),
+        sa.Column("schedule", sa.LargeBinary(), nullable=False),
+        sa.Column("schedule_minutes", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("profile_features")
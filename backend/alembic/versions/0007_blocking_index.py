@@ -0,0 +1,34 @@
+"""blocking indexes on profile features
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_profile_features_blocking", "profile_features", ["sport_key", "city_key", "skill_level"]
+    )
+    op.create_index("ix_profile_features_sport_skill", "profile_features", ["sport_key", "skill_level"])
+    # Candidates are now looked up on profile_features only
+    op.drop_index("ix_profiles_sport_city_skill", table_name="profiles")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_profiles_sport_city_skill",
+        "profiles",
+        [sa.text("lower(sport)"), sa.text("lower(city)"), "skill_level"],
+    )
+    op.drop_index("ix_profile_features_sport_skill", table_name="profile_features")
+    op.drop_index("ix_profile_features_blocking", table_name="profile_features")
@@ -0,0 +1,41 @@
+"""keyset pagination indexes on matches
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset cursors compare (compatibility_score, id), which needs a score on every row
+    op.execute("UPDATE matches SET compatibility_score = COALESCE(rule_score, 0) WHERE compatibility_score IS NULL")
+    op.alter_column("matches", "compatibility_score", nullable=False, server_default="0")
+
+    op.drop_index("ix_matches_user_a_status_score", table_name="matches")
+    op.drop_index("ix_matches_user_b_status_score", table_name="matches")
+    op.create_index(
+        "ix_matches_user_a_status_score", "matches", ["user_a_id", "status", "compatibility_score", "id"]
+    )
+    op.create_index(
+        "ix_matches_user_b_status_score", "matches", ["user_b_id", "status", "compatibility_score", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_matches_user_b_status_score", table_name="matches")
+    op.drop_index("ix_matches_user_a_status_score", table_name="matches")
+    op.create_index(
+        "ix_matches_user_a_status_score", "matches", ["user_a_id", "status", "compatibility_score"]
+    )
+    op.create_index(
+        "ix_matches_user_b_status_score", "matches", ["user_b_id", "status", "compatibility_score"]
+    )
+    op.alter_column("matches", "compatibility_score", nullable=True, server_default=None)
@@ -0,0 +1,25 @@
+"""prompt version of the AI analysis on matches
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("matches", sa.Column("prompt_version", sa.String(16)))
+    # Refined matches so far came from the original prompt, with full prose reasoning
+    op.execute("UPDATE matches SET prompt_version = '1-full' WHERE ai_refined")
+
+
+def downgrade() -> None:
+    op.drop_column("matches", "prompt_version")
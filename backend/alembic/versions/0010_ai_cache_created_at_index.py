@@ -0,0 +1,22 @@
+"""index ai cache entries on created_at for TTL eviction
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+from alembic import op
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_ai_cache_entries_created_at", "ai_cache_entries", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_cache_entries_created_at", table_name="ai_cache_entries")
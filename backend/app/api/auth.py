@@ -1,9 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from jose import JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.security import decode_token, create_access_token
 from app.models.user import User
 from app.schemas.user import UserCreate, UserOut, TokenResponse, RefreshRequest
@@ -13,17 +13,17 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def register(data: UserCreate, db: Session = Depends(get_db)):
-    return auth_service.register_user(db, data)
+async def register(data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    return await auth_service.register_user(db, data)
 
 
 @router.post("/login", response_model=TokenResponse)
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    return auth_service.login_user(db, form.username, form.password)
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    return await auth_service.login_user(db, form.username, form.password)
 
 
 @router.post("/refresh", response_model=TokenResponse)
-def refresh_tokens(body: RefreshRequest, db: Session = Depends(get_db)):
+async def refresh_tokens(body: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
     try:
         payload = decode_token(body.refresh_token)
         if payload.get("type") != "refresh":
@@ -32,7 +32,7 @@ def refresh_tokens(body: RefreshRequest, db: Session = Depends(get_db)):
     except (JWTError, ValueError, KeyError):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
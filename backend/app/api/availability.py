@@ -1,45 +1,78 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.deps import get_current_user
+from app.core.database import get_async_db
+from app.core.deps import get_current_user_id
 from app.models.availability import Availability
-from app.models.user import User
 from app.schemas.availability import AvailabilityCreate, AvailabilityOut
+from app.services import rescore_service
+from app.services.feature_service import refresh_features
+from app.services.schedule import format_hhmm, merge_intervals, parse_hhmm
 
 router = APIRouter(prefix="/availability", tags=["availability"])
 
 
 @router.get("", response_model=list[AvailabilityOut])
-def get_my_availability(
-    db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+async def get_my_availability(
+    db: AsyncSession = Depends(get_async_db), current_user_id: str = Depends(get_current_user_id)
 ):
-    return db.query(Availability).filter(Availability.user_id == current_user.id).all()
+    return (await db.scalars(select(Availability).where(Availability.user_id == current_user_id))).all()
 
 
 @router.post("", response_model=AvailabilityOut, status_code=status.HTTP_201_CREATED)
-def add_availability(
+async def add_availability(
     data: AvailabilityCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: str = Depends(get_current_user_id),
 ):
-    slot = Availability(**data.model_dump(), user_id=current_user.id)
-    db.add(slot)
-    db.commit()
-    db.refresh(slot)
+    """
+    Add a slot, merging it with any same-day slots it overlaps or touches,
+    so each user's availability is stored as disjoint intervals.
+    Returns the resulting (possibly merged) slot.
+    """
+    start, end = parse_hhmm(data.start_time), parse_hhmm(data.end_time)
+    same_day = []
+    for slot in await db.scalars(select(Availability).where(
+        Availability.user_id == current_user_id, Availability.day_of_week == data.day_of_week
+    )):
+        try:
+            same_day.append((slot, parse_hhmm(slot.start_time), parse_hhmm(slot.end_time)))
+        except ValueError:
+            continue
+
+    # The merged interval that contains the new slot, and the slots inside it
+    intervals = merge_intervals([(start, end), *((s, e) for _, s, e in same_day)])
+    start, end = next((s, e) for s, e in intervals if s <= start and end <= e)
+    absorbed = [slot for slot, s, e in same_day if start <= s and e <= end]
+
+    if absorbed:
+        slot = absorbed[0]
+        for duplicate in absorbed[1:]:
+            await db.delete(duplicate)
+    else:
+        slot = Availability(day_of_week=data.day_of_week, user_id=current_user_id)
+        db.add(slot)
+    slot.start_time, slot.end_time = format_hhmm(start), format_hhmm(end)
+    await db.run_sync(refresh_features, current_user_id)
+    await db.commit()
+    await db.refresh(slot)
+    rescore_service.mark_dirty(current_user_id)
     return slot
 
 
 @router.delete("/{slot_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_availability(
-    slot_id: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+async def delete_availability(
+    slot_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: str = Depends(get_current_user_id),
 ):
-    slot = (
-        db.query(Availability)
-        .filter(Availability.id == slot_id, Availability.user_id == current_user.id)
-        .first()
+    slot = await db.scalar(
+        select(Availability).where(Availability.id == slot_id, Availability.user_id == current_user_id)
     )
     if not slot:
         raise HTTPException(status_code=404, detail="Slot not found")
-    db.delete(slot)
-    db.commit()
+    await db.delete(slot)
+    await db.run_sync(refresh_features, current_user_id)
+    await db.commit()
+    rescore_service.mark_dirty(current_user_id)
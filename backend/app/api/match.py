@@ -1,115 +1,196 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
+import base64
+import json
+from typing import Literal
 
-from app.core.database import get_db
-from app.core.deps import get_current_user
-from app.models.availability import Availability
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import or_, select, tuple_
+
+from app.core import database
+from app.core.database import get_async_db, get_db
+from app.core.deps import get_current_user_id
+from app.core.profiling import profiled, profiling_reason
 from app.models.match import Match, MatchStatus
 from app.models.profile import Profile
-from app.models.user import User
-from app.schemas.match import MatchOut, MatchActionRequest
-from app.services.matching_service import compute_rule_score, passes_hard_filters
-from app.services.ai_service import refine_with_ai
+from app.schemas.match import MatchOut, MatchActionRequest, MatchJobOut, MatchPage, MatchSummaryOut
+from app.services import job_service
+from app.services.matchmaking_service import refine_match, run_matchmaking, stream_matchmaking
 
 router = APIRouter(prefix="/match", tags=["match"])
 
+# The matchmaking routes (find, stream, refine) stay sync: scoring is CPU
+# bound and AI refinement has its own thread pool, so they run in the
+# threadpool on the sync engine. Reads and small writes are async.
+
+
+async def _get_own_match(db: AsyncSession, match_id: str, user_id: str) -> Match:
+    match = await db.scalar(
+        select(Match).where(Match.id == match_id, or_(Match.user_a_id == user_id, Match.user_b_id == user_id))
+    )
+    if not match:
+        raise HTTPException(status_code=404, detail="Match not found")
+    return match
+
 
 @router.post("/find", response_model=list[MatchOut])
 def find_matches(
+    request: Request,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: str = Depends(get_current_user_id),
 ):
     """Run matching for the current user and persist new matches."""
-    my_profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
-    if not my_profile:
+    with profiled(profiling_reason(request), current_user_id) as run:
+        return run_matchmaking(db, current_user_id, progress=run.progress if run else None)
+
+
+@router.post("/find/stream")
+def stream_matches(
+    db: Session = Depends(get_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """
+    Server-Sent Events variant of /match/find.
+
+    Emits `match` events with rule-based scores as soon as candidates are
+    scored, `update` events as AI refinements arrive, then one `done` event.
+    """
+    if not db.query(Profile.id).filter(Profile.user_id == current_user_id).first():
         raise HTTPException(status_code=400, detail="Complete your profile before matchmaking")
 
-    my_slots = db.query(Availability).filter(Availability.user_id == current_user.id).all()
+    def events():
+        # The request-scoped session is closed before the body is streamed,
+        # so the stream gets its own
+        stream_db = database.SessionLocal()
+        count = 0
+        try:
+            for kind, match in stream_matchmaking(stream_db, current_user_id):
+                count += kind == "match"
+                yield f"event: {kind}\ndata: {match.model_dump_json()}\n\n"
+            yield f"event: done\ndata: {json.dumps({'count': count})}\n\n"
+        finally:
+            stream_db.close()
 
-    # Fetch all other profiles in same sport & city (hard-filter shortlist)
-    candidates = (
-        db.query(Profile).filter(Profile.user_id != current_user.id, Profile.sport == my_profile.sport).all()
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
-    results = []
-    for candidate in candidates:
-        if not passes_hard_filters(my_profile, candidate):
-            continue
-
-        # Skip if match already exists
-        existing = (
-            db.query(Match)
-            .filter(
-                or_(
-                    (Match.user_a_id == current_user.id) & (Match.user_b_id == candidate.user_id),
-                    (Match.user_a_id == candidate.user_id) & (Match.user_b_id == current_user.id),
-                )
-            )
-            .first()
-        )
-        if existing:
-            results.append(existing)
-            continue
-
-        their_slots = db.query(Availability).filter(Availability.user_id == candidate.user_id).all()
-        rule_score = compute_rule_score(my_profile, candidate, my_slots, their_slots)
-        ai_result = refine_with_ai(my_profile, candidate, rule_score)
-
-        match = Match(
-            user_a_id=current_user.id,
-            user_b_id=candidate.user_id,
-            compatibility_score=ai_result.get("compatibility_score", rule_score),
-            ai_reasoning=ai_result.get("reasoning"),
-            risks=ai_result.get("risks"),
-            strengths=ai_result.get("strengths"),
-            status=MatchStatus.pending,
-        )
-        db.add(match)
-        db.commit()
-        db.refresh(match)
-        results.append(match)
 
-    results.sort(key=lambda m: m.compatibility_score or 0, reverse=True)
-    return results
+@router.post("/jobs", response_model=MatchJobOut, status_code=status.HTTP_202_ACCEPTED)
+async def start_match_job(current_user_id: str = Depends(get_current_user_id)):
+    """
+    Queue matchmaking in the background and return the job immediately.
+    If the user already has a job queued or running, that job is returned.
+    """
+    return job_service.submit(current_user_id)
 
 
-@router.get("/recommended", response_model=list[MatchOut])
-def get_recommended(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+@router.get("/jobs/{job_id}", response_model=MatchJobOut)
+async def get_match_job(job_id: str, current_user_id: str = Depends(get_current_user_id)):
+    job = job_service.get(job_id)
+    if not job or job.user_id != current_user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+_SUMMARY_COLUMNS = (
+    Match.id, Match.user_a_id, Match.user_b_id, Match.compatibility_score, Match.status, Match.ai_refined,
+    Match.prompt_version,
+)
+
+
+def _encode_cursor(match: Match) -> str:
+    raw = json.dumps([match.compatibility_score, match.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[float, str]:
+    try:
+        score, match_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(score), str(match_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+@router.get("/recommended", response_model=MatchPage)
+async def get_recommended(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    view: Literal["summary", "full"] = "summary",
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: str = Depends(get_current_user_id),
 ):
-    """Return existing pending matches sorted by score."""
-    matches = (
-        db.query(Match)
-        .filter(
-            or_(Match.user_a_id == current_user.id, Match.user_b_id == current_user.id),
-            Match.status == MatchStatus.pending,
-        )
-        .order_by(Match.compatibility_score.desc())
-        .all()
+    """
+    Return stored pending matches, best first, one page at a time. Pure
+    read: matches are computed by /match/find and the nightly
+    app.batch.match_all run.
+
+    Pages are keyset-paginated on (compatibility_score, id), so each page
+    costs the same however many matches the user has. The summary view
+    leaves out the AI analysis text; fetch it with GET /match/{id}.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    page: list[Match] = []
+    # One index range scan per side of the pair, merged here
+    for side in (Match.user_a_id, Match.user_b_id):
+        query = select(Match).where(side == current_user_id, Match.status == MatchStatus.pending)
+        if view == "summary":
+            query = query.options(load_only(*_SUMMARY_COLUMNS))
+        if after:
+            query = query.where(tuple_(Match.compatibility_score, Match.id) < after)
+        query = query.order_by(Match.compatibility_score.desc(), Match.id.desc()).limit(limit + 1)
+        page += (await db.scalars(query)).all()
+
+    page.sort(key=lambda m: (m.compatibility_score, m.id), reverse=True)
+    schema = MatchSummaryOut if view == "summary" else MatchOut
+    return MatchPage(
+        items=[schema.model_validate(m) for m in page[:limit]],
+        next_cursor=_encode_cursor(page[limit - 1]) if len(page) > limit else None,
     )
-    return matches
+
+
+@router.get("/{match_id}", response_model=MatchOut)
+async def get_match(
+    match_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    """Return one match with its full AI analysis."""
+    return await _get_own_match(db, match_id, current_user_id)
 
 
 @router.patch("/{match_id}", response_model=MatchOut)
-def respond_to_match(
+async def respond_to_match(
     match_id: str,
     body: MatchActionRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: str = Depends(get_current_user_id),
+):
+    match = await _get_own_match(db, match_id, current_user_id)
+    match.status = body.status
+    await db.commit()
+    await db.refresh(match)
+    return match
+
+
+@router.post("/{match_id}/refine", response_model=MatchOut)
+def refine_rule_only_match(
+    match_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user_id: str = Depends(get_current_user_id),
 ):
+    """Run AI refinement for a match stored rule-only or with a brief analysis, and return the full analysis."""
     match = (
         db.query(Match)
         .filter(
             Match.id == match_id,
-            or_(Match.user_a_id == current_user.id, Match.user_b_id == current_user.id),
+            or_(Match.user_a_id == current_user_id, Match.user_b_id == current_user_id),
         )
         .first()
     )
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
-    match.status = body.status
-    db.commit()
-    db.refresh(match)
-    return match
+    return refine_match(db, match, current_user_id)
@@ -1,57 +1,74 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
-from app.core.deps import get_current_user
+from app.core.database import get_async_db
+from app.core.deps import get_current_user_id
 from app.models.profile import Profile
-from app.models.user import User
 from app.schemas.profile import ProfileCreate, ProfileOut, ProfileUpdate
+from app.services.ai_service import invalidate_profile_cache, profile_fingerprint
+from app.services import rescore_service
+from app.services.feature_service import refresh_features
 
 router = APIRouter(prefix="/profiles", tags=["profiles"])
 
 
+async def _get_profile(db: AsyncSession, user_id: str) -> Profile | None:
+    return await db.scalar(select(Profile).where(Profile.user_id == user_id))
+
+
 @router.post("", response_model=ProfileOut, status_code=status.HTTP_201_CREATED)
-def create_profile(
+async def create_profile(
     data: ProfileCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: str = Depends(get_current_user_id),
 ):
-    if db.query(Profile).filter(Profile.user_id == current_user.id).first():
+    if await _get_profile(db, current_user_id):
         raise HTTPException(status_code=400, detail="Profile already exists. Use PATCH to update.")
-    profile = Profile(**data.model_dump(), user_id=current_user.id)
+    profile = Profile(**data.model_dump(), user_id=current_user_id)
     db.add(profile)
-    db.commit()
-    db.refresh(profile)
+    await db.run_sync(refresh_features, current_user_id)
+    await db.commit()
+    await db.refresh(profile)
     return profile
 
 
 @router.get("/me", response_model=ProfileOut)
-def get_my_profile(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
+async def get_my_profile(
+    db: AsyncSession = Depends(get_async_db), current_user_id: str = Depends(get_current_user_id)
+):
+    profile = await _get_profile(db, current_user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     return profile
 
 
 @router.patch("/me", response_model=ProfileOut)
-def update_my_profile(
+async def update_my_profile(
     data: ProfileUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user_id: str = Depends(get_current_user_id),
 ):
-    profile = db.query(Profile).filter(Profile.user_id == current_user.id).first()
+    profile = await _get_profile(db, current_user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
+    old_fingerprint = profile_fingerprint(profile)
     for field, value in data.model_dump(exclude_none=True).items():
         setattr(profile, field, value)
-    db.commit()
-    db.refresh(profile)
+    await db.run_sync(refresh_features, current_user_id)
+    await db.commit()
+    await db.refresh(profile)
+    if profile_fingerprint(profile) != old_fingerprint:
+        await db.run_sync(invalidate_profile_cache, old_fingerprint)
+    rescore_service.mark_dirty(current_user_id)
     return profile
 
 
 @router.get("/{user_id}", response_model=ProfileOut)
-def get_profile(user_id: str, db: Session = Depends(get_db), _: User = Depends(get_current_user)):
-    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+async def get_profile(
+    user_id: str, db: AsyncSession = Depends(get_async_db), _: str = Depends(get_current_user_id)
+):
+    profile = await _get_profile(db, user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     return profile
@@ -0,0 +1,223 @@
+"""
+Offline all-pairs matchmaking.
+
+    python -m app.batch.match_all [--run-id ID] [--workers N]
+
+Profiles are partitioned into (sport, city) buckets on the normalized
+profile_features keys. Athletes without a city belong to every city bucket
+of their sport; pairs of two city-less athletes are scored once, in the
+sport's (sport, "") bucket. Buckets are scored in a process pool and each
+bucket's pairs are written (COPY on Postgres) in one transaction together
+with its checkpoint, so rerunning with the same --run-id resumes where an
+interrupted run stopped.
+
+New pairs are stored rule-only and refined on demand like any other
+rule-only match. Existing pending pairs get a fresh rule score; their
+compatibility score is replaced too unless it came from the LLM. Pairs
+the users already accepted or rejected are left as they are.
+"""
+
+import argparse
+import io
+import logging
+import multiprocessing
+import os
+import time
+from collections.abc import Iterable, Iterator
+from datetime import date
+
+import numpy as np
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.core import database
+from app.core.config import settings
+from app.models.batch_checkpoint import BatchCheckpoint
+from app.models.match import Match, MatchStatus, make_pair_key
+from app.models.profile_features import ProfileFeatures
+from app.services.feature_service import decode_features
+from app.services.matching_service import CandidatePool, score_many
+from app.services.matchmaking_service import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+Bucket = tuple[str, str]               # (sport_key, city_key)
+Pair = tuple[str, str, float]          # (user_a_id, user_b_id, rule_score)
+
+_COPY_CHUNK_ROWS = 50_000
+_UPSERT_CHUNK_ROWS = 1_000
+
+# Overridable in tests
+session_factory = database.SessionLocal
+
+
+def bucket_name(bucket: Bucket) -> str:
+    return "|".join(bucket)
+
+
+def list_buckets(db: Session) -> list[Bucket]:
+    """Every (sport, city) bucket with at least one athlete, largest first."""
+    rows = (
+        db.query(ProfileFeatures.sport_key, ProfileFeatures.city_key, func.count())
+        .group_by(ProfileFeatures.sport_key, ProfileFeatures.city_key)
+        .all()
+    )
+    buckets = {(sport, city): count for sport, city, count in rows}
+    # City-less athletes always get a bucket of their own within their sport
+    for sport in {sport for sport, _ in buckets}:
+        buckets.setdefault((sport, ""), 0)
+    return sorted(buckets, key=lambda b: buckets[b], reverse=True)
+
+
+def score_bucket(bucket: Bucket) -> tuple[Bucket, list[Pair]]:
+    """Load one bucket's features and score every eligible pair in it."""
+    sport, city = bucket
+    db = session_factory()
+    try:
+        query = db.query(ProfileFeatures).filter(ProfileFeatures.sport_key == sport)
+        cities = [city, ""] if city else [""]
+        features = decode_features(query.filter(ProfileFeatures.city_key.in_(cities)).all())
+    finally:
+        db.close()
+    return bucket, score_pairs(features, city_bucket=bool(city))
+
+
+def score_pairs(features: list, city_bucket: bool) -> list[Pair]:
+    """
+    All pairs among `features` that pass the hard filters, each once.
+    Athletes are sorted by skill so each one is only scored against the
+    following athletes inside its skill window.
+    """
+    features = sorted(features, key=lambda f: (f.skill_level, f.user_id))
+    pool = CandidatePool(features)
+    pairs: list[Pair] = []
+    for i, a in enumerate(features):
+        stop = int(np.searchsorted(pool.skill, a.skill_level + 2, side="right"))
+        window = pool.window(i + 1, stop)
+        passes, scores = score_many(a, window)
+        if city_bucket and not a.city_key:
+            # Two city-less athletes are paired in the sport's (sport, "") bucket
+            passes &= window.city != ""
+        pairs.extend((a.user_id, window.user_ids[j], float(scores[j])) for j in np.flatnonzero(passes))
+    return pairs
+
+
+def _chunks(pairs: list[Pair], size: int) -> Iterator[list[Pair]]:
+    for start in range(0, len(pairs), size):
+        yield pairs[start:start + size]
+
+
+def _copy_pairs(db: Session, pairs: list[Pair]) -> None:
+    """Stream pairs into a temp table with COPY, then upsert them in one statement."""
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS batch_pairs "
+            "(pair_key varchar(73), user_a_id varchar(36), user_b_id varchar(36), rule_score float8) "
+            "ON COMMIT DELETE ROWS"
+        )
+        for chunk in _chunks(pairs, _COPY_CHUNK_ROWS):
+            buffer = io.StringIO("".join(f"{make_pair_key(a, b)}\t{a}\t{b}\t{score!r}\n" for a, b, score in chunk))
+            cursor.copy_expert("COPY batch_pairs FROM STDIN", buffer)
+        cursor.execute(
+            "INSERT INTO matches "
+            "(id, pair_key, user_a_id, user_b_id, rule_score, compatibility_score, ai_refined, status, created_at) "
+            "SELECT gen_random_uuid()::text, pair_key, user_a_id, user_b_id, rule_score, rule_score, "
+            "false, 'pending', now() FROM batch_pairs "
+            "ON CONFLICT (pair_key) DO UPDATE SET rule_score = EXCLUDED.rule_score, "
+            "compatibility_score = CASE WHEN matches.ai_refined "
+            "THEN matches.compatibility_score ELSE EXCLUDED.rule_score END "
+            "WHERE matches.status = 'pending'"
+        )
+    finally:
+        cursor.close()
+
+
+def _upsert_pairs(db: Session, pairs: list[Pair]) -> None:
+    """Portable fallback for databases without COPY (SQLite in tests)."""
+    insert = dialect_insert(db)
+    for chunk in _chunks(pairs, _UPSERT_CHUNK_ROWS):
+        rows = [
+            dict(
+                user_a_id=a,
+                user_b_id=b,
+                pair_key=make_pair_key(a, b),
+                rule_score=score,
+                compatibility_score=score,
+                status=MatchStatus.pending,
+            )
+            for a, b, score in chunk
+        ]
+        stmt = insert(Match).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["pair_key"],
+            set_=dict(
+                rule_score=stmt.excluded.rule_score,
+                compatibility_score=case(
+                    (Match.ai_refined, Match.compatibility_score), else_=stmt.excluded.rule_score
+                ),
+            ),
+            where=Match.status == MatchStatus.pending,
+        ))
+
+
+def write_bucket(db: Session, run_id: str, bucket: Bucket, pairs: list[Pair]) -> None:
+    """Persist a bucket's pairs and its checkpoint in one transaction."""
+    if pairs:
+        if db.get_bind().dialect.name == "postgresql":
+            _copy_pairs(db, pairs)
+        else:
+            _upsert_pairs(db, pairs)
+    db.add(BatchCheckpoint(run_id=run_id, bucket=bucket_name(bucket), pairs=len(pairs)))
+    db.commit()
+
+
+def run(run_id: str, workers: int) -> int:
+    """Score every pending bucket of `run_id`; returns the number of pairs written."""
+    db = session_factory()
+    try:
+        done = {b for (b,) in db.query(BatchCheckpoint.bucket).filter(BatchCheckpoint.run_id == run_id)}
+        todo = [b for b in list_buckets(db) if bucket_name(b) not in done]
+        logger.info("Run %s: %d buckets to score, %d already done", run_id, len(todo), len(done))
+
+        results: Iterable[tuple[Bucket, list[Pair]]]
+        pool = None
+        if workers > 1 and len(todo) > 1:
+            # Spawned workers open their own connections instead of sharing the parent's
+            pool = multiprocessing.get_context("spawn").Pool(workers)
+            results = pool.imap_unordered(score_bucket, todo)
+        else:
+            results = map(score_bucket, todo)
+
+        total = 0
+        try:
+            for bucket, pairs in results:
+                started = time.monotonic()
+                write_bucket(db, run_id, bucket, pairs)
+                total += len(pairs)
+                logger.info("Bucket %s: %d pairs written in %.2fs", bucket_name(bucket), len(pairs),
+                            time.monotonic() - started)
+        finally:
+            if pool is not None:
+                pool.terminate()
+        return total
+    finally:
+        db.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute rule-scored matches for every eligible pair.")
+    parser.add_argument("--run-id", default=date.today().isoformat(),
+                        help="checkpoint namespace; rerun with the same id to resume (default: today)")
+    parser.add_argument("--workers", type=int, default=settings.BATCH_MATCH_WORKERS or os.cpu_count() or 1,
+                        help="scoring processes (default: BATCH_MATCH_WORKERS or one per CPU)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    started = time.monotonic()
+    total = run(args.run_id, args.workers)
+    logger.info("Run %s finished: %d pairs in %.1fs", args.run_id, total, time.monotonic() - started)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Rebuild profile_features for every profile.
+
+    python -m app.batch.rebuild_features
+
+Run once after upgrading past migration 0005, which creates the table
+empty; afterwards rows are kept current on every profile or availability
+write. Safe to rerun.
+"""
+
+import logging
+import time
+
+from app.core import database
+from app.services.feature_service import rebuild_all_features
+
+logger = logging.getLogger(__name__)
+
+session_factory = database.SessionLocal
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    started = time.monotonic()
+    db = session_factory()
+    try:
+        total = rebuild_all_features(db)
+    finally:
+        db.close()
+    logger.info("Rebuilt features for %d profiles in %.1fs", total, time.monotonic() - started)
+
+
+if __name__ == "__main__":
+    main()
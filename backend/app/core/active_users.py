@@ -0,0 +1,49 @@
+"""
+Short-lived in-process cache of user ids known to be active.
+
+get_current_user_id consults it so most authenticated requests skip the
+users table. Entries expire after ACTIVE_USER_CACHE_TTL_SECONDS; deactivating
+a user invalidates their entry immediately in this process, and other
+processes pick the change up when the entry expires.
+"""
+
+import threading
+import time
+
+from app.core.config import settings
+
+_lock = threading.Lock()
+_expires_at: dict[str, float] = {}
+
+
+def is_cached(user_id: str) -> bool:
+    with _lock:
+        expires_at = _expires_at.get(user_id)
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            del _expires_at[user_id]
+            return False
+        return True
+
+
+def remember(user_id: str) -> None:
+    now = time.monotonic()
+    with _lock:
+        if len(_expires_at) >= settings.ACTIVE_USER_CACHE_MAX_ENTRIES:
+            for key in [k for k, t in _expires_at.items() if t < now]:
+                del _expires_at[key]
+            if len(_expires_at) >= settings.ACTIVE_USER_CACHE_MAX_ENTRIES:
+                del _expires_at[next(iter(_expires_at))]  # oldest insertion
+        _expires_at.pop(user_id, None)
+        _expires_at[user_id] = now + settings.ACTIVE_USER_CACHE_TTL_SECONDS
+
+
+def invalidate(user_id: str) -> None:
+    with _lock:
+        _expires_at.pop(user_id, None)
+
+
+def clear() -> None:
+    with _lock:
+        _expires_at.clear()
@@ -1,11 +1,45 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+# Async drivers for the sync DATABASE_URL drivers
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_url(url: str) -> str:
+    """DATABASE_URL with its driver swapped for the async one (psycopg2 → asyncpg)."""
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername)
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+def _pool_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return dict(
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+    )
+
+
+# Matchmaking pipelines and background jobs run in worker threads on the sync engine
+engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True, **_pool_options(settings.DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Everything else is served from the event loop
+async_engine = create_async_engine(
+    async_url(settings.DATABASE_URL), pool_pre_ping=True, **_pool_options(settings.DATABASE_URL)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 
 class Base(DeclarativeBase):
     pass
@@ -17,3 +51,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,32 +1,58 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core import active_users
+from app.core.database import get_async_db
 from app.core.security import decode_token
 from app.models.user import User
 
 bearer_scheme = HTTPBearer()
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    token = credentials.credentials
+def _user_id_from_token(credentials: HTTPAuthorizationCredentials) -> str:
     try:
-        payload = decode_token(token)
+        payload = decode_token(credentials.credentials)
         if payload.get("type") != "access":
             raise ValueError("Invalid token type")
         user_id: str = payload.get("sub")
+        if not user_id:
+            raise ValueError("Missing subject")
     except (JWTError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
+    return user_id
+
 
-    user = db.query(User).filter(User.id == user_id).first()
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    user_id = _user_id_from_token(credentials)
+    user = await db.get(User, user_id)
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    active_users.remember(user_id)
     return user
+
+
+async def get_current_user_id(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> str:
+    """
+    Id of the authenticated user, for routes that don't need the User row.
+    Recently seen active users are served from the active_users cache
+    without touching the database.
+    """
+    user_id = _user_id_from_token(credentials)
+    if active_users.is_cached(user_id):
+        return user_id
+    if not await db.scalar(select(User.is_active).where(User.id == user_id)):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    active_users.remember(user_id)
+    return user_id
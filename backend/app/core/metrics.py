@@ -0,0 +1,187 @@
+"""
+Request timing and Prometheus metrics.
+
+MetricsMiddleware starts a RequestTimings for every HTTP request and keeps
+it in a context variable. SQL cursor events (instrument_engine), LLM calls
+and `timed` blocks add their durations to it, from the event loop and from
+worker threads alike: threads started through anyio or copy_context share
+the same object. When the response starts, the middleware
+- observes the per-route histograms, and
+- adds a Server-Timing header (db, ai, scoring, total) so the breakdown
+  shows up in browser dev tools.
+
+Metrics live in the default prometheus_client registry and are served
+from /metrics. With several worker processes, each one exposes its own
+counters.
+"""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+_QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+HTTP_REQUESTS = Counter(
+    "arena_http_requests_total", "HTTP requests by route and status code", ["method", "route", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "arena_http_request_duration_seconds", "Time to the end of the response body", ["method", "route"],
+    buckets=_LATENCY_BUCKETS,
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "arena_db_queries_per_request", "SQL statements executed per HTTP request", ["route"], buckets=_QUERY_BUCKETS
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "arena_db_time_per_request_seconds", "Time spent in SQL per HTTP request", ["route"], buckets=_LATENCY_BUCKETS
+)
+DB_QUERY_LATENCY = Histogram(
+    "arena_db_query_duration_seconds", "Duration of single SQL statements", buckets=_LATENCY_BUCKETS
+)
+AI_CALL_LATENCY = Histogram(
+    "arena_ai_call_duration_seconds", "OpenAI completion latency", ["kind", "outcome"], buckets=_LATENCY_BUCKETS
+)
+AI_TOKENS = Counter("arena_ai_tokens_total", "OpenAI tokens used", ["type"])
+AI_FALLBACKS = Counter(
+    "arena_ai_fallbacks_total", "Refinements answered with the rule score instead of the LLM", ["reason"]
+)
+RESCORED_MATCHES = Counter(
+    "arena_rescored_matches_total", "Pending matches updated after profile edits", ["outcome"]
+)
+LLM_QUEUE_WAIT = Histogram(
+    "arena_llm_queue_wait_seconds", "Time LLM calls waited for rate-limit capacity", ["lane"],
+    buckets=_LATENCY_BUCKETS,
+)
+LLM_RETRIES = Counter("arena_llm_retries_total", "Failed LLM attempts that were retried or gave up", ["error"])
+LLM_BREAKER_OPEN = Gauge("arena_llm_circuit_open", "1 while the LLM circuit breaker is open")
+
+
+@dataclass
+class RequestTimings:
+    """Seconds spent per component while serving one request."""
+
+    durations: dict[str, float] = field(default_factory=dict)
+    db_queries: int = 0
+
+    def add(self, name: str, seconds: float) -> None:
+        # dict updates are atomic under the GIL; worker threads may add concurrently
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        parts = []
+        for name, seconds in self.durations.items():
+            desc = f';desc="{self.db_queries} queries"' if name == "db" else ""
+            parts.append(f"{name};dur={seconds * 1000:.1f}{desc}")
+        parts.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[RequestTimings | None] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> RequestTimings | None:
+    return _current.get()
+
+
+def record(name: str, seconds: float) -> None:
+    """Add `seconds` to component `name` of the current request, if any."""
+    timings = _current.get()
+    if timings is not None:
+        timings.add(name, seconds)
+
+
+@contextmanager
+def collect_timings() -> Iterator[RequestTimings]:
+    """Attribute SQL and `timed` durations in the enclosed block to a fresh RequestTimings."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+# ── SQL ───────────────────────────────────────────────────────────────────────
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERY_LATENCY.observe(seconds)
+    timings = _current.get()
+    if timings is not None:
+        timings.add("db", seconds)
+        timings.db_queries += 1
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement on `engine` (pass async_engine.sync_engine for async engines)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+
+def _route_label(scope: Scope) -> str:
+    # FastAPI stores the matched route in the scope; use its template to bound label cardinality
+    route = scope.get("route")
+    return getattr(route, "path", "unmatched")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so streaming responses are timed to their last chunk."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timings.server_timing(time.perf_counter() - started)
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode())]
+            await send(message)
+
+        with collect_timings() as timings:
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                route = _route_label(scope)
+                if route != "/metrics":
+                    HTTP_REQUESTS.labels(scope["method"], route, str(status)).inc()
+                    HTTP_LATENCY.labels(scope["method"], route).observe(time.perf_counter() - started)
+                    DB_QUERIES_PER_REQUEST.labels(route).observe(timings.db_queries)
+                    DB_TIME_PER_REQUEST.labels(route).observe(timings.durations.get("db", 0.0))
+
+
+def metrics_endpoint(request: Request) -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
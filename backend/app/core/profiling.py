@@ -0,0 +1,176 @@
+"""
+Opt-in profiling of matchmaking runs.
+
+A run is profiled when the request carries an X-Profile-Token header equal
+to PROFILING_ADMIN_TOKEN, or at random with probability
+PROFILING_SAMPLE_RATE. A profiled run writes two files to PROFILING_DIR:
+
+  <run_id>.prof   cProfile stats of the request thread (open with pstats or snakeviz)
+  <run_id>.json   redacted snapshot: hashed user id, candidate pool sizes,
+                  stage and component timings, the AI settings in effect and
+                  the slowest functions
+
+No names, goals, emails or raw ids are written, so snapshots can be shared
+and replayed with `python -m benchmarks.replay <run_id>.json`. Only the
+newest PROFILING_MAX_RUNS runs are kept.
+
+cProfile only sees the request thread; LLM calls run in the ai-refine pool
+and show up as time waiting on futures, while the snapshot's stage timings
+give their wall time.
+"""
+
+import cProfile
+import hashlib
+import hmac
+import io
+import json
+import logging
+import pstats
+import random
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import Request
+
+from app.core.config import settings
+from app.core.metrics import current_timings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Token"
+
+_TOP_FUNCTIONS = 15
+
+
+class ProfileRun:
+    """One profiled matchmaking run; pass `progress` to run_matchmaking."""
+
+    def __init__(self, reason: str, user_id: str):
+        self.run_id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+        self.reason = reason
+        self.user_hash = hashlib.sha256(user_id.encode()).hexdigest()[:16]
+        self.profiler = cProfile.Profile()
+        self.notes: dict = {}
+        self.stages: list[tuple[str, float]] = []
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.status = "ok"
+
+    def progress(self, stage: str, done: int, total: int, partial: list) -> None:
+        self.stages.append((stage, time.perf_counter() - self.started))
+
+    def stage_durations(self) -> dict[str, float]:
+        """Milliseconds from each stage's start to the next one (or the end of the run)."""
+        marks = [*self.stages, ("end", self.duration)]
+        return {
+            stage: round((marks[i + 1][1] - started) * 1000, 2)
+            for i, (stage, started) in enumerate(marks[:-1])
+        }
+
+    def top_functions(self) -> list[dict]:
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:_TOP_FUNCTIONS]
+        return [
+            {
+                "function": f"{Path(filename).name}:{line}({name})",
+                "calls": ncalls,
+                "own_ms": round(tottime * 1000, 2),
+                "cumulative_ms": round(cumtime * 1000, 2),
+            }
+            for (filename, line, name), (_, ncalls, tottime, cumtime, _) in rows
+        ]
+
+    def snapshot(self) -> dict:
+        timings = current_timings()
+        return {
+            "run_id": self.run_id,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "reason": self.reason,
+            "user": self.user_hash,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 2),
+            "stages_ms": self.stage_durations(),
+            "components_ms": {k: round(v * 1000, 2) for k, v in timings.durations.items()} if timings else {},
+            "db_queries": timings.db_queries if timings else None,
+            **self.notes,
+            "settings": {
+                name: getattr(settings, name)
+                for name in ("OPENAI_MODEL", "AI_BATCH_MODE", "AI_BATCH_MAX_SIZE", "AI_MAX_CONCURRENCY",
+                             "AI_REFINE_TOP_K", "AI_REFINE_MIN_SCORE", "AI_CACHE_ENABLED")
+            },
+            "top_functions": self.top_functions(),
+        }
+
+
+_current: ContextVar[ProfileRun | None] = ContextVar("profile_run", default=None)
+
+
+def note(**values) -> None:
+    """Attach redacted facts (sizes, feature summaries) to the current profiled run, if any."""
+    run = _current.get()
+    if run is not None:
+        run.notes.update(values)
+
+
+def profiling_reason(request: Request) -> str | None:
+    """Why this request should be profiled ("header", "sampled"), or None."""
+    token = request.headers.get(PROFILE_HEADER)
+    if token and settings.PROFILING_ADMIN_TOKEN and hmac.compare_digest(token, settings.PROFILING_ADMIN_TOKEN):
+        return "header"
+    if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+        return "sampled"
+    return None
+
+
+def _rotate(directory: Path) -> None:
+    snapshots = sorted(directory.glob("*.json"))
+    for old in snapshots[: max(0, len(snapshots) - settings.PROFILING_MAX_RUNS)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def _write(run: ProfileRun, directory: Path) -> None:
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        run.profiler.dump_stats(directory / f"{run.run_id}.prof")
+        (directory / f"{run.run_id}.json").write_text(json.dumps(run.snapshot(), indent=2) + "\n")
+        _rotate(directory)
+    except OSError as exc:
+        logger.warning("Could not write profile %s: %s", run.run_id, exc)
+
+
+@contextmanager
+def profiled(reason: str | None, user_id: str, directory: Path | None = None) -> Iterator[ProfileRun | None]:
+    """
+    Profile the enclosed block when `reason` is set and write the run to
+    `directory` (PROFILING_DIR by default). Yields None otherwise.
+    """
+    if reason is None:
+        yield None
+        return
+
+    run = ProfileRun(reason, user_id)
+    try:
+        run.profiler.enable()
+    except ValueError:
+        # Python 3.12+ allows one active profiler per process; skip overlapping runs
+        logger.info("Skipping profile of matchmaking run (%s): another run is being profiled", reason)
+        yield None
+        return
+    token = _current.set(run)
+    try:
+        yield run
+    except Exception as exc:
+        run.status = f"error: {type(exc).__name__}"
+        raise
+    finally:
+        run.profiler.disable()
+        run.duration = time.perf_counter() - run.started
+        _current.reset(token)
+        _write(run, directory or Path(settings.PROFILING_DIR))
+        logger.info("Profiled matchmaking run %s (%s) in %.0f ms", run.run_id, reason, run.duration * 1000)
@@ -1,14 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, metrics_endpoint
 from app.api import auth, users, profiles, availability, match
+from app.services import ai_service, job_service, rescore_service
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop background jobs
+    job_service.shutdown()
+    rescore_service.shutdown()
+    ai_service.shutdown()
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # ── CORS ──────────────────────────────────────────────────────────────────────
@@ -20,6 +35,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ── Metrics ───────────────────────────────────────────────────────────────────
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+    app.get("/metrics", include_in_schema=False)(metrics_endpoint)
+
 # ── Routers ───────────────────────────────────────────────────────────────────
 app.include_router(auth.router, prefix=settings.API_V1_STR)
 app.include_router(users.router, prefix=settings.API_V1_STR)
@@ -31,3 +51,4 @@ app.include_router(match.router, prefix=settings.API_V1_STR)
 @app.get("/health")
 def health_check():
     return {"status": "ok", "app": settings.APP_NAME}
+
@@ -3,3 +3,6 @@ from app.models.user import User  # noqa: F401
 from app.models.profile import Profile  # noqa: F401
 from app.models.availability import Availability  # noqa: F401
 from app.models.match import Match  # noqa: F401
+from app.models.ai_cache import AICacheEntry  # noqa: F401
+from app.models.profile_features import ProfileFeatures  # noqa: F401
+from app.models.batch_checkpoint import BatchCheckpoint  # noqa: F401
@@ -0,0 +1,22 @@
+from datetime import datetime
+
+from sqlalchemy import String, Text, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class AICacheEntry(Base):
+    """Cached LLM compatibility result, keyed by a content hash of the prompt inputs."""
+
+    __tablename__ = "ai_cache_entries"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    profile_a_hash: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    profile_b_hash: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    result: Mapped[str] = mapped_column(Text, nullable=False)  # JSON
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), index=True)
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
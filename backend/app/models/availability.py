@@ -12,7 +12,7 @@ class Availability(Base):
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
-    user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), nullable=False, index=True)
     day_of_week: Mapped[int] = mapped_column(Integer, nullable=False)   # 0=Mon … 6=Sun
     start_time: Mapped[str] = mapped_column(String(5), nullable=False)  # "HH:MM"
     end_time: Mapped[str] = mapped_column(String(5), nullable=False)    # "HH:MM"
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from sqlalchemy import String, Integer, DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class BatchCheckpoint(Base):
+    """One finished (sport, city) bucket of a batch matchmaking run."""
+
+    __tablename__ = "batch_checkpoints"
+
+    run_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    bucket: Mapped[str] = mapped_column(String(201), primary_key=True)  # "<sport>|<city>"
+    pairs: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Float, Text, ForeignKey, DateTime, func, Enum
+from sqlalchemy import String, Float, Text, Boolean, ForeignKey, DateTime, func, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import Mapped, mapped_column
 import enum
 
@@ -14,19 +14,45 @@ class MatchStatus(str, enum.Enum):
     rejected = "rejected"
 
 
+def make_pair_key(user_id_1: str, user_id_2: str) -> str:
+    """Order-independent key for a pair of users: "<min id>:<max id>"."""
+    low, high = sorted((user_id_1, user_id_2))
+    return f"{low}:{high}"
+
+
+def _default_pair_key(context) -> str:
+    params = context.get_current_parameters()
+    return make_pair_key(params["user_a_id"], params["user_b_id"])
+
+
 class Match(Base):
     __tablename__ = "matches"
+    __table_args__ = (
+        UniqueConstraint("pair_key", name="uq_matches_pair_key"),
+        # Keyset pagination of a user's matches on (compatibility_score, id)
+        Index("ix_matches_user_a_status_score", "user_a_id", "status", "compatibility_score", "id"),
+        Index("ix_matches_user_b_status_score", "user_b_id", "status", "compatibility_score", "id"),
+    )
 
     id: Mapped[str] = mapped_column(
         String(36), primary_key=True, default=lambda: str(uuid.uuid4())
     )
     user_a_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), nullable=False)
     user_b_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), nullable=False)
+    # Canonical (min id, max id) pair; the unique constraint stops duplicate pairs
+    pair_key: Mapped[str] = mapped_column(
+        String(73), nullable=False, default=_default_pair_key
+    )
 
-    compatibility_score: Mapped[float | None] = mapped_column(Float)
+    compatibility_score: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    rule_score: Mapped[float | None] = mapped_column(Float)
+    # False for matches stored with their rule score only (refined on demand)
+    ai_refined: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
     ai_reasoning: Mapped[str | None] = mapped_column(Text)
     risks: Mapped[str | None] = mapped_column(Text)
     strengths: Mapped[str | None] = mapped_column(Text)
+    # ai_service.prompt_version() of the AI analysis, e.g. "2-brief"; None for rule-only matches
+    prompt_version: Mapped[str | None] = mapped_column(String(16))
 
     status: Mapped[MatchStatus] = mapped_column(
         Enum(MatchStatus), default=MatchStatus.pending, nullable=False
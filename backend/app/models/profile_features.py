@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from sqlalchemy import String, Integer, Float, LargeBinary, ForeignKey, DateTime, func, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class ProfileFeatures(Base):
+    """
+    Precomputed, normalized matching inputs for one user.
+    Rebuilt whenever the user's profile or availability changes.
+    """
+
+    __tablename__ = "profile_features"
+    __table_args__ = (
+        # Candidate generation: equality on sport and city, range on skill
+        Index("ix_profile_features_blocking", "sport_key", "city_key", "skill_level"),
+        # Same for athletes without a city, who match every city of their sport
+        Index("ix_profile_features_sport_skill", "sport_key", "skill_level"),
+    )
+
+    user_id: Mapped[str] = mapped_column(String(36), ForeignKey("users.id"), primary_key=True)
+
+    sport_key: Mapped[str] = mapped_column(String(100), nullable=False)  # lowercased, trimmed
+    city_key: Mapped[str] = mapped_column(String(100), nullable=False, default="")  # "" = any city
+    skill_level: Mapped[int] = mapped_column(Integer, nullable=False)
+    weight: Mapped[float | None] = mapped_column(Float)
+    experience_years: Mapped[int | None] = mapped_column(Integer)
+
+    goal_tokens: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)  # sorted uint32 token ids
+    schedule: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)     # weekly minute bitmap
+    schedule_minutes: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -1,13 +1,32 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator, model_validator
 
+from app.services.schedule import parse_hhmm
 
-class AvailabilityCreate(BaseModel):
+
+class AvailabilityBase(BaseModel):
     day_of_week: int = Field(..., ge=0, le=6)  # 0=Mon, 6=Sun
     start_time: str  # "HH:MM"
     end_time: str    # "HH:MM"
 
 
-class AvailabilityOut(AvailabilityCreate):
+class AvailabilityCreate(AvailabilityBase):
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def _check_time(cls, value: str) -> str:
+        try:
+            parse_hhmm(value)
+        except ValueError:
+            raise ValueError("Time must be in HH:MM format")
+        return value
+
+    @model_validator(mode="after")
+    def _check_order(self) -> "AvailabilityCreate":
+        if parse_hhmm(self.end_time) <= parse_hhmm(self.start_time):
+            raise ValueError("end_time must be after start_time")
+        return self
+
+
+class AvailabilityOut(AvailabilityBase):
     id: str
     user_id: str
 
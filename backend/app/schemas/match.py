@@ -2,18 +2,42 @@ from pydantic import BaseModel
 from app.models.match import MatchStatus
 
 
-class MatchOut(BaseModel):
+class MatchSummaryOut(BaseModel):
+    """A match without its AI analysis text, for list views."""
+
     id: str
     user_a_id: str
     user_b_id: str
     compatibility_score: float | None
+    status: MatchStatus
+    ai_refined: bool = False
+    prompt_version: str | None = None  # "<n>-brief" analyses can be expanded with POST /match/{id}/refine
+
+    model_config = {"from_attributes": True}
+
+
+class MatchOut(MatchSummaryOut):
     ai_reasoning: str | None
     risks: str | None
     strengths: str | None
-    status: MatchStatus
 
-    model_config = {"from_attributes": True}
+
+class MatchPage(BaseModel):
+    items: list[MatchOut | MatchSummaryOut]
+    next_cursor: str | None  # pass back as ?cursor= for the next page; None on the last page
 
 
 class MatchActionRequest(BaseModel):
     status: MatchStatus  # accepted / rejected
+
+
+class MatchJobOut(BaseModel):
+    id: str
+    status: str  # queued / running / done / failed
+    stage: str
+    progress_done: int
+    progress_total: int
+    results: list[MatchOut]
+    error: str | None
+
+    model_config = {"from_attributes": True}
@@ -1,86 +1,630 @@
 """OpenAI-based AI refinement for match compatibility."""
 
+import contextvars
+import hashlib
 import json
 import logging
+import threading
+import time
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from typing import Literal
 
 from openai import OpenAI, OpenAIError
+from sqlalchemy import delete, event, or_, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
 
 from app.core.config import settings
+from app.core.metrics import AI_CALL_LATENCY, AI_FALLBACKS, AI_TOKENS
+from app.models.ai_cache import AICacheEntry
 from app.models.profile import Profile
+from app.services.llm_scheduler import LLMUnavailable, get_scheduler
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever the prompt wording or response structure changes so that
+# cached results produced by an older prompt are no longer served.
+PROMPT_VERSION = "2"
+
+# "brief": short risk/strength tags and a one-line verdict, for bulk matching.
+# "full": prose analysis, for a match the user opens.
+Verbosity = Literal["brief", "full"]
+
 _client: OpenAI | None = None
 
+# Shared by every refinement in the process; AI_MAX_CONCURRENCY caps each caller's share
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+_cache_lock = threading.Lock()
+cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+_last_eviction: float | None = None  # time.monotonic() of the last TTL/capacity sweep in this process
+
 
 def _get_client() -> OpenAI:
     global _client
     if _client is None:
-        _client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        # Retries are left to the scheduler, which shares backoff across callers
+        _client = OpenAI(api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL or None, max_retries=0)
     return _client
 
 
-def _build_prompt(a: Profile, b: Profile, rule_score: float) -> str:
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.AI_EXECUTOR_WORKERS, thread_name_prefix="ai-refine")
+        return _executor
+
+
+def shutdown() -> None:
+    """Stop the refinement pool; calls still queued fall back to the rule score."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _describe(p: Profile) -> str:
+    return f"""- Name: {p.name}
+- Sport: {p.sport}
+- Skill level: {p.skill_level}/10
+- Experience: {p.experience_years or "unknown"} years
+- Weight: {p.weight or "unknown"} kg
+- Goals: {p.goals or "not specified"}
+- Training intensity: {p.training_intensity or "not specified"}"""
+
+
+_FIELD_SPECS: dict[str, str] = {
+    "full": (
+        '  "risks": "<concise risk analysis>",\n'
+        '  "strengths": "<compatibility strengths>",\n'
+        '  "reasoning": "<final recommendation paragraph>"'
+    ),
+    "brief": (
+        '  "risks": ["<risk tag, at most 4 words>", ...at most 3 tags],\n'
+        '  "strengths": ["<strength tag, at most 4 words>", ...at most 3 tags],\n'
+        '  "reasoning": "<one-sentence verdict, at most 20 words>"'
+    ),
+}
+
+
+def prompt_version(verbosity: Verbosity) -> str:
+    """Version tag stored with each refined match, e.g. "2-brief"."""
+    return f"{PROMPT_VERSION}-{verbosity}"
+
+
+def is_brief(version: str | None) -> bool:
+    return bool(version) and version.endswith("-brief")
+
+
+def _build_prompt(a: Profile, b: Profile, rule_score: float, verbosity: Verbosity = "full") -> str:
     return f"""You are a professional combat sports coach analyzing compatibility between two athletes.
 
 Athlete A:
-- Name: {a.name}
-- Sport: {a.sport}
-- Skill level: {a.skill_level}/10
-- Experience: {a.experience_years or "unknown"} years
-- Weight: {a.weight or "unknown"} kg
-- Goals: {a.goals or "not specified"}
-- Training intensity: {a.training_intensity or "not specified"}
+{_describe(a)}
 
 Athlete B:
-- Name: {b.name}
-- Sport: {b.sport}
-- Skill level: {b.skill_level}/10
-- Experience: {b.experience_years or "unknown"} years
-- Weight: {b.weight or "unknown"} kg
-- Goals: {b.goals or "not specified"}
-- Training intensity: {b.training_intensity or "not specified"}
+{_describe(b)}
 
 Rule-based pre-score: {rule_score:.1f}/100
 
 Respond ONLY with valid JSON (no markdown) in this exact structure:
 {{
   "compatibility_score": <integer 0-100>,
-  "risks": "<concise risk analysis>",
-  "strengths": "<compatibility strengths>",
-  "reasoning": "<final recommendation paragraph>"
+{_FIELD_SPECS[verbosity]}
 }}"""
 
 
-def refine_with_ai(a: Profile, b: Profile, rule_score: float) -> dict:
+def _build_candidate_block(b: Profile, rule_score: float) -> str:
+    return f"""Candidate {b.user_id}:
+{_describe(b)}
+- Rule-based pre-score: {rule_score:.1f}/100"""
+
+
+def _build_batch_prompt(a: Profile, scored: list[tuple[Profile, float]], verbosity: Verbosity = "full") -> str:
+    candidates = "\n\n".join(_build_candidate_block(b, rule_score) for b, rule_score in scored)
+    fields = _FIELD_SPECS[verbosity].replace("\n", "\n    ")
+    return f"""You are a professional combat sports coach analyzing compatibility between one athlete and several candidate sparring partners.
+
+Athlete A:
+{_describe(a)}
+
+{candidates}
+
+Respond ONLY with valid JSON (no markdown) holding exactly one result per candidate:
+{{
+  "results": [
+    {{
+      "candidate_id": "<candidate id as given above>",
+      "compatibility_score": <integer 0-100>,
+    {fields}
+    }}
+  ]
+}}"""
+
+
+def _result_schema(verbosity: Verbosity, batch: bool) -> dict:
+    """JSON schema for structured-output mode; mirrors the shape the prompts describe."""
+    text = {"type": "string"}
+    tags = {"type": "array", "items": text} if verbosity == "brief" else text
+    properties = {"compatibility_score": {"type": "integer"}, "risks": tags, "strengths": tags, "reasoning": text}
+    if batch:
+        properties = {"candidate_id": text, **properties}
+    item = {"type": "object", "properties": properties, "required": list(properties), "additionalProperties": False}
+    if not batch:
+        return item
+    return {
+        "type": "object",
+        "properties": {"results": {"type": "array", "items": item}},
+        "required": ["results"],
+        "additionalProperties": False,
+    }
+
+
+def _response_format(verbosity: Verbosity, batch: bool) -> dict | None:
+    if not settings.AI_STRUCTURED_OUTPUT:
+        return None
+    name = f"{'batch' if batch else 'match'}_refinement_{verbosity}"
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": _result_schema(verbosity, batch)},
+    }
+
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose; good enough for budgeting
+    return len(text) // 4 + 1
+
+
+def _tokens_per_item(verbosity: Verbosity) -> int:
+    return settings.AI_BRIEF_TOKENS_PER_ITEM if verbosity == "brief" else settings.AI_BATCH_TOKENS_PER_ITEM
+
+
+def _chunk_by_budget(
+    a: Profile, scored: list[tuple[Profile, float]], verbosity: Verbosity = "full"
+) -> list[list[int]]:
+    """
+    Split candidate indices into chunks whose batch prompt stays within
+    AI_BATCH_MAX_PROMPT_TOKENS and AI_BATCH_MAX_SIZE.
+    A single oversized candidate still gets a chunk of its own.
+    """
+    budget = settings.AI_BATCH_MAX_PROMPT_TOKENS - _estimate_tokens(_build_batch_prompt(a, [], verbosity))
+    chunks: list[list[int]] = []
+    current: list[int] = []
+    used = 0
+    for i, (b, rule_score) in enumerate(scored):
+        cost = _estimate_tokens(_build_candidate_block(b, rule_score))
+        if current and (used + cost > budget or len(current) >= settings.AI_BATCH_MAX_SIZE):
+            chunks.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _extract_json(content: str):
+    """
+    Parse the JSON value in a reply, tolerating markdown fences and prose
+    around it. Raises ValueError when there is none.
+    """
+    text = content.strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+    decoder = json.JSONDecoder()
+    starts = sorted(i for i in (text.find("{"), text.find("[")) if i >= 0)
+    for start in starts:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            return value
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("no JSON value in the reply")
+
+
+def _batch_entries(value) -> list:
+    """The per-candidate entries of a batch reply: {"results": [...]} or a bare array."""
+    if isinstance(value, dict) and isinstance(value.get("results"), list):
+        return value["results"]
+    if isinstance(value, list):
+        return value
+    raise ValueError("expected a results array")
+
+
+def _validate_result(entry) -> dict | None:
+    """Return a clean result dict, or None if the entry is malformed. Tag lists are joined into text."""
+    if not isinstance(entry, dict):
+        return None
+    score = entry.get("compatibility_score")
+    if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 100:
+        return None
+    result = {"compatibility_score": round(score)}
+    for field in ("risks", "strengths", "reasoning"):
+        value = entry.get(field)
+        if field != "reasoning" and isinstance(value, list) and all(isinstance(tag, str) for tag in value):
+            value = ", ".join(tag.strip() for tag in value if tag.strip())
+        if not isinstance(value, str):
+            return None
+        result[field] = value
+    return result
+
+
+def _fallback_result(rule_score: float, reason: str) -> dict:
+    AI_FALLBACKS.labels(reason).inc()
+    return {
+        "compatibility_score": round(rule_score),
+        "risks": "AI analysis unavailable.",
+        "strengths": "Based on rule scoring.",
+        "reasoning": f"Estimated compatibility: {rule_score:.1f}/100.",
+        "_fallback": True,
+    }
+
+
+def _no_key_result(rule_score: float) -> dict:
+    AI_FALLBACKS.labels("no_key").inc()
+    return {
+        "compatibility_score": round(rule_score),
+        "risks": "AI unavailable — no API key configured.",
+        "strengths": "Rule-based score only.",
+        "reasoning": f"Compatibility estimated at {rule_score:.1f}/100 using rule-based scoring.",
+        "_fallback": True,
+    }
+
+
+def _complete(
+    kind: str, prompt: str, max_tokens: int, deadline: float | None = None, response_format: dict | None = None
+) -> str:
+    """
+    One chat completion through the shared LLM scheduler; records the
+    latency and token usage of each attempt. Raises OpenAIError, or
+    LLMUnavailable when no attempt could be made before `deadline`
+    (a time.monotonic() value) or the circuit breaker is open.
+    """
+    extra = {"response_format": response_format} if response_format else {}
+
+    def attempt(timeout: float):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            response = _get_client().chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.3,
+                max_tokens=max_tokens,
+                timeout=timeout,
+                **extra,
+            )
+            outcome = "ok"
+            return response
+        finally:
+            AI_CALL_LATENCY.labels(kind, outcome).observe(time.perf_counter() - started)
+
+    response = get_scheduler().call(attempt, tokens=_estimate_tokens(prompt) + max_tokens, deadline=deadline)
+    usage = getattr(response, "usage", None)
+    for token_type in ("prompt", "completion"):
+        tokens = getattr(usage, f"{token_type}_tokens", None)
+        if isinstance(tokens, int):
+            AI_TOKENS.labels(token_type).inc(tokens)
+    return response.choices[0].message.content.strip()
+
+
+def refine_with_ai(
+    a: Profile, b: Profile, rule_score: float, deadline: float | None = None, verbosity: Verbosity = "full"
+) -> dict:
     """
     Call the LLM to refine the rule-based score.
     Returns a dict with keys: compatibility_score, risks, strengths, reasoning.
     Falls back to rule score on any error.
     """
     if not settings.OPENAI_API_KEY:
-        return {
-            "compatibility_score": round(rule_score),
-            "risks": "AI unavailable — no API key configured.",
-            "strengths": "Rule-based score only.",
-            "reasoning": f"Compatibility estimated at {rule_score:.1f}/100 using rule-based scoring.",
-        }
-
-    prompt = _build_prompt(a, b, rule_score)
+        return _no_key_result(rule_score)
+
     try:
-        response = _get_client().chat.completions.create(
-            model=settings.OPENAI_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-            max_tokens=400,
+        content = _complete(
+            "single", _build_prompt(a, b, rule_score, verbosity),
+            max_tokens=400 if verbosity == "full" else settings.AI_BRIEF_TOKENS_PER_ITEM,
+            deadline=deadline, response_format=_response_format(verbosity, batch=False),
         )
-        content = response.choices[0].message.content.strip()
-        return json.loads(content)
-    except (OpenAIError, json.JSONDecodeError, KeyError) as exc:
+    except LLMUnavailable as exc:
+        return _fallback_result(rule_score, exc.reason)
+    except OpenAIError as exc:
         logger.warning("AI refinement failed: %s", exc)
-        return {
-            "compatibility_score": round(rule_score),
-            "risks": "AI analysis unavailable.",
-            "strengths": "Based on rule scoring.",
-            "reasoning": f"Estimated compatibility: {rule_score:.1f}/100.",
-        }
+        return _fallback_result(rule_score, "error")
+    try:
+        result = _validate_result(_extract_json(content))
+    except ValueError as exc:
+        logger.warning("AI refinement failed: %s", exc)
+        result = None
+    return result or _fallback_result(rule_score, "malformed")
+
+
+def refine_batch(
+    a: Profile, scored: list[tuple[Profile, float]], deadline: float | None = None, verbosity: Verbosity = "full"
+) -> list[dict]:
+    """
+    Score one athlete against several candidates in a single completion.
+    Returns one result per candidate, in order. Entries that are missing or
+    malformed in the reply fall back to that candidate's rule score.
+    """
+    if not settings.OPENAI_API_KEY:
+        return [_no_key_result(rule_score) for _, rule_score in scored]
+
+    prompt = _build_batch_prompt(a, scored, verbosity)
+    by_id: dict[str, dict] = {}
+    reason = "malformed"
+    try:
+        content = _complete(
+            "batch", prompt, max_tokens=_tokens_per_item(verbosity) * len(scored), deadline=deadline,
+            response_format=_response_format(verbosity, batch=True),
+        )
+        for entry in _batch_entries(_extract_json(content)):
+            result = _validate_result(entry)
+            if result is not None and isinstance(entry.get("candidate_id"), str):
+                by_id.setdefault(entry["candidate_id"], result)
+    except LLMUnavailable as exc:
+        reason = exc.reason
+    except OpenAIError as exc:
+        reason = "error"
+        logger.warning("Batch AI refinement failed: %s", exc)
+    except ValueError as exc:
+        logger.warning("Batch AI refinement failed: %s", exc)
+
+    results = [by_id.get(b.user_id) or _fallback_result(rule_score, reason) for b, rule_score in scored]
+    missing = sum(1 for b, _ in scored if b.user_id not in by_id)
+    if by_id and missing:
+        logger.warning("Batch AI refinement missing %d/%d entries", missing, len(scored))
+    return results
+
+
+# ── Result cache ──────────────────────────────────────────────────────────────
+
+
+def _normalize(value: str | None) -> str | None:
+    return " ".join(value.lower().split()) if value else None
+
+
+def profile_fingerprint(p: Profile) -> str:
+    """Hash of the normalized profile fields that feed into the prompt."""
+    fields = [
+        _normalize(p.name),
+        _normalize(p.sport),
+        p.skill_level,
+        p.experience_years,
+        round(p.weight, 1) if p.weight is not None else None,
+        _normalize(p.goals),
+        _normalize(p.training_intensity),
+    ]
+    return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+
+def cache_key(a_hash: str, b_hash: str, rule_score: float, verbosity: Verbosity = "full") -> str:
+    bucket = int(rule_score // settings.AI_CACHE_SCORE_BUCKET)
+    raw = f"{prompt_version(verbosity)}|{settings.OPENAI_MODEL}|{a_hash}|{b_hash}|{bucket}"
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _count(stat: str, n: int = 1) -> None:
+    with _cache_lock:
+        cache_stats[stat] += n
+
+
+def _cache_get(db: Session, keys: list[str]) -> dict[str, dict]:
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.AI_CACHE_TTL_SECONDS)
+    rows = db.execute(
+        select(AICacheEntry.key, AICacheEntry.result).where(
+            AICacheEntry.key.in_(keys), AICacheEntry.created_at >= cutoff
+        )
+    ).all()
+    hits = {key: json.loads(result) for key, result in rows}
+    if hits:
+        db.execute(
+            update(AICacheEntry)
+            .where(AICacheEntry.key.in_(list(hits)))
+            .values(last_used_at=datetime.now(timezone.utc))
+        )
+    _count("hits", len(hits))
+    _count("misses", len(set(keys)) - len(hits))
+    return hits
+
+
+def evict_cache(db: Session) -> int:
+    """
+    Drop entries older than AI_CACHE_TTL_SECONDS, then the least recently
+    used ones beyond AI_CACHE_MAX_ENTRIES. Both steps walk an index
+    (created_at, last_used_at) instead of counting the table. Does not commit.
+    """
+    now = datetime.now(timezone.utc)
+    evicted = db.execute(
+        delete(AICacheEntry).where(AICacheEntry.created_at < now - timedelta(seconds=settings.AI_CACHE_TTL_SECONDS))
+    ).rowcount
+    # Everything past the newest AI_CACHE_MAX_ENTRIES, ties broken by key
+    overflow = (
+        select(AICacheEntry.key)
+        .order_by(AICacheEntry.last_used_at.desc(), AICacheEntry.key.desc())
+        .offset(settings.AI_CACHE_MAX_ENTRIES)
+    )
+    evicted += db.execute(
+        delete(AICacheEntry).where(AICacheEntry.key.in_(overflow)).execution_options(synchronize_session=False)
+    ).rowcount
+    _count("evictions", evicted)
+    return evicted
+
+
+def _evict_after_commit(db: Session) -> None:
+    # Own session: the sweep neither waits on nor rolls back with the caller's writes
+    try:
+        with Session(bind=db.get_bind()) as sweep, sweep.begin():
+            evict_cache(sweep)
+    except SQLAlchemyError as exc:
+        logger.warning("AI cache eviction failed: %s", exc)
+
+
+def _eviction_due() -> bool:
+    global _last_eviction
+    now = time.monotonic()
+    with _cache_lock:
+        if _last_eviction is not None and now - _last_eviction < settings.AI_CACHE_EVICT_INTERVAL_SECONDS:
+            return False
+        _last_eviction = now
+        return True
+
+
+def _cache_put(db: Session, entries: list[tuple[str, str, str, dict]]) -> None:
+    """
+    Store (key, a_hash, b_hash, result) rows in a savepoint inside the
+    caller's transaction; does not commit. At most every
+    AI_CACHE_EVICT_INTERVAL_SECONDS per process, TTL and capacity are then
+    enforced in a separate transaction once the caller commits, so the cache
+    can briefly overshoot AI_CACHE_MAX_ENTRIES.
+    """
+    now = datetime.now(timezone.utc)
+    try:
+        with db.begin_nested():
+            db.add_all(
+                AICacheEntry(
+                    key=key, profile_a_hash=a_hash, profile_b_hash=b_hash,
+                    result=json.dumps(result), created_at=now, last_used_at=now,
+                )
+                for key, a_hash, b_hash, result in entries
+            )
+            db.flush()
+    except SQLAlchemyError as exc:
+        # Most likely a concurrent request cached the same key first
+        logger.warning("AI cache write failed: %s", exc)
+        return
+    if _eviction_due():
+        event.listen(db, "after_commit", _evict_after_commit, once=True)
+
+
+def invalidate_profile_cache(db: Session, fingerprint: str) -> int:
+    """Drop every cached result computed from a profile with this fingerprint."""
+    deleted = db.execute(
+        delete(AICacheEntry).where(
+            or_(AICacheEntry.profile_a_hash == fingerprint, AICacheEntry.profile_b_hash == fingerprint)
+        )
+    ).rowcount
+    db.commit()
+    return deleted
+
+
+def refine_many(
+    a: Profile, scored: list[tuple[Profile, float]], db: Session | None = None, verbosity: Verbosity = "full"
+) -> list[dict]:
+    """
+    Refine several (candidate, rule_score) pairs and return the results in
+    the same order as `scored`. See iter_refine.
+    """
+    results: list[dict | None] = [None] * len(scored)
+    for i, result in iter_refine(a, scored, db, verbosity):
+        results[i] = result
+    return results
+
+
+def iter_refine(
+    a: Profile, scored: list[tuple[Profile, float]], db: Session | None = None, verbosity: Verbosity = "full"
+) -> Iterator[tuple[int, dict]]:
+    """
+    Yield (index into scored, result) pairs as soon as each refinement is ready.
+
+    Repeats are served from the result cache first when a session is given
+    and AI_CACHE_ENABLED is set. Only genuine AI results are cached, never
+    rule-score fallbacks. Cache writes join the caller's transaction, so
+    the caller is responsible for committing.
+    """
+    if not scored or db is None or not settings.AI_CACHE_ENABLED or not settings.OPENAI_API_KEY:
+        yield from _iter_uncached(a, scored, verbosity)
+        return
+
+    a_hash = profile_fingerprint(a)
+    b_hashes = [profile_fingerprint(b) for b, _ in scored]
+    keys = [cache_key(a_hash, b_hash, rule_score, verbosity) for b_hash, (_, rule_score) in zip(b_hashes, scored)]
+    hits = _cache_get(db, keys)
+
+    misses: list[int] = []
+    for i, key in enumerate(keys):
+        if key in hits:
+            yield i, hits[key]
+        else:
+            misses.append(i)
+
+    to_store: dict[str, tuple[str, str, str, dict]] = {}
+    for j, result in _iter_uncached(a, [scored[i] for i in misses], verbosity):
+        i = misses[j]
+        valid = None if result.get("_fallback") else _validate_result(result)
+        if valid is not None:
+            to_store[keys[i]] = (keys[i], a_hash, b_hashes[i], valid)
+        yield i, result
+    if to_store:
+        _cache_put(db, list(to_store.values()))
+
+
+def _iter_uncached(
+    a: Profile, scored: list[tuple[Profile, float]], verbosity: Verbosity = "full"
+) -> Iterator[tuple[int, dict]]:
+    """
+    Refine several (candidate, rule_score) pairs concurrently, yielding
+    (index, result) in completion order.
+
+    With AI_BATCH_MODE the candidates are grouped into token-budgeted chunks
+    and each chunk is scored by one completion (see refine_batch).
+    Calls run on the shared ai-refine pool (AI_EXECUTOR_WORKERS threads),
+    at most AI_MAX_CONCURRENCY of them per caller at once. Calls still running
+    when AI_TOTAL_TIMEOUT expires are abandoned and fall back to the rule score,
+    so the batch never takes longer than the overall deadline; calls still
+    waiting on the scheduler give up at the same deadline.
+    """
+    if not scored:
+        return
+    if not settings.OPENAI_API_KEY:
+        for i, (_, rule_score) in enumerate(scored):
+            yield i, _no_key_result(rule_score)
+        return
+
+    if settings.AI_BATCH_MODE:
+        chunks = _chunk_by_budget(a, scored, verbosity)
+    else:
+        chunks = [[i] for i in range(len(scored))]
+
+    deadline = time.monotonic() + settings.AI_TOTAL_TIMEOUT
+
+    def run(chunk: list[int]) -> list[dict]:
+        if settings.AI_BATCH_MODE:
+            return refine_batch(a, [scored[i] for i in chunk], deadline=deadline, verbosity=verbosity)
+        b, rule_score = scored[chunk[0]]
+        return [refine_with_ai(a, b, rule_score, deadline=deadline, verbosity=verbosity)]
+
+    executor = _get_executor()
+    queued = list(reversed(chunks))
+    pending: dict[Future, list[int]] = {}
+    try:
+        while queued or pending:
+            while queued and len(pending) < max(1, settings.AI_MAX_CONCURRENCY):
+                chunk = queued.pop()
+                # Each call carries the caller's context, so the scheduler sees its lane
+                pending[executor.submit(contextvars.copy_context().run, run, chunk)] = chunk
+            done, _ = wait(list(pending), timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                chunk = pending.pop(future)
+                try:
+                    results = future.result()
+                except CancelledError:
+                    results = [_fallback_result(scored[i][1], "shutdown") for i in chunk]
+                yield from zip(chunk, results)
+        if queued or pending:
+            left = [i for chunk in [*pending.values(), *queued] for i in chunk]
+            logger.warning("AI refinement deadline hit: %d/%d calls fell back", len(left), len(scored))
+            for i in left:
+                yield i, _fallback_result(scored[i][1], "timeout")
+    finally:
+        # Abandoned calls that never started give their worker back
+        for future in pending:
+            future.cancel()
@@ -1,28 +1,50 @@
 from fastapi import HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import hash_password, verify_password, create_access_token, create_refresh_token
+from app.core import active_users
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    hash_password_async,
+    verify_and_update_async,
+)
 from app.models.user import User
 from app.schemas.user import UserCreate, TokenResponse
 
 
-def register_user(db: Session, data: UserCreate) -> User:
-    if db.query(User).filter(User.email == data.email).first():
+async def register_user(db: AsyncSession, data: UserCreate) -> User:
+    if await db.scalar(select(User.id).where(User.email == data.email)):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
-    user = User(email=data.email, hashed_password=hash_password(data.password))
+    user = User(email=data.email, hashed_password=await hash_password_async(data.password))
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
     return user
 
 
-def login_user(db: Session, email: str, password: str) -> TokenResponse:
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+async def login_user(db: AsyncSession, email: str, password: str) -> TokenResponse:
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    verified, new_hash = await verify_and_update_async(password, user.hashed_password)
+    if not verified:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account disabled")
+    if new_hash:
+        # Stored with an older cost factor; upgrade while we have the plain password
+        user.hashed_password = new_hash
+        await db.commit()
     return TokenResponse(
         access_token=create_access_token(user.id),
         refresh_token=create_refresh_token(user.id),
     )
+
+
+async def deactivate_user(db: AsyncSession, user: User) -> None:
+    """Disable the account and drop it from this process's active-user cache. Commits."""
+    user_id = user.id
+    user.is_active = False
+    await db.commit()
+    active_users.invalidate(user_id)
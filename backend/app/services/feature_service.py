@@ -0,0 +1,152 @@
+"""
+Per-user feature vectors for the matching engine.
+
+Every profile or availability write rebuilds the user's row in
+profile_features (refresh_features), so matching never re-derives
+normalized keys, goal tokens or schedule bitmaps from raw rows.
+Rows are stored in compact binary form and decoded into FeatureVector.
+"""
+
+import zlib
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.models.availability import Availability
+from app.models.profile import Profile
+from app.models.profile_features import ProfileFeatures
+from app.services.schedule import BITMAP_WORDS, schedule_bitmap, to_intervals, total_minutes
+
+# Explicit little-endian layouts for the binary columns
+_TOKEN_DTYPE = np.dtype("<u4")
+_WORD_DTYPE = np.dtype("<u8")
+
+_EMPTY_TOKENS = np.zeros(0, dtype=np.uint32)
+_EMPTY_SCHEDULE = np.zeros(BITMAP_WORDS, dtype=np.uint64)
+
+
+def normalize_key(value: str | None) -> str:
+    """Blocking key for sport / city: trimmed, lowercased, inner whitespace collapsed."""
+    return " ".join(value.lower().split()) if value else ""
+
+
+def goal_token_ids(goals: str | None) -> np.ndarray:
+    """Sorted unique 32-bit ids of the lowercased goal words."""
+    if not goals:
+        return _EMPTY_TOKENS
+    ids = {zlib.crc32(word.encode()) for word in goals.lower().split()}
+    return np.array(sorted(ids), dtype=np.uint32)
+
+
+@dataclass(frozen=True)
+class FeatureVector:
+    user_id: str
+    sport_key: str
+    city_key: str           # "" when the athlete has no city
+    skill_level: int
+    weight: float | None
+    experience_years: int | None
+    goal_ids: np.ndarray    # sorted uint32 token ids
+    schedule: np.ndarray    # uint64[BITMAP_WORDS], one bit per minute of the week
+    schedule_minutes: int
+
+
+def build_features(profile: Profile, slots: Sequence[Availability] = ()) -> FeatureVector:
+    intervals = to_intervals(slots)
+    return FeatureVector(
+        user_id=profile.user_id,
+        sport_key=normalize_key(profile.sport),
+        city_key=normalize_key(profile.city),
+        skill_level=profile.skill_level,
+        weight=profile.weight,
+        experience_years=profile.experience_years,
+        goal_ids=goal_token_ids(profile.goals),
+        schedule=schedule_bitmap(intervals) if intervals else _EMPTY_SCHEDULE,
+        schedule_minutes=total_minutes(intervals),
+    )
+
+
+def feature_row(features: FeatureVector) -> dict:
+    """Column values of the profile_features row for `features`."""
+    return dict(
+        user_id=features.user_id,
+        sport_key=features.sport_key,
+        city_key=features.city_key,
+        skill_level=features.skill_level,
+        weight=features.weight,
+        experience_years=features.experience_years,
+        goal_tokens=features.goal_ids.astype(_TOKEN_DTYPE).tobytes(),
+        # An empty schedule is stored as no bytes at all
+        schedule=features.schedule.astype(_WORD_DTYPE).tobytes() if features.schedule_minutes else b"",
+        schedule_minutes=features.schedule_minutes,
+    )
+
+
+def _from_row(row: ProfileFeatures) -> FeatureVector:
+    schedule = np.frombuffer(row.schedule, dtype=_WORD_DTYPE).astype(np.uint64) if row.schedule else _EMPTY_SCHEDULE
+    return FeatureVector(
+        user_id=row.user_id,
+        sport_key=row.sport_key,
+        city_key=row.city_key,
+        skill_level=row.skill_level,
+        weight=row.weight,
+        experience_years=row.experience_years,
+        goal_ids=np.frombuffer(row.goal_tokens, dtype=_TOKEN_DTYPE).astype(np.uint32),
+        schedule=schedule,
+        schedule_minutes=row.schedule_minutes,
+    )
+
+
+def refresh_features(db: Session, user_id: str) -> FeatureVector | None:
+    """
+    Rebuild the stored features for `user_id` from their profile and slots.
+    Call before committing a profile or availability change so both land in
+    the same transaction. Does not commit; returns None without a profile.
+    """
+    db.flush()
+    profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+    row = db.get(ProfileFeatures, user_id)
+    if profile is None:
+        if row is not None:
+            db.delete(row)
+        return None
+
+    slots = db.query(Availability).filter(Availability.user_id == user_id).all()
+    features = build_features(profile, slots)
+    values = feature_row(features)
+    if row is None:
+        db.add(ProfileFeatures(**values))
+    else:
+        for field, value in values.items():
+            setattr(row, field, value)
+    return features
+
+
+def load_features(db: Session, user_ids: Sequence[str]) -> dict[str, FeatureVector]:
+    """
+    Stored features for `user_ids`, keyed by user id. Users without a stored
+    row (profiles that predate the table) are built and saved on the way.
+    """
+    rows = db.query(ProfileFeatures).filter(ProfileFeatures.user_id.in_(user_ids)).all()
+    found = {row.user_id: _from_row(row) for row in rows}
+    for user_id in user_ids:
+        if user_id not in found:
+            features = refresh_features(db, user_id)
+            if features is not None:
+                found[user_id] = features
+    return found
+
+
+def rebuild_all_features(db: Session) -> int:
+    """Rebuild features for every profile (backfill after migrating). Commits."""
+    user_ids = [user_id for (user_id,) in db.query(Profile.user_id)]
+    for user_id in user_ids:
+        refresh_features(db, user_id)
+    db.commit()
+    return len(user_ids)
+
+
+def decode_features(rows: Sequence[ProfileFeatures]) -> list[FeatureVector]:
+    return [_from_row(row) for row in rows]
@@ -0,0 +1,129 @@
+"""
+In-process background jobs for matchmaking.
+
+Jobs run on a small thread pool with their own DB session. Each user has at
+most one queued or running job; submitting again returns the active one.
+Finished jobs are kept for MATCH_JOB_TTL_SECONDS so clients can poll them.
+"""
+
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.schemas.match import MatchOut
+from app.services.matchmaking_service import run_matchmaking
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MatchJob:
+    user_id: str
+    id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    status: str = "queued"  # queued / running / done / failed
+    stage: str = "queued"
+    progress_done: int = 0
+    progress_total: int = 0
+    results: list[MatchOut] = field(default_factory=list)
+    error: str | None = None
+    finished_at: float | None = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+
+_lock = threading.Lock()
+_jobs: dict[str, MatchJob] = {}
+_active_by_user: dict[str, str] = {}
+_executor: ThreadPoolExecutor | None = None
+
+# Overridable in tests
+session_factory = SessionLocal
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.MATCH_JOB_WORKERS, thread_name_prefix="match-job"
+        )
+    return _executor
+
+
+def _prune(now: float) -> None:
+    expired = [
+        job_id for job_id, job in _jobs.items()
+        if job.finished_at is not None and now - job.finished_at > settings.MATCH_JOB_TTL_SECONDS
+    ]
+    for job_id in expired:
+        del _jobs[job_id]
+
+
+def submit(user_id: str) -> MatchJob:
+    """Queue a matchmaking run for the user, or return their active job."""
+    with _lock:
+        _prune(time.time())
+        active_id = _active_by_user.get(user_id)
+        if active_id and active_id in _jobs:
+            return _jobs[active_id]
+        job = MatchJob(user_id=user_id)
+        _jobs[job.id] = job
+        _active_by_user[user_id] = job.id
+    _get_executor().submit(_run, job)
+    return job
+
+
+def get(job_id: str) -> MatchJob | None:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+def _run(job: MatchJob) -> None:
+    def progress(stage: str, done: int, total: int, partial: list[MatchOut]) -> None:
+        with _lock:
+            job.stage = stage
+            job.progress_done, job.progress_total = done, total
+            if partial:
+                job.results = partial
+
+    with _lock:
+        job.status = job.stage = "running"
+    db = session_factory()
+    try:
+        results = run_matchmaking(db, job.user_id, progress)
+        with _lock:
+            job.results = results
+            job.progress_done = job.progress_total = len(results)
+            job.status = job.stage = "done"
+    except HTTPException as exc:
+        _fail(job, exc.detail)
+    except Exception:
+        logger.exception("Match job %s failed", job.id)
+        _fail(job, "Matchmaking failed")
+    finally:
+        db.close()
+        with _lock:
+            job.finished_at = time.time()
+            if _active_by_user.get(job.user_id) == job.id:
+                del _active_by_user[job.user_id]
+
+
+def _fail(job: MatchJob, error: str) -> None:
+    with _lock:
+        job.status = job.stage = "failed"
+        job.error = error
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,298 @@
+"""
+Process-wide scheduler for LLM calls.
+
+Every completion goes through LLMScheduler.call, which
+- waits for room in the requests-per-minute and tokens-per-minute token
+  buckets (LLM_RPM_LIMIT, LLM_TPM_LIMIT), serving the interactive lane
+  before the background lane;
+- retries 429s, 5xx, timeouts and connection errors with jittered
+  exponential backoff, never sooner than the server's Retry-After; a 429
+  also pauses every other caller for that long;
+- trips a circuit breaker after LLM_BREAKER_FAILURES consecutive outage
+  errors, so callers fall back to rule-only scoring immediately for
+  LLM_BREAKER_COOLDOWN_SECONDS instead of queueing behind a dead API.
+
+Requests run in the interactive lane unless wrapped in `background()`,
+as rescoring is; match jobs stay interactive since a user is waiting on
+them. Limits apply per process; divide the account limits by the number
+of worker processes.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Literal, TypeVar
+
+from openai import APIConnectionError, APIStatusError, InternalServerError, RateLimitError
+
+from app.core.config import settings
+from app.core.metrics import LLM_BREAKER_OPEN, LLM_QUEUE_WAIT, LLM_RETRIES
+
+T = TypeVar("T")
+Lane = Literal["interactive", "background"]
+LANES: tuple[Lane, ...] = ("interactive", "background")
+
+_lane: ContextVar[Lane] = ContextVar("llm_lane", default="interactive")
+
+
+class LLMUnavailable(Exception):
+    """No completion was attempted; the caller should fall back to the rule score."""
+
+    reason = "unavailable"
+
+
+class CircuitOpen(LLMUnavailable):
+    reason = "circuit_open"
+
+
+class DeadlineExceeded(LLMUnavailable):
+    reason = "deadline"
+
+
+@contextmanager
+def background() -> Iterator[None]:
+    """Run LLM calls made in this block (and threads copying its context) in the background lane."""
+    token = _lane.set("background")
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+class TokenBucket:
+    """`capacity` units refilled evenly over a minute; capacity 0 means unlimited."""
+
+    def __init__(self, capacity: int, now: float):
+        self.capacity = capacity
+        self.rate = capacity / 60.0
+        self.level = float(capacity)
+        self.updated = now
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if not self.capacity:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        if self.capacity:
+            self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        """Return (positive) or charge (negative) units once the real cost is known."""
+        if self.capacity:
+            self.level = min(self.capacity, self.level + amount)
+
+
+class CircuitBreaker:
+    def __init__(self, failures: int, cooldown: float):
+        self.threshold = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until: float | None = None
+        self.trial_in_flight = False
+
+    def check(self, now: float) -> None:
+        """Raise CircuitOpen unless a call could go through now; claims nothing."""
+        if self.open_until is not None and (now < self.open_until or self.trial_in_flight):
+            raise CircuitOpen("LLM circuit breaker is open")
+
+    def before_call(self, now: float) -> None:
+        """Claim the call about to be made; when half-open it becomes the single trial."""
+        self.check(now)
+        if self.open_until is not None:
+            self.trial_in_flight = True
+
+    def success(self) -> None:
+        self.failures = 0
+        self.open_until = None
+        self.trial_in_flight = False
+        LLM_BREAKER_OPEN.set(0)
+
+    def neutral(self) -> None:
+        """The call failed for a reason that says nothing about an outage (e.g. a 429)."""
+        self.trial_in_flight = False
+
+    def failure(self, now: float) -> None:
+        self.failures += 1
+        if self.trial_in_flight or self.failures >= self.threshold:
+            self.open_until = now + self.cooldown
+            LLM_BREAKER_OPEN.set(1)
+        self.trial_in_flight = False
+
+
+def retry_after(exc: Exception) -> float | None:
+    """Seconds the server asked us to wait, from Retry-After / retry-after-ms."""
+    if not isinstance(exc, APIStatusError):
+        return None
+    headers = exc.response.headers
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[name]) * scale
+        except (KeyError, ValueError):
+            continue
+    return None
+
+
+def _is_outage(exc: Exception) -> bool:
+    # APITimeoutError is an APIConnectionError
+    return isinstance(exc, (APIConnectionError, InternalServerError))
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        rpm: int,
+        tpm: int,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+        breaker_failures: int,
+        breaker_cooldown: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        now = clock()
+        self.requests = TokenBucket(rpm, now)
+        self.tokens = TokenBucket(tpm, now)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = CircuitBreaker(breaker_failures, breaker_cooldown)
+        self.clock = clock
+        self.sleep = sleep
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        self._waiting: dict[Lane, deque] = {lane: deque() for lane in LANES}
+
+    # ── Admission ─────────────────────────────────────────────────────────────
+
+    def _my_turn(self, ticket: object, lane: Lane) -> bool:
+        for other in LANES:
+            if other == lane:
+                return self._waiting[lane][0] is ticket
+            if self._waiting[other]:
+                return False
+        return False
+
+    def _acquire(self, lane: Lane, tokens: int, deadline: float | None) -> None:
+        """Block until the buckets admit one request of `tokens` tokens in `lane`."""
+        ticket = object()
+        started = self.clock()
+        with self._cond:
+            self._waiting[lane].append(ticket)
+            try:
+                while True:
+                    now = self.clock()
+                    self.breaker.check(now)
+                    wait = None
+                    if self._my_turn(ticket, lane):
+                        wait = max(
+                            self.paused_until - now,
+                            self.requests.wait_time(1, now),
+                            self.tokens.wait_time(tokens, now),
+                        )
+                        if wait <= 0:
+                            # Only an admitted call may become the half-open trial
+                            self.breaker.before_call(now)
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                    if deadline is not None:
+                        if now >= deadline or (wait is not None and now + wait > deadline):
+                            raise DeadlineExceeded("no LLM capacity before the deadline")
+                        wait = min(wait, deadline - now) if wait is not None else deadline - now
+                    self._cond.wait(wait)
+            finally:
+                self._waiting[lane].remove(ticket)
+                self._cond.notify_all()
+        LLM_QUEUE_WAIT.labels(lane).observe(self.clock() - started)
+
+    # ── Calls ─────────────────────────────────────────────────────────────────
+
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        jittered = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        floor = retry_after(exc)
+        return jittered if floor is None else floor + random.uniform(0, self.backoff_base)
+
+    def call(self, fn: Callable[[float], T], tokens: int, deadline: float | None = None) -> T:
+        """
+        Run `fn(timeout)` once admitted, retrying transient failures.
+        Raises LLMUnavailable if the call cannot be made (breaker open,
+        deadline), or the last OpenAIError once retries are exhausted.
+        """
+        lane = _lane.get()
+        for attempt in range(self.max_retries + 1):
+            self._acquire(lane, tokens, deadline)
+            timeout = settings.AI_CALL_TIMEOUT
+            if deadline is not None:
+                timeout = max(0.1, min(timeout, deadline - self.clock()))
+            try:
+                result = fn(timeout)
+            except (RateLimitError, APIConnectionError, InternalServerError) as exc:
+                delay = self._backoff(attempt, exc)
+                with self._cond:
+                    if _is_outage(exc):
+                        self.breaker.failure(self.clock())
+                    else:
+                        self.breaker.neutral()
+                        # Everyone waits out a rate limit, not just this caller
+                        self.paused_until = max(self.paused_until, self.clock() + delay)
+                    self._cond.notify_all()
+                LLM_RETRIES.labels(type(exc).__name__).inc()
+                out_of_time = deadline is not None and self.clock() + delay >= deadline
+                if attempt == self.max_retries or out_of_time or self.breaker.open_until is not None:
+                    raise
+                self.sleep(delay)
+                continue
+            except BaseException:
+                # Never leave a half-open trial claimed by a call that is gone
+                with self._cond:
+                    self.breaker.neutral()
+                raise
+
+            with self._cond:
+                self.breaker.success()
+                used = getattr(getattr(result, "usage", None), "total_tokens", None)
+                if isinstance(used, int):
+                    self.tokens.adjust(tokens - used)
+                self._cond.notify_all()
+            return result
+        raise AssertionError("unreachable")
+
+
+_scheduler: LLMScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                rpm=settings.LLM_RPM_LIMIT,
+                tpm=settings.LLM_TPM_LIMIT,
+                max_retries=settings.LLM_MAX_RETRIES,
+                backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+                backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+                breaker_failures=settings.LLM_BREAKER_FAILURES,
+                breaker_cooldown=settings.LLM_BREAKER_COOLDOWN_SECONDS,
+            )
+        return _scheduler
+
+
+def reset() -> None:
+    """Drop the shared scheduler so the next call picks up current settings."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = None
+    LLM_BREAKER_OPEN.set(0)
@@ -4,43 +4,51 @@ Rule-based compatibility scoring before AI refinement.
 Score breakdown:
   30% skill similarity
   20% goal similarity       (binary: same goal keywords)
-  20% schedule overlap
+  20% schedule overlap      (shared minutes / combined minutes per week)
   15% weight proximity
   15% experience similarity
+
+Scoring reads only precomputed FeatureVectors (see feature_service).
+score_features / features_pass_filters score one pair at a time;
+score_many does the same for one athlete against a CandidatePool using
+NumPy arrays, and returns identical values. compute_rule_score and
+passes_hard_filters are the same rules applied to profile objects.
 """
 
+import heapq
+from collections.abc import Sequence
+
+import numpy as np
+
 from app.models.profile import Profile
 from app.models.availability import Availability
+from app.services.feature_service import FeatureVector, build_features
+from app.services.schedule import BITMAP_WORDS, popcount64
 
 
-def _skill_score(a: Profile, b: Profile) -> float:
+def _skill_score(a: FeatureVector, b: FeatureVector) -> float:
     diff = abs(a.skill_level - b.skill_level)
     # diff=0 → 100, diff=2 → 0 (hard filter already ensures diff ≤ 2)
     return max(0.0, 1.0 - diff / 2.0) * 100
 
 
-def _goal_score(a: Profile, b: Profile) -> float:
-    if not a.goals or not b.goals:
+def _goal_score(a: FeatureVector, b: FeatureVector) -> float:
+    if not a.goal_ids.size or not b.goal_ids.size:
         return 50.0
-    a_words = set(a.goals.lower().split())
-    b_words = set(b.goals.lower().split())
-    if not a_words or not b_words:
-        return 50.0
-    overlap = len(a_words & b_words) / max(len(a_words | b_words), 1)
+    shared = np.intersect1d(a.goal_ids, b.goal_ids, assume_unique=True).size
+    overlap = shared / max(a.goal_ids.size + b.goal_ids.size - shared, 1)
     return overlap * 100
 
 
-def _schedule_score(a_slots: list[Availability], b_slots: list[Availability]) -> float:
-    if not a_slots or not b_slots:
+def _schedule_score(a: FeatureVector, b: FeatureVector) -> float:
+    if not a.schedule_minutes or not b.schedule_minutes:
         return 0.0
-    a_set = {(s.day_of_week, s.start_time, s.end_time) for s in a_slots}
-    b_set = {(s.day_of_week, s.start_time, s.end_time) for s in b_slots}
-    overlap = len(a_set & b_set)
-    union = len(a_set | b_set)
-    return (overlap / union) * 100 if union else 0.0
+    overlap = int(popcount64(a.schedule & b.schedule).sum())
+    union = a.schedule_minutes + b.schedule_minutes - overlap
+    return (overlap / union) * 100
 
 
-def _weight_score(a: Profile, b: Profile) -> float:
+def _weight_score(a: FeatureVector, b: FeatureVector) -> float:
     if a.weight is None or b.weight is None:
         return 50.0
     diff = abs(a.weight - b.weight)
@@ -48,34 +56,160 @@ def _weight_score(a: Profile, b: Profile) -> float:
     return max(0.0, 1.0 - diff / 25.0) * 100
 
 
-def _experience_score(a: Profile, b: Profile) -> float:
+def _experience_score(a: FeatureVector, b: FeatureVector) -> float:
     if a.experience_years is None or b.experience_years is None:
         return 50.0
     diff = abs(a.experience_years - b.experience_years)
     return max(0.0, 1.0 - diff / 10.0) * 100
 
 
-def compute_rule_score(
-    a: Profile,
-    b: Profile,
-    a_slots: list[Availability],
-    b_slots: list[Availability],
-) -> float:
+def score_features(a: FeatureVector, b: FeatureVector) -> float:
     return (
         0.30 * _skill_score(a, b)
         + 0.20 * _goal_score(a, b)
-        + 0.20 * _schedule_score(a_slots, b_slots)
+        + 0.20 * _schedule_score(a, b)
         + 0.15 * _weight_score(a, b)
         + 0.15 * _experience_score(a, b)
     )
 
 
-def passes_hard_filters(a: Profile, b: Profile) -> bool:
-    """Return True if two profiles should even be considered for matching."""
-    if a.sport.lower() != b.sport.lower():
+def features_pass_filters(a: FeatureVector, b: FeatureVector) -> bool:
+    """Return True if two athletes should even be considered for matching."""
+    if a.sport_key != b.sport_key:
         return False
     if abs(a.skill_level - b.skill_level) > 2:
         return False
-    if a.city and b.city and a.city.lower() != b.city.lower():
+    if a.city_key and b.city_key and a.city_key != b.city_key:
         return False
     return True
+
+
+def compute_rule_score(
+    a: Profile,
+    b: Profile,
+    a_slots: list[Availability],
+    b_slots: list[Availability],
+) -> float:
+    return score_features(build_features(a, a_slots), build_features(b, b_slots))
+
+
+def passes_hard_filters(a: Profile, b: Profile) -> bool:
+    return features_pass_filters(build_features(a), build_features(b))
+
+
+def split_for_refinement(
+    scored: list[tuple[Profile, float]], top_k: int, min_score: float
+) -> tuple[list[tuple[Profile, float]], list[tuple[Profile, float]]]:
+    """
+    Two-stage ranking: return (to_refine, rule_only).
+
+    to_refine holds at most `top_k` candidates with the highest rule scores,
+    restricted to those scoring at least `min_score`. The rest stay
+    rule-only, so AI cost per request is bounded regardless of pool size.
+    """
+    eligible = [i for i, (_, score) in enumerate(scored) if score >= min_score]
+    top = set(heapq.nlargest(top_k, eligible, key=lambda i: scored[i][1])) if top_k > 0 else set()
+    to_refine = [pair for i, pair in enumerate(scored) if i in top]
+    rule_only = [pair for i, pair in enumerate(scored) if i not in top]
+    return to_refine, rule_only
+
+
+# ── Vectorized one-vs-many scoring ────────────────────────────────────────────
+
+def _nullable(values: list) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+class CandidatePool:
+    """
+    Column-oriented snapshot of candidate feature vectors for score_many.
+
+    Build it once per candidate set; scoring any number of athletes against
+    it is then pure array arithmetic.
+    """
+
+    def __init__(self, features: Sequence[FeatureVector]):
+        self.features = list(features)
+        self.user_ids = [f.user_id for f in self.features]
+        self.sport = np.array([f.sport_key for f in self.features], dtype=object)
+        self.city = np.array([f.city_key for f in self.features], dtype=object)
+        self.skill = np.array([f.skill_level for f in self.features], dtype=np.int64)
+        self.weight = _nullable([f.weight for f in self.features])
+        self.experience = _nullable([f.experience_years for f in self.features])
+        # Goal token ids of every candidate, flattened, with their row numbers
+        self.goal_sizes = np.array([f.goal_ids.size for f in self.features], dtype=np.int64)
+        self.goal_ids = np.concatenate([f.goal_ids for f in self.features]) if self.features else np.zeros(0, np.uint32)
+        self.goal_rows = np.repeat(np.arange(len(self.features)), self.goal_sizes)
+        self.goal_offsets = np.concatenate([[0], np.cumsum(self.goal_sizes)])
+        # One bit per minute of the week per candidate
+        self.schedule = (
+            np.stack([f.schedule for f in self.features])
+            if self.features
+            else np.zeros((0, BITMAP_WORDS), dtype=np.uint64)
+        )
+        self.schedule_minutes = np.array([f.schedule_minutes for f in self.features], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.features)
+
+    def window(self, start: int, stop: int) -> "CandidatePool":
+        """Candidates [start, stop) as a pool, sliced from this one's arrays."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        stop = max(start, stop)
+        part = CandidatePool.__new__(CandidatePool)
+        part.features = self.features[start:stop]
+        part.user_ids = self.user_ids[start:stop]
+        for name in ("sport", "city", "skill", "weight", "experience", "goal_sizes", "schedule", "schedule_minutes"):
+            setattr(part, name, getattr(self, name)[start:stop])
+        lo, hi = self.goal_offsets[start], self.goal_offsets[stop]
+        part.goal_ids = self.goal_ids[lo:hi]
+        part.goal_rows = self.goal_rows[lo:hi] - start
+        part.goal_offsets = self.goal_offsets[start:stop + 1] - lo
+        return part
+
+
+def _proximity(a_value, b_values: np.ndarray, scale: float) -> np.ndarray:
+    if a_value is None:
+        return np.full(len(b_values), 50.0)
+    closeness = np.maximum(0.0, 1.0 - np.abs(a_value - b_values) / scale) * 100
+    return np.where(np.isnan(b_values), 50.0, closeness)
+
+
+def score_many(a: FeatureVector, pool: CandidatePool) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Score `a` against every candidate in `pool`.
+    Returns (passes, scores): the features_pass_filters mask and the
+    score_features value for each candidate, in pool order.
+    """
+    n = len(pool)
+    if n == 0:
+        return np.zeros(0, dtype=bool), np.zeros(0)
+
+    skill_diff = np.abs(a.skill_level - pool.skill)
+    passes = (pool.sport == a.sport_key) & (skill_diff <= 2)
+    if a.city_key:
+        passes &= (pool.city == "") | (pool.city == a.city_key)
+
+    skill = np.maximum(0.0, 1.0 - skill_diff / 2.0) * 100
+
+    if a.goal_ids.size:
+        shared = np.bincount(pool.goal_rows[np.isin(pool.goal_ids, a.goal_ids)], minlength=n)
+        union = a.goal_ids.size + pool.goal_sizes - shared
+        goal = np.where(pool.goal_sizes > 0, shared / np.maximum(union, 1) * 100, 50.0)
+    else:
+        goal = np.full(n, 50.0)
+
+    if a.schedule_minutes:
+        # Only the words where `a` has availability can contribute overlap
+        words = np.flatnonzero(a.schedule)
+        shared = popcount64(pool.schedule[:, words] & a.schedule[words]).sum(axis=1)
+        union = a.schedule_minutes + pool.schedule_minutes - shared
+        schedule = np.where(pool.schedule_minutes > 0, shared / np.maximum(union, 1) * 100, 0.0)
+    else:
+        schedule = np.zeros(n)
+
+    weight = _proximity(a.weight, pool.weight, 25.0)
+    experience = _proximity(a.experience_years, pool.experience, 10.0)
+
+    scores = 0.30 * skill + 0.20 * goal + 0.20 * schedule + 0.15 * weight + 0.15 * experience
+    return passes, scores
@@ -0,0 +1,340 @@
+"""
+Matchmaking pipeline shared by POST /match/find and background match jobs.
+
+Stages: load candidates → rule scoring → AI refinement → persistence.
+stream_matchmaking saves rule-only results first and refines them after,
+for clients that render matches progressively. rescore_user keeps stored
+pending matches current after a profile edit (see rescore_service).
+"""
+
+from collections.abc import Callable, Iterator
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import timed
+from app.core.profiling import note
+from app.models.match import Match, MatchStatus, make_pair_key
+from app.models.profile import Profile
+from app.models.profile_features import ProfileFeatures
+from app.schemas.match import MatchOut
+from app.services.ai_service import is_brief, iter_refine, prompt_version, refine_many
+from app.services.feature_service import (
+    FeatureVector,
+    decode_features,
+    load_features,
+    normalize_key,
+    refresh_features,
+)
+from app.services.matching_service import (
+    CandidatePool,
+    features_pass_filters,
+    score_features,
+    score_many,
+    split_for_refinement,
+)
+
+# Dialect-specific INSERT constructs that support ON CONFLICT
+_DIALECT_INSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def dialect_insert(db: Session):
+    """The INSERT construct with ON CONFLICT support for the session's database."""
+    return _DIALECT_INSERTS[db.get_bind().dialect.name]
+
+# progress(stage, done, total, partial_results)
+ProgressCallback = Callable[[str, int, int, list[MatchOut]], None]
+
+
+def candidate_features(db: Session, profile: Profile) -> tuple[FeatureVector, list[FeatureVector]]:
+    """
+    Return the profile's own features and those of every candidate that can
+    pass the hard filters.
+
+    Hard filters (sport, skill window, city) are range lookups on the
+    normalized blocking index of profile_features, so only eligible
+    candidates are read; the user's own row comes back in the same query.
+    """
+    user_id = profile.user_id
+    candidate_filters = [
+        ProfileFeatures.user_id != user_id,
+        ProfileFeatures.sport_key == normalize_key(profile.sport),
+        ProfileFeatures.skill_level.between(profile.skill_level - 2, profile.skill_level + 2),
+    ]
+    city_key = normalize_key(profile.city)
+    if city_key:
+        candidate_filters.append(ProfileFeatures.city_key.in_(["", city_key]))
+    rows = db.query(ProfileFeatures).filter(or_(ProfileFeatures.user_id == user_id, and_(*candidate_filters))).all()
+    features = decode_features(rows)
+    mine = next((f for f in features if f.user_id == user_id), None) or refresh_features(db, user_id)
+    return mine, [f for f in features if f.user_id != user_id]
+
+
+def _load_scored(
+    db: Session, user_id: str
+) -> tuple[Profile, list[tuple[Profile, float]], dict[str, Match]]:
+    """
+    Return the user's profile, every eligible (candidate, rule_score) pair,
+    and the already existing matches keyed by the other user's id.
+    """
+    my_profile = db.query(Profile).filter(Profile.user_id == user_id).first()
+    if not my_profile:
+        raise HTTPException(status_code=400, detail="Complete your profile before matchmaking")
+
+    mine, candidates = candidate_features(db, my_profile)
+    with timed("scoring"):
+        pool = CandidatePool(candidates)
+        passes, scores = score_many(mine, pool)
+    score_by_user = {uid: float(score) for uid, ok, score in zip(pool.user_ids, passes, scores) if ok}
+
+    # Profiles are only needed for the prompt and the response, not for scoring
+    candidates = (
+        db.query(Profile).filter(Profile.user_id.in_(score_by_user)).all() if score_by_user else []
+    )
+    scored = [(c, score_by_user[c.user_id]) for c in candidates]
+    candidate_ids = [c.user_id for c, _ in scored]
+
+    # One index probe per pair for matches that already exist in either direction
+    existing_by_user: dict[str, Match] = {}
+    if candidate_ids:
+        pair_keys = [make_pair_key(user_id, cid) for cid in candidate_ids]
+        for m in db.query(Match).filter(Match.pair_key.in_(pair_keys)):
+            other_id = m.user_b_id if m.user_a_id == user_id else m.user_a_id
+            existing_by_user[other_id] = m
+
+    note(
+        athlete=dict(
+            sport_key=mine.sport_key, has_city=bool(mine.city_key), skill_level=mine.skill_level,
+            goal_count=len(mine.goal_ids), schedule_minutes=mine.schedule_minutes,
+        ),
+        pool=dict(candidates=len(pool.user_ids), eligible=len(scored), existing=len(existing_by_user)),
+    )
+    return my_profile, scored, existing_by_user
+
+
+def _bulk_verbosity() -> str:
+    return settings.AI_BULK_VERBOSITY
+
+
+def _ai_fields(rule_score: float, ai_result: dict | None, verbosity: str = "full") -> dict:
+    """Score and analysis columns; ai_result None means a rule-only match."""
+    ai_result = ai_result or {}
+    refined = bool(ai_result) and not ai_result.get("_fallback")
+    return dict(
+        compatibility_score=ai_result.get("compatibility_score", rule_score),
+        ai_refined=refined,
+        ai_reasoning=ai_result.get("reasoning"),
+        risks=ai_result.get("risks"),
+        strengths=ai_result.get("strengths"),
+        prompt_version=prompt_version(verbosity) if refined else None,
+    )
+
+
+def _match_row(
+    user_id: str, candidate: Profile, rule_score: float, ai_result: dict | None, verbosity: str = "full"
+) -> dict:
+    return dict(
+        user_a_id=user_id,
+        user_b_id=candidate.user_id,
+        pair_key=make_pair_key(user_id, candidate.user_id),
+        rule_score=rule_score,
+        status=MatchStatus.pending,
+        **_ai_fields(rule_score, ai_result, verbosity),
+    )
+
+
+def _apply_refinement(match: Match, ai_result: dict, verbosity: str = "full") -> None:
+    for field, value in _ai_fields(match.rule_score, ai_result, verbosity).items():
+        setattr(match, field, value)
+
+
+def _split(scored: list[tuple[Profile, float]]) -> tuple[list, list]:
+    return split_for_refinement(scored, settings.AI_REFINE_TOP_K, settings.AI_REFINE_MIN_SCORE)
+
+
+def run_matchmaking(db: Session, user_id: str, progress: ProgressCallback | None = None) -> list[MatchOut]:
+    """Run matching for a user, persist new matches and return all of them sorted by score."""
+    report = progress or (lambda stage, done, total, partial: None)
+    report("scoring", 0, 0, [])
+    my_profile, scored, existing_by_user = _load_scored(db, user_id)
+
+    results = []
+    new_candidates: list[tuple[Profile, float]] = []
+    for candidate, rule_score in scored:
+        existing = existing_by_user.get(candidate.user_id)
+        if existing:
+            results.append(existing)
+            continue
+        new_candidates.append((candidate, rule_score))
+    report("refining", len(results), len(scored), [MatchOut.model_validate(m) for m in results])
+
+    # Only the best rule-scored candidates go to the LLM, for a brief analysis
+    # by default; the rest are stored rule-only. Either is expanded to a full
+    # analysis when the user opens it. AI refinement runs concurrently and
+    # stragglers fall back to the rule score.
+    to_refine, rule_only = _split(new_candidates)
+    verbosity = _bulk_verbosity()
+    note(refinement=dict(new=len(new_candidates), to_refine=len(to_refine), rule_only=len(rule_only)))
+    with timed("ai"):
+        ai_results = refine_many(my_profile, to_refine, db, verbosity)
+    report("saving", len(scored), len(scored), [])
+
+    rows = [
+        _match_row(user_id, candidate, rule_score, ai_result, verbosity)
+        for (candidate, rule_score), ai_result in zip(to_refine, ai_results)
+    ]
+    rows += [_match_row(user_id, candidate, rule_score, None) for candidate, rule_score in rule_only]
+    results.extend(insert_matches(db, rows))
+
+    results.sort(key=lambda m: m.compatibility_score or 0, reverse=True)
+    # Serialize before committing so expired instances aren't reloaded one by one
+    response = [MatchOut.model_validate(m) for m in results]
+    db.commit()
+    return response
+
+
+def stream_matchmaking(db: Session, user_id: str) -> Iterator[tuple[str, MatchOut]]:
+    """
+    Progressive variant of run_matchmaking.
+
+    Yields ("match", match) for existing matches and for new matches saved
+    with their rule score, best first, then ("update", match) as each AI
+    refinement lands. Everything is committed once at the end, including
+    when the consumer stops early.
+    """
+    my_profile, scored, existing_by_user = _load_scored(db, user_id)
+
+    new_candidates = [(c, score) for c, score in scored if c.user_id not in existing_by_user]
+    new_matches = insert_matches(db, [_match_row(user_id, c, score, None) for c, score in new_candidates])
+    to_refine, _ = _split(new_candidates)
+
+    first_pass = [*existing_by_user.values(), *new_matches]
+    first_pass.sort(key=lambda m: m.compatibility_score or 0, reverse=True)
+    # Pairs saved concurrently by another request keep their existing result
+    by_pair = {m.pair_key: m for m in new_matches if not m.ai_refined}
+    try:
+        for m in first_pass:
+            yield "match", MatchOut.model_validate(m)
+
+        verbosity = _bulk_verbosity()
+        for i, ai_result in iter_refine(my_profile, to_refine, db, verbosity):
+            match = by_pair.get(make_pair_key(user_id, to_refine[i][0].user_id))
+            if match is None:
+                continue
+            _apply_refinement(match, ai_result, verbosity)
+            db.flush()
+            yield "update", MatchOut.model_validate(match)
+    except GeneratorExit:
+        # Client went away; keep the matches and refinements we already have
+        db.commit()
+        raise
+    db.commit()
+
+
+def refine_match(db: Session, match: Match, user_id: str) -> Match:
+    """
+    Lazily refine a rule-only or briefly analysed match from the point of
+    view of `user_id`, with full reasoning. Matches that already have a full
+    analysis are returned unchanged, and so are brief ones whose full
+    refinement falls back.
+    """
+    if match.ai_refined and not is_brief(match.prompt_version):
+        return match
+    other_id = match.user_b_id if match.user_a_id == user_id else match.user_a_id
+    profiles = {p.user_id: p for p in db.query(Profile).filter(Profile.user_id.in_([user_id, other_id]))}
+    if len(profiles) < 2:
+        return match
+
+    features = load_features(db, [user_id, other_id])
+    rule_score = score_features(features[user_id], features[other_id])
+
+    with timed("ai"):
+        [ai_result] = refine_many(profiles[user_id], [(profiles[other_id], rule_score)], db)
+    if ai_result.get("_fallback") and match.ai_refined:
+        return match
+    match.rule_score = rule_score
+    _apply_refinement(match, ai_result)
+    db.commit()
+    db.refresh(match)
+    return match
+
+
+def rescore_user(db: Session, user_id: str) -> dict[str, int]:
+    """
+    Recompute the rule score of every pending match involving `user_id`
+    after a profile or availability change. Commits.
+
+    - Rule-only matches take the new rule score as their compatibility score.
+    - AI-refined matches are refined again only when the rule score moved by
+      at least RESCORE_AI_DELTA, at the verbosity they were refined with; if
+      that refinement falls back, the match becomes rule-only and is refined
+      again when opened. A match stored without a rule score only records
+      the new one as its baseline.
+    - Matches that no longer pass the hard filters keep their row and get
+      the new rule score, but are never sent back to the LLM.
+
+    Returns counts per outcome: rescored, refined, filtered.
+    """
+    counts = {"rescored": 0, "refined": 0, "filtered": 0}
+    matches = db.query(Match).filter(
+        Match.status == MatchStatus.pending, or_(Match.user_a_id == user_id, Match.user_b_id == user_id)
+    ).all()
+    if not matches:
+        return counts
+
+    others = {m.user_b_id if m.user_a_id == user_id else m.user_a_id: m for m in matches}
+    features = load_features(db, [user_id, *others])
+    if user_id not in features:
+        return counts
+
+    to_refine: dict[str, list[tuple[str, float]]] = {}
+    for other_id, match in others.items():
+        if other_id not in features:
+            continue
+        a, b = features[match.user_a_id], features[match.user_b_id]
+        rule_score = score_features(a, b)
+        previous, match.rule_score = match.rule_score, rule_score
+        if not match.ai_refined:
+            match.compatibility_score = rule_score
+        if not features_pass_filters(a, b):
+            counts["filtered"] += 1
+            continue
+        counts["rescored"] += 1
+        if match.ai_refined and previous is not None and abs(rule_score - previous) >= settings.RESCORE_AI_DELTA:
+            verbosity = "brief" if is_brief(match.prompt_version) else "full"
+            to_refine.setdefault(verbosity, []).append((other_id, rule_score))
+
+    if to_refine:
+        wanted = [o for group in to_refine.values() for o, _ in group]
+        profiles = {p.user_id: p for p in db.query(Profile).filter(Profile.user_id.in_([user_id, *wanted]))}
+        for verbosity, group in to_refine.items():
+            pairs = [(profiles[o], score) for o, score in group if o in profiles]
+            if user_id not in profiles or not pairs:
+                continue
+            for (other, _), ai_result in zip(pairs, refine_many(profiles[user_id], pairs, db, verbosity)):
+                _apply_refinement(others[other.user_id], ai_result, verbosity)
+                counts["refined"] += 1
+    db.commit()
+    return counts
+
+
+def insert_matches(db: Session, rows: list[dict]) -> list[Match]:
+    """
+    Insert all new matches in one statement with ON CONFLICT (pair_key) DO
+    NOTHING. Pairs inserted concurrently by another request are loaded
+    instead, so every row comes back as a Match. Does not commit.
+    """
+    if not rows:
+        return []
+    insert = dialect_insert(db)
+    stmt = insert(Match).values(rows).on_conflict_do_nothing(index_elements=["pair_key"]).returning(Match)
+    inserted = list(db.scalars(stmt))
+    if len(inserted) < len(rows):
+        seen = {m.pair_key for m in inserted}
+        missing = [row["pair_key"] for row in rows if row["pair_key"] not in seen]
+        inserted.extend(db.query(Match).filter(Match.pair_key.in_(missing)))
+    return inserted
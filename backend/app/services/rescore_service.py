@@ -0,0 +1,124 @@
+"""
+Debounced rescoring of a user's pending matches after they edit their data.
+
+Profile and availability writes call mark_dirty(user_id). A single worker
+thread waits until a dirty user has been quiet for RESCORE_DEBOUNCE_SECONDS
+(or dirty for RESCORE_MAX_DELAY_SECONDS, for users who keep editing) and
+then runs rescore_user on its own DB session, so a burst of edits costs one
+rescoring pass. Its LLM calls go through the scheduler's background lane.
+
+Events live in this process only: edits still queued when the process
+stops are picked up by the nightly batch job, which rewrites every pair's
+rule score.
+"""
+
+import logging
+import threading
+import time
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.metrics import RESCORED_MATCHES
+from app.services import llm_scheduler
+from app.services.matchmaking_service import rescore_user
+
+logger = logging.getLogger(__name__)
+
+_cond = threading.Condition()
+# user id → (first marked, last marked), monotonic seconds
+_dirty: dict[str, tuple[float, float]] = {}
+_worker: threading.Thread | None = None
+_stopping = False
+
+# Overridable in tests
+session_factory = SessionLocal
+
+
+def mark_dirty(user_id: str) -> None:
+    """Schedule a rescoring pass for the user's pending matches."""
+    if not settings.RESCORE_ENABLED:
+        return
+    now = time.monotonic()
+    with _cond:
+        first, _ = _dirty.get(user_id, (now, now))
+        _dirty[user_id] = (first, now)
+        _ensure_worker()
+        _cond.notify()
+
+
+def _due_at(first: float, last: float) -> float:
+    return min(last + settings.RESCORE_DEBOUNCE_SECONDS, first + settings.RESCORE_MAX_DELAY_SECONDS)
+
+
+def _pop_due(now: float) -> tuple[list[str], float | None]:
+    """Remove and return the users due by `now`, and when the next one is due."""
+    due = [user_id for user_id, marks in _dirty.items() if _due_at(*marks) <= now]
+    for user_id in due:
+        del _dirty[user_id]
+    next_due = min((_due_at(*marks) for marks in _dirty.values()), default=None)
+    return due, next_due
+
+
+def _rescore(user_id: str) -> None:
+    db = session_factory()
+    try:
+        # Re-refinement yields to interactive /match/find calls
+        with llm_scheduler.background():
+            counts = rescore_user(db, user_id)
+        for outcome, n in counts.items():
+            RESCORED_MATCHES.labels(outcome).inc(n)
+        logger.info("Rescored pending matches of %s: %s", user_id, counts)
+    except Exception:
+        db.rollback()
+        logger.exception("Rescoring matches of %s failed", user_id)
+    finally:
+        db.close()
+
+
+def _run() -> None:
+    while True:
+        with _cond:
+            while True:
+                if _stopping:
+                    return
+                due, next_due = _pop_due(time.monotonic())
+                if due:
+                    break
+                _cond.wait(None if next_due is None else max(0.0, next_due - time.monotonic()))
+        for user_id in due:
+            _rescore(user_id)
+
+
+def _ensure_worker() -> None:
+    global _worker, _stopping
+    if _worker is None or not _worker.is_alive():
+        _stopping = False
+        _worker = threading.Thread(target=_run, name="rescore", daemon=True)
+        _worker.start()
+
+
+def drain() -> int:
+    """Rescore every dirty user now, regardless of debounce. Returns how many were processed."""
+    with _cond:
+        users = list(_dirty)
+        _dirty.clear()
+    for user_id in users:
+        _rescore(user_id)
+    return len(users)
+
+
+def pending() -> list[str]:
+    with _cond:
+        return list(_dirty)
+
+
+def shutdown() -> None:
+    """Stop the worker; users still waiting for their debounce are dropped."""
+    global _worker, _stopping
+    with _cond:
+        _stopping = True
+        _dirty.clear()
+        _cond.notify_all()
+    if _worker is not None:
+        _worker.join(timeout=5)
+        _worker = None
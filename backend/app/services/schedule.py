@@ -0,0 +1,95 @@
+"""
+Weekly availability as integer-minute intervals.
+
+A slot (day_of_week, "HH:MM", "HH:MM") becomes the half-open interval
+[day * 1440 + start, day * 1440 + end) in minutes since Monday 00:00.
+Intervals are kept sorted and merged, so overlap between two schedules is a
+linear two-pointer sweep. schedule_bitmap packs the same minutes into a
+bitmap of 64-bit words for the vectorized scorer.
+"""
+
+from collections.abc import Iterable, Sequence
+
+import numpy as np
+
+from app.models.availability import Availability
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+BITMAP_WORDS = -(-MINUTES_PER_WEEK // 64)  # 158 uint64 words, the last one padded
+
+Interval = tuple[int, int]
+
+
+def parse_hhmm(value: str) -> int:
+    """Minutes since midnight for "HH:MM" ("18:30" → 1110). Raises ValueError otherwise."""
+    hours, minutes = value.split(":")
+    h, m = int(hours), int(minutes)
+    if len(minutes) != 2 or not (0 <= h <= 23 and 0 <= m <= 59):
+        raise ValueError(f"invalid time {value!r}")
+    return h * 60 + m
+
+
+def format_hhmm(minute_of_day: int) -> str:
+    return f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+
+def merge_intervals(intervals: Iterable[Interval]) -> list[Interval]:
+    """Sort intervals and merge any that overlap or touch."""
+    merged: list[Interval] = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def to_intervals(slots: Sequence[Availability]) -> list[Interval]:
+    """Merged week-minute intervals for a user's slots; malformed slots are skipped."""
+    intervals = []
+    for s in slots:
+        try:
+            start, end = parse_hhmm(s.start_time), parse_hhmm(s.end_time)
+        except (ValueError, AttributeError):
+            continue
+        offset = s.day_of_week * MINUTES_PER_DAY
+        intervals.append((offset + start, offset + end))
+    return merge_intervals(intervals)
+
+
+def total_minutes(intervals: Sequence[Interval]) -> int:
+    return sum(end - start for start, end in intervals)
+
+
+def overlap_minutes(a: Sequence[Interval], b: Sequence[Interval]) -> int:
+    """Minutes covered by both merged interval lists (two-pointer sweep)."""
+    i = j = overlap = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if end > start:
+            overlap += end - start
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return overlap
+
+
+def schedule_bitmap(intervals: Sequence[Interval]) -> np.ndarray:
+    """One bit per minute of the week, packed into BITMAP_WORDS uint64s."""
+    dense = np.zeros(BITMAP_WORDS * 64, dtype=bool)
+    for start, end in intervals:
+        dense[start:end] = True
+    return np.packbits(dense).view(np.uint64)
+
+
+def popcount64(words: np.ndarray) -> np.ndarray:
+    """Number of set bits in each element of a uint64 array (SWAR)."""
+    x = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((x * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
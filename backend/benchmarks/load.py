@@ -0,0 +1,226 @@
+"""
+HTTP load test for a running backend.
+
+    python -m benchmarks.load [--base-url http://localhost:8000] [--users 50] [--concurrency 20]
+        [--duration 60] [--mix "recommended=5,profile=3,availability=2,find=1,update=1"]
+        [--mock-url http://localhost:8100] [--output load.json]
+
+Registers --users athletes with synthetic profiles and availability (see
+population.py), then runs --concurrency virtual users for --duration
+seconds. Each virtual user repeatedly picks a scenario from --mix and a
+random athlete and sends one request. The report gives p50/p95/p99
+latency, status codes and throughput per endpoint, for setup and for the
+run. With --mock-url, the mock OpenAI server's outcome counters for the
+run are included too.
+
+For a run without OpenAI costs, start the mock server and the backend with
+OPENAI_BASE_URL pointing at it:
+
+    python -m benchmarks.mock_openai --latency lognormal:0.8,0.5 --rpm 500 &
+    OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=sk-mock uvicorn app.main:app &
+    python -m benchmarks.load --mock-url http://localhost:8100
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.population import PopulationSpec, generate, parse_weights
+from benchmarks.stats import latency_stats
+
+_PASSWORD = "load-test-password"
+_PROFILE_FIELDS = ("name", "weight", "sport", "skill_level", "experience_years", "goals", "training_intensity", "city")
+
+
+@dataclass
+class Athlete:
+    email: str
+    token: str = ""
+    profile: dict = field(default_factory=dict)
+    slots: list[dict] = field(default_factory=list)
+
+
+class Recorder:
+    """Latency and status codes per endpoint name."""
+
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+
+    async def call(self, name: str, send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            resp = await send()
+            status = str(resp.status_code)
+        except httpx.HTTPError as exc:
+            resp, status = None, type(exc).__name__
+        self.samples[name].append(time.perf_counter() - started)
+        self.statuses[name][status] += 1
+        return resp
+
+    def report(self, seconds: float) -> dict:
+        endpoints = {}
+        for name in sorted(self.samples):
+            statuses = self.statuses[name]
+            errors = sum(n for status, n in statuses.items() if not status.startswith("2"))
+            endpoints[name] = {**latency_stats(self.samples[name]), "status": dict(statuses), "errors": errors}
+        requests = sum(len(s) for s in self.samples.values())
+        errors = sum(e["errors"] for e in endpoints.values())
+        return {
+            "seconds": round(seconds, 2),
+            "requests": requests,
+            "requests_per_s": round(requests / max(seconds, 1e-9), 2),
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+def _bearer(athlete: Athlete) -> dict:
+    return {"Authorization": f"Bearer {athlete.token}"}
+
+
+async def setup(client: httpx.AsyncClient, recorder: Recorder, athletes: list[Athlete], concurrency: int) -> None:
+    """Register, log in and create the profile and slots of every athlete."""
+    gate = asyncio.Semaphore(concurrency)
+
+    async def one(a: Athlete) -> None:
+        async with gate:
+            await recorder.call("POST /auth/register", lambda: client.post(
+                "/api/auth/register", json={"email": a.email, "password": _PASSWORD}))
+            resp = await recorder.call("POST /auth/login", lambda: client.post(
+                "/api/auth/login", data={"username": a.email, "password": _PASSWORD}))
+            if resp is None or resp.status_code != 200:
+                return
+            a.token = resp.json()["access_token"]
+            await recorder.call("POST /profiles", lambda: client.post(
+                "/api/profiles", json=a.profile, headers=_bearer(a)))
+            for slot in a.slots:
+                await recorder.call("POST /availability", lambda: client.post(
+                    "/api/availability", json=slot, headers=_bearer(a)))
+
+    await asyncio.gather(*(one(a) for a in athletes))
+
+
+def scenarios(client: httpx.AsyncClient) -> dict[str, tuple[str, Callable[[Athlete, random.Random], Awaitable]]]:
+    """Scenario name → (endpoint name, request factory)."""
+    return {
+        "recommended": ("GET /match/recommended", lambda a, rng: client.get(
+            "/api/match/recommended", params={"limit": 20}, headers=_bearer(a))),
+        "profile": ("GET /profiles/me", lambda a, rng: client.get("/api/profiles/me", headers=_bearer(a))),
+        "availability": ("GET /availability", lambda a, rng: client.get("/api/availability", headers=_bearer(a))),
+        "find": ("POST /match/find", lambda a, rng: client.post("/api/match/find", headers=_bearer(a))),
+        "update": ("PATCH /profiles/me", lambda a, rng: client.patch(
+            "/api/profiles/me", json={"skill_level": rng.randint(1, 10)}, headers=_bearer(a))),
+        "me": ("GET /users/me", lambda a, rng: client.get("/api/users/me", headers=_bearer(a))),
+    }
+
+
+async def run_load(client: httpx.AsyncClient, recorder: Recorder, athletes: list[Athlete],
+                   mix: dict[str, float], concurrency: int, duration: float, seed: int) -> None:
+    available = scenarios(client)
+    unknown = set(mix) - set(available)
+    if unknown:
+        raise SystemExit(f"unknown scenarios: {', '.join(sorted(unknown))} (choose from {', '.join(available)})")
+    names, weights = list(mix), list(mix.values())
+    deadline = time.monotonic() + duration
+
+    async def virtual_user(n: int) -> None:
+        rng = random.Random(seed * 1000 + n)
+        while time.monotonic() < deadline:
+            endpoint, request = available[rng.choices(names, weights=weights)[0]]
+            athlete = rng.choice(athletes)
+            await recorder.call(endpoint, lambda: request(athlete, rng))
+
+    await asyncio.gather(*(virtual_user(n) for n in range(concurrency)))
+
+
+async def _mock_stats(mock_url: str | None, reset: bool = False) -> dict | None:
+    if not mock_url:
+        return None
+    async with httpx.AsyncClient(base_url=mock_url, timeout=5) as client:
+        if reset:
+            await client.post("/stats/reset")
+            return None
+        return (await client.get("/stats")).json()
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    spec = PopulationSpec(size=args.users, sports=args.sports, cities=args.cities)
+    run_tag = uuid.uuid4().hex[:8]
+    athletes = [
+        Athlete(
+            email=f"load-{run_tag}-{i}@example.com",
+            profile={name: getattr(profile, name) for name in _PROFILE_FIELDS},
+            slots=[{"day_of_week": s.day_of_week, "start_time": s.start_time, "end_time": s.end_time} for s in slots],
+        )
+        for i, (profile, slots) in enumerate(generate(spec, args.seed))
+    ]
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        setup_recorder = Recorder()
+        started = time.perf_counter()
+        await setup(client, setup_recorder, athletes, args.concurrency)
+        setup_report = setup_recorder.report(time.perf_counter() - started)
+
+        ready = [a for a in athletes if a.token]
+        if not ready:
+            raise SystemExit("no athlete could log in; is the backend running at " + args.base_url + "?")
+
+        await _mock_stats(args.mock_url, reset=True)
+        recorder = Recorder()
+        started = time.perf_counter()
+        await run_load(client, recorder, ready, args.mix, args.concurrency, args.duration, args.seed)
+        run_report = recorder.report(time.perf_counter() - started)
+
+    return {
+        "benchmark": "load",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "base_url": args.base_url,
+        "users": len(ready),
+        "concurrency": args.concurrency,
+        "mix": args.mix,
+        "seed": args.seed,
+        "setup": setup_report,
+        "run": run_report,
+        "llm": await _mock_stats(args.mock_url),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Drive a running backend and report latency per endpoint.")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=50, help="athletes registered before the run")
+    parser.add_argument("--concurrency", type=int, default=20, help="virtual users sending requests in parallel")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds to run the mix for")
+    parser.add_argument("--mix", type=parse_weights, default="recommended=5,profile=3,availability=2,find=1,update=1",
+                        help="scenario weights: recommended, profile, availability, find, update, me")
+    parser.add_argument("--sports", type=parse_weights, default="boxing=3,judo=1",
+                        help="sport weights for the synthetic profiles")
+    parser.add_argument("--cities", type=parse_weights, default="Paris=2,Lyon=1",
+                        help="city weights for the synthetic profiles")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds before a request counts as failed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mock-url", help="mock OpenAI server whose counters to include")
+    parser.add_argument("--output", type=Path, help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    text = json.dumps(asyncio.run(main_async(args)), indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Login throughput at different bcrypt cost factors.
+
+    python -m benchmarks.login_throughput [--costs 10 11 12 13] [--seconds 2] [--workers N]
+
+For each cost, measures password verifications per second on one core and
+through a thread pool of --workers threads (bcrypt releases the GIL), and
+prints one JSON object per cost. A login is one verification, so
+`per_core` is the sustainable logins/s each core adds at that cost.
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+_PASSWORD = "correct horse battery staple"
+
+
+def _verifications(context: CryptContext, hashed: str, seconds: float) -> int:
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        context.verify(_PASSWORD, hashed)
+        done += 1
+    return done
+
+
+def measure(cost: int, seconds: float, workers: int) -> dict:
+    context = CryptContext(schemes=["bcrypt"], bcrypt__rounds=cost)
+    hashed = context.hash(_PASSWORD)
+
+    single = _verifications(context, hashed, seconds) / seconds
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        started = time.perf_counter()
+        totals = list(pool.map(lambda _: _verifications(context, hashed, seconds), range(workers)))
+        elapsed = time.perf_counter() - started
+    pooled = sum(totals) / elapsed
+
+    return {
+        "cost": cost,
+        "ms_per_login": round(1000 / single, 2) if single else None,
+        "per_core": round(single, 2),
+        "pool_workers": workers,
+        "pool_total": round(pooled, 2),
+        "pool_per_core": round(pooled / min(workers, os.cpu_count() or 1), 2),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--costs", type=int, nargs="+", default=[10, 11, 12, 13])
+    parser.add_argument("--seconds", type=float, default=2.0, help="measurement time per cost and mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    for cost in args.costs:
+        print(json.dumps(measure(cost, args.seconds, args.workers)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
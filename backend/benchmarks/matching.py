@@ -0,0 +1,226 @@
+"""
+Match-scoring benchmarks on a synthetic population.
+
+    python -m benchmarks.matching [--size 100000] [--db-size 20000] [--queries 50] [--output results.json]
+
+Stages, each timed per operation:
+
+  generate             build the population's feature vectors (--size athletes)
+  passes_hard_filters  scalar filter on random pairs
+  compute_rule_score   scalar score on random pairs
+  candidates_memory    in-memory blocking: same sport, compatible city, skill window
+  score_many           vectorized scoring of one athlete against its candidates
+  candidates_sql       the candidate_features query on a SQLite copy (--db-size athletes)
+  match_find           POST /match/find end to end with a stub LLM (--llm-latency seconds per call)
+
+The report is one JSON document with the environment, the population
+spec and per-stage latency percentiles, so runs can be diffed between
+releases. Populations over ~100k take a while to generate; --db-size
+bounds the part that is written to SQLite.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.population import PopulationSpec, generate, generate_features, load_population, parse_weights
+from benchmarks.stats import latency_stats as _stats
+
+
+def _timed(fn: Callable, items: Iterable) -> tuple[list[float], list]:
+    samples, results = [], []
+    for item in items:
+        started = time.perf_counter()
+        results.append(fn(item))
+        samples.append(time.perf_counter() - started)
+    return samples, results
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+# ── In-memory stages ──────────────────────────────────────────────────────────
+
+def bench_scalar(spec: PopulationSpec, seed: int, pairs: int) -> dict:
+    from app.services.matching_service import compute_rule_score, passes_hard_filters
+
+    sample_spec = PopulationSpec(**{**spec.__dict__, "size": min(spec.size, 2000)})
+    population = list(generate(sample_spec, seed + 1))
+    rng = random.Random(seed)
+    picks = [(rng.choice(population), rng.choice(population)) for _ in range(pairs)]
+
+    filters, _ = _timed(lambda pair: passes_hard_filters(pair[0][0], pair[1][0]), picks)
+    scores, _ = _timed(lambda pair: compute_rule_score(pair[0][0], pair[1][0], pair[0][1], pair[1][1]), picks)
+    return {"passes_hard_filters": _stats(filters), "compute_rule_score": _stats(scores)}
+
+
+def bench_vectorized(features: list, seed: int, queries: int) -> dict:
+    from app.services.matching_service import CandidatePool, score_many
+
+    blocks: dict[tuple[str, str], list] = defaultdict(list)
+    for f in features:
+        blocks[f.sport_key, f.city_key].append(f)
+
+    def candidates(a) -> list:
+        if a.city_key:
+            pool = blocks[a.sport_key, ""] + blocks[a.sport_key, a.city_key]
+        else:
+            pool = [f for (sport, _), block in blocks.items() if sport == a.sport_key for f in block]
+        return [f for f in pool if f.user_id != a.user_id and abs(f.skill_level - a.skill_level) <= 2]
+
+    athletes = random.Random(seed).sample(features, min(queries, len(features)))
+    lookup, pools = _timed(candidates, athletes)
+    scoring, _ = _timed(lambda item: score_many(item[0], CandidatePool(item[1])), zip(athletes, pools))
+    return {
+        "candidates_memory": {**_stats(lookup), "mean_candidates": round(float(np.mean([len(p) for p in pools])), 1)},
+        "score_many": _stats(scoring),
+    }
+
+
+# ── Database stages ───────────────────────────────────────────────────────────
+
+def bench_database(spec: PopulationSpec, seed: int, queries: int, llm_latency: float) -> dict:
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import NullPool
+
+    import app.models  # noqa: F401 — registers all models with Base
+    from app.core import active_users
+    from app.core.config import settings
+    from app.core.database import Base, get_async_db, get_db
+    from app.core.security import create_access_token
+    from app.main import app as api
+    from app.models.profile import Profile
+    from app.services import ai_service, llm_scheduler
+    from app.services.matchmaking_service import candidate_features
+    from benchmarks.stub_llm import StubClient
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "bench.db"
+        engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        started = time.perf_counter()
+        user_ids = load_population(engine, generate(spec, seed))
+        load_seconds = time.perf_counter() - started
+
+        Session = sessionmaker(bind=engine, autoflush=False)
+        athletes = random.Random(seed).sample(user_ids, min(queries, len(user_ids)))
+        with Session() as db:
+            profiles = [db.query(Profile).filter(Profile.user_id == uid).one() for uid in athletes]
+            sql_samples, results = _timed(lambda p: candidate_features(db, p), profiles)
+
+        # Full request path: auth, candidate query, scoring, stub LLM, bulk insert
+        async_session = async_sessionmaker(
+            create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool), expire_on_commit=False
+        )
+
+        async def override_async_db():
+            async with async_session() as session:
+                yield session
+
+        def override_db():
+            with Session() as session:
+                yield session
+
+        stub = StubClient(latency=llm_latency)
+        original = (settings.OPENAI_API_KEY, settings.AI_CACHE_ENABLED, settings.LLM_RPM_LIMIT,
+                    settings.LLM_TPM_LIMIT, ai_service._get_client)
+        # The stub has no quota; keep the scheduler's rate limits out of the measurement
+        settings.OPENAI_API_KEY, settings.AI_CACHE_ENABLED = "sk-bench", False
+        settings.LLM_RPM_LIMIT = settings.LLM_TPM_LIMIT = 0
+        llm_scheduler.reset()
+        ai_service._get_client = lambda: stub
+        api.dependency_overrides.update({get_db: override_db, get_async_db: override_async_db})
+        active_users.clear()
+        try:
+            with TestClient(api) as client:
+                def find(user_id: str) -> int:
+                    resp = client.post("/api/match/find", headers={"Authorization": f"Bearer {create_access_token(user_id)}"})
+                    resp.raise_for_status()
+                    return len(resp.json())
+
+                find_samples, found = _timed(find, athletes)
+        finally:
+            api.dependency_overrides.clear()
+            (settings.OPENAI_API_KEY, settings.AI_CACHE_ENABLED, settings.LLM_RPM_LIMIT,
+             settings.LLM_TPM_LIMIT, ai_service._get_client) = original
+            llm_scheduler.reset()
+        engine.dispose()
+
+    return {
+        "db_load": {"profiles": len(user_ids), "seconds": round(load_seconds, 2)},
+        "candidates_sql": {**_stats(sql_samples), "mean_candidates": round(float(np.mean([len(c) for _, c in results])), 1)},
+        "match_find": {**_stats(find_samples), "mean_matches": round(float(np.mean(found)), 1),
+                       "llm_calls": stub.calls, "llm_latency_s": llm_latency},
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark match scoring on a synthetic population.")
+    parser.add_argument("--size", type=int, default=100_000, help="athletes in the in-memory population")
+    parser.add_argument("--db-size", type=int, default=20_000, help="athletes written to SQLite (0 skips DB stages)")
+    parser.add_argument("--queries", type=int, default=50, help="athletes matched per stage")
+    parser.add_argument("--pairs", type=int, default=20_000, help="pairs for the scalar stages")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sports", type=parse_weights, help='weights, e.g. "boxing=5,judo=3,bjj"')
+    parser.add_argument("--cities", type=parse_weights, help='weights, e.g. "Paris=4,Lyon=2"')
+    parser.add_argument("--availability", type=parse_weights, help='pattern weights, e.g. "evening=5,weekend=3,none=1"')
+    parser.add_argument("--no-city-rate", type=float, default=PopulationSpec.no_city_rate)
+    parser.add_argument("--skill", choices=["normal", "uniform"], default=PopulationSpec.skill)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds the stub LLM waits per call")
+    parser.add_argument("--output", type=Path, help="write the report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    spec = PopulationSpec(size=args.size, no_city_rate=args.no_city_rate, skill=args.skill)
+    for name in ("sports", "cities", "availability"):
+        if getattr(args, name):
+            setattr(spec, name, getattr(args, name))
+
+    started = time.perf_counter()
+    features = generate_features(spec, args.seed)
+    stages = {"generate": {"profiles": len(features), "seconds": round(time.perf_counter() - started, 2)}}
+    stages.update(bench_scalar(spec, args.seed, args.pairs))
+    stages.update(bench_vectorized(features, args.seed, args.queries))
+    del features
+    if args.db_size:
+        db_spec = PopulationSpec(**{**spec.__dict__, "size": min(args.db_size, spec.size)})
+        stages.update(bench_database(db_spec, args.seed, args.queries, args.llm_latency))
+
+    report = {
+        "benchmark": "matching",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "seed": args.seed,
+        "population": spec.__dict__,
+        "stages": stages,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Local stand-in for the OpenAI chat completions API.
+
+    python -m benchmarks.mock_openai [--port 8100] [--latency lognormal:0.8,0.5]
+        [--error-rate 0.01] [--rate-limit-rate 0.02] [--rpm 600] [--malformed-rate 0.05]
+
+Point the backend at it with OPENAI_BASE_URL=http://localhost:8100/v1 and
+any non-empty OPENAI_API_KEY. Replies are compatibility JSON in the shape
+the prompts ask for (see stub_llm.reply_for), after a latency drawn from
+--latency:
+
+  fixed:S              always S seconds
+  uniform:LO,HI        uniformly between LO and HI seconds
+  lognormal:MEDIAN,SIGMA  long-tailed, like real completions
+
+A share of requests can fail on purpose: --error-rate answers 500,
+--rate-limit-rate answers 429 with Retry-After, and --rpm enforces a real
+requests-per-minute limit so 429s appear under load. --malformed-rate
+returns a 200 whose content is prose, fenced or truncated JSON, an
+out-of-range score, or a batch reply missing candidates.
+
+GET /stats returns counters per outcome; POST /stats/reset clears them.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from benchmarks.stub_llm import reply_for
+
+MALFORMED_KINDS = ("prose", "fenced", "truncated", "out_of_range", "missing_candidates")
+
+
+def parse_latency(text: str) -> Callable[[random.Random], float]:
+    """Sampler for a --latency spec such as "fixed:0.5" or "lognormal:0.8,0.5"."""
+    kind, _, args = text.partition(":")
+    values = [float(v) for v in args.split(",") if v] if args else []
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(*values)
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda rng: median * rng.lognormvariate(0, sigma)
+    raise ValueError(f"invalid latency spec {text!r}")
+
+
+@dataclass
+class MockConfig:
+    latency: str = "fixed:0"
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    rpm: int = 0                       # 0 = no real limit
+    malformed_rate: float = 0.0
+    retry_after: float = 1.0           # seconds advertised on 429s
+    seed: int | None = None
+
+
+@dataclass
+class _State:
+    rng: random.Random
+    stats: Counter = field(default_factory=Counter)
+    window: list[float] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+def malformed(content: str, kind: str) -> str:
+    """Corrupt a well-formed reply the way real models occasionally do."""
+    if kind == "prose":
+        return "Both athletes look like a reasonable match for sparring."
+    if kind == "fenced":
+        return f"```json\n{content}\n```"
+    if kind == "truncated":
+        return content[: max(1, len(content) // 2)]
+    data = json.loads(content)
+    entries = data.get("results", [data])
+    if kind == "out_of_range":
+        for entry in entries:
+            entry["compatibility_score"] = 150
+        return json.dumps(data)
+    if kind == "missing_candidates" and "results" in data:
+        data["results"] = entries[: len(entries) // 2]
+        return json.dumps(data)
+    return content[:-1]
+
+
+def _error(status: int, message: str, kind: str, headers: dict | None = None) -> JSONResponse:
+    body = {"error": {"message": message, "type": kind, "param": None, "code": kind}}
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI")
+    sample_latency = parse_latency(config.latency)
+    state = _State(rng=random.Random(config.seed))
+
+    def _over_rpm() -> bool:
+        if not config.rpm:
+            return False
+        now = time.monotonic()
+        with state.lock:
+            state.window = [t for t in state.window if now - t < 60]
+            if len(state.window) >= config.rpm:
+                return True
+            state.window.append(now)
+        return False
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        with state.lock:
+            roll = state.rng.random()
+            latency = max(0.0, sample_latency(state.rng))
+            kind = state.rng.choice(MALFORMED_KINDS)
+
+        if _over_rpm() or roll < config.rate_limit_rate:
+            state.stats["rate_limited"] += 1
+            return _error(429, "Rate limit reached for requests", "rate_limit_exceeded",
+                          {"retry-after": f"{config.retry_after:g}", "x-ratelimit-remaining-requests": "0"})
+        await asyncio.sleep(latency)
+        roll -= config.rate_limit_rate
+        if roll < config.error_rate:
+            state.stats["server_error"] += 1
+            return _error(500, "The server had an error while processing your request", "server_error")
+
+        content = reply_for(prompt)
+        if roll - config.error_rate < config.malformed_rate:
+            state.stats[f"malformed_{kind}"] += 1
+            content = malformed(content, kind)
+        else:
+            state.stats["ok"] += 1
+
+        prompt_tokens, completion_tokens = len(prompt) // 4 + 1, len(content) // 4 + 1
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    @app.get("/stats")
+    def stats():
+        return dict(state.stats)
+
+    @app.post("/stats/reset", status_code=204)
+    def reset_stats():
+        state.stats.clear()
+
+    return app
+
+
+def _latency(text: str) -> str:
+    try:
+        parse_latency(text)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+    return text
+
+
+def _rate(text: str) -> float:
+    value = float(text)
+    if not 0 <= value <= 1:
+        raise argparse.ArgumentTypeError("rates are fractions between 0 and 1")
+    return value
+
+
+def main(argv: list[str] | None = None) -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the OpenAI chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=_latency, default="fixed:0", help='"fixed:S", "uniform:LO,HI" or "lognormal:MEDIAN,SIGMA"')
+    parser.add_argument("--error-rate", type=_rate, default=0.0, help="share of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=_rate, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--rpm", type=int, default=0, help="requests per minute before answering 429 (0 = unlimited)")
+    parser.add_argument("--malformed-rate", type=_rate, default=0.0, help="share of 200s with unusable content")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="seconds advertised on 429s")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        latency=args.latency, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate, rpm=args.rpm,
+        malformed_rate=args.malformed_rate, retry_after=args.retry_after, seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
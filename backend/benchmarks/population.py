@@ -0,0 +1,162 @@
+"""
+Synthetic athlete populations for benchmarks.
+
+A PopulationSpec describes the mix of sports, cities, skill levels and
+weekly availability; generate() turns it into deterministic (profile,
+slots) pairs for a seed, and load_population() bulk-inserts them. Availability is drawn from a small set of
+realistic patterns (weekday evenings, early mornings, lunch breaks,
+weekends) with start times jittered in 30-minute steps, so identical
+schedules are common, as they are in real data.
+"""
+
+import random
+import uuid
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field, replace
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.models.availability import Availability
+from app.models.profile import Profile
+from app.models.profile_features import ProfileFeatures
+from app.models.user import User
+from app.services.feature_service import FeatureVector, build_features, feature_row
+
+GOAL_WORDS = [
+    "cardio", "power", "speed", "technique", "footwork", "defense", "sparring",
+    "competition", "prep", "conditioning", "weight", "loss", "endurance", "fun",
+]
+
+# name → (days, start minute, length in minutes)
+AVAILABILITY_PATTERNS: dict[str, tuple[tuple[int, ...], int, int]] = {
+    "evening": ((0, 1, 2, 3, 4), 18 * 60, 120),
+    "morning": ((0, 1, 2, 3, 4), 6 * 60 + 30, 90),
+    "lunch": ((0, 1, 2, 3, 4), 12 * 60, 60),
+    "weekend": ((5, 6), 10 * 60, 180),
+    "none": ((), 0, 0),
+}
+
+
+def parse_weights(text: str) -> dict[str, float]:
+    """"boxing=5,judo=2,bjj" → {"boxing": 5.0, "judo": 2.0, "bjj": 1.0}."""
+    weights = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.partition("=")
+        weights[name] = float(weight) if weight else 1.0
+    return weights
+
+
+@dataclass
+class PopulationSpec:
+    size: int = 10_000
+    sports: dict[str, float] = field(default_factory=lambda: {"boxing": 5, "judo": 3, "bjj": 2, "muay thai": 2})
+    cities: dict[str, float] = field(default_factory=lambda: {"Paris": 4, "Lyon": 2, "Marseille": 2, "Lille": 1})
+    no_city_rate: float = 0.1         # share of athletes with no city (match every city)
+    skill: str = "normal"             # "normal" (mean 5, sd 2, clipped to 1-10) or "uniform"
+    availability: dict[str, float] = field(
+        default_factory=lambda: {"evening": 5, "morning": 2, "lunch": 1, "weekend": 3, "none": 1}
+    )
+    case_variants: bool = True        # store sports/cities with mixed case and stray spaces
+
+
+def _pick(rng: random.Random, weights: dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _variant(rng: random.Random, value: str) -> str:
+    return rng.choice([value, value.lower(), value.upper(), f" {value.title()} "])
+
+
+def _skill(rng: random.Random, spec: PopulationSpec) -> int:
+    if spec.skill == "uniform":
+        return rng.randint(1, 10)
+    return min(10, max(1, round(rng.gauss(5, 2))))
+
+
+def _slots(rng: random.Random, spec: PopulationSpec, user_id: str) -> list[Availability]:
+    slots = []
+    for name in {_pick(rng, spec.availability) for _ in range(rng.randint(1, 2))}:
+        days, start, length = AVAILABILITY_PATTERNS[name]
+        if not days:
+            continue
+        start += 30 * rng.randint(-2, 2)
+        for day in rng.sample(days, rng.randint(1, len(days))):
+            end = min(start + length, 24 * 60 - 1)
+            slots.append(Availability(
+                user_id=user_id,
+                day_of_week=day,
+                start_time=f"{start // 60:02d}:{start % 60:02d}",
+                end_time=f"{end // 60:02d}:{end % 60:02d}",
+            ))
+    return slots
+
+
+def generate(spec: PopulationSpec, seed: int = 0) -> Iterator[tuple[Profile, list[Availability]]]:
+    """Yield spec.size transient (profile, slots) pairs, the same ones for the same seed."""
+    rng = random.Random(seed)
+    for _ in range(spec.size):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        sport = _pick(rng, spec.sports)
+        city = None if rng.random() < spec.no_city_rate else _pick(rng, spec.cities)
+        if spec.case_variants:
+            sport = _variant(rng, sport)
+            city = _variant(rng, city) if city else city
+        profile = Profile(
+            user_id=user_id,
+            name=f"athlete-{user_id[:8]}",
+            sport=sport,
+            skill_level=_skill(rng, spec),
+            experience_years=rng.choice([None, *range(0, 16)]),
+            weight=rng.choice([None, round(rng.uniform(50, 110), 1)]),
+            goals=rng.choice([None, " ".join(rng.sample(GOAL_WORDS, rng.randint(1, 4)))]),
+            training_intensity=rng.choice(["light", "medium", "hard"]),
+            city=city,
+        )
+        yield profile, _slots(rng, spec, user_id)
+
+
+def generate_features(spec: PopulationSpec, seed: int = 0) -> list[FeatureVector]:
+    """Feature vectors for the population; identical schedules share one bitmap."""
+    bitmaps: dict[tuple, FeatureVector] = {}
+    features = []
+    for profile, slots in generate(spec, seed):
+        key = tuple(sorted((s.day_of_week, s.start_time, s.end_time) for s in slots))
+        shared = bitmaps.get(key)
+        vector = build_features(profile, slots if shared is None else ())
+        if shared is None:
+            bitmaps[key] = vector
+        else:
+            vector = replace(vector, schedule=shared.schedule, schedule_minutes=shared.schedule_minutes)
+        features.append(vector)
+    return features
+
+
+def load_population(engine: Engine, population: Iterable[tuple[Profile, list[Availability]]]) -> list[str]:
+    """Bulk-insert users, profiles, slots and feature rows; returns the user ids in order."""
+    user_ids = []
+    with engine.begin() as conn:
+        batch: dict[str, list] = defaultdict(list)
+
+        def flush():
+            for model in (User, Profile, Availability, ProfileFeatures):
+                if batch[model.__tablename__]:
+                    conn.execute(insert(model), batch[model.__tablename__])
+            batch.clear()
+
+        for profile, slots in population:
+            user_ids.append(profile.user_id)
+            batch["users"].append({"id": profile.user_id, "email": f"{profile.user_id}@bench.local",
+                                   "hashed_password": "x", "is_active": True})
+            batch["profiles"].append({c.key: getattr(profile, c.key) for c in Profile.__table__.columns
+                                      if c.key not in ("id", "created_at", "updated_at")})
+            batch["availabilities"] += [
+                {"user_id": s.user_id, "day_of_week": s.day_of_week, "start_time": s.start_time,
+                 "end_time": s.end_time} for s in slots
+            ]
+            batch["profile_features"].append(feature_row(build_features(profile, slots)))
+            if len(batch["users"]) >= 5000:
+                flush()
+        flush()
+    return user_ids
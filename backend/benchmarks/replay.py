@@ -0,0 +1,152 @@
+"""
+Replay a profiled matchmaking run offline.
+
+    python -m benchmarks.replay profiles/<run_id>.json [--llm-latency S] [--profile-dir DIR] [--output FILE]
+
+Rebuilds the shape of the recorded run on a temporary SQLite database: an
+athlete with the same sport, skill, goal count and weekly minutes, as many
+eligible candidates as the run saw, and the same number of existing
+matches. It then runs run_matchmaking under the profiler with the run's
+AI settings and a stub LLM. The stub's per-call latency defaults to the
+recorded refinement time divided by the number of call rounds.
+
+Prints the recorded and replayed stage timings side by side. The replay's
+own .prof/.json pair is written to --profile-dir for diffing.
+"""
+
+import argparse
+import json
+import math
+import random
+import tempfile
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 — registers all models with Base
+from app.core.config import settings
+from app.core.database import Base
+from app.core.metrics import collect_timings, instrument_engine
+from app.core.profiling import profiled
+from app.models.availability import Availability
+from app.models.match import Match, MatchStatus, make_pair_key
+from app.models.profile import Profile
+from app.services import ai_service, llm_scheduler
+from app.services.matchmaking_service import run_matchmaking
+from benchmarks.population import GOAL_WORDS, PopulationSpec, generate, load_population
+from benchmarks.stub_llm import StubClient
+
+ATHLETE_ID = "replay-athlete"
+_CITY = "Replay City"
+
+
+def _slots(user_id: str, minutes: int) -> list[Availability]:
+    """Evening slots on consecutive days adding up to about `minutes`."""
+    if not minutes:
+        return []
+    days = min(7, math.ceil(minutes / 360))
+    per_day = min(minutes // days, 6 * 60)
+    return [
+        Availability(user_id=user_id, day_of_week=day, start_time="17:00",
+                     end_time=f"{17 + per_day // 60:02d}:{per_day % 60:02d}")
+        for day in range(days)
+    ]
+
+
+def build_population(snapshot: dict, seed: int) -> list[tuple[Profile, list[Availability]]]:
+    athlete = snapshot["athlete"]
+    sport = athlete["sport_key"]
+    skill = athlete["skill_level"]
+    me = Profile(
+        user_id=ATHLETE_ID, name="replay", sport=sport, skill_level=skill,
+        goals=" ".join(GOAL_WORDS[: athlete["goal_count"]]) or None,
+        city=_CITY if athlete["has_city"] else None,
+    )
+    spec = PopulationSpec(
+        size=snapshot["pool"]["candidates"], sports={sport: 1}, cities={_CITY: 1}, case_variants=False
+    )
+    rng = random.Random(seed)
+    population = [(me, _slots(ATHLETE_ID, athlete["schedule_minutes"]))]
+    for profile, slots in generate(spec, seed):
+        # Keep every candidate inside the skill window, as the blocking query would
+        profile.skill_level = min(10, max(1, skill + rng.randint(-2, 2)))
+        population.append((profile, slots))
+    return population
+
+
+def recorded_llm_latency(snapshot: dict) -> float:
+    """Per-call latency that reproduces the recorded refinement stage."""
+    to_refine = snapshot.get("refinement", {}).get("to_refine", 0)
+    refining_ms = snapshot["stages_ms"].get("refining", 0.0)
+    if not to_refine:
+        return 0.0
+    recorded = snapshot["settings"]
+    calls = math.ceil(to_refine / recorded["AI_BATCH_MAX_SIZE"]) if recorded["AI_BATCH_MODE"] else to_refine
+    rounds = math.ceil(calls / max(1, recorded["AI_MAX_CONCURRENCY"]))
+    return refining_ms / 1000 / rounds
+
+
+def replay(snapshot: dict, llm_latency: float | None, profile_dir: Path, seed: int = 0) -> dict:
+    latency = recorded_llm_latency(snapshot) if llm_latency is None else llm_latency
+    with tempfile.TemporaryDirectory() as tmp, ExitStack() as stack:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'replay.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        instrument_engine(engine)
+        user_ids = load_population(engine, build_population(snapshot, seed))
+
+        session = sessionmaker(bind=engine, autoflush=False)()
+        stack.callback(engine.dispose)
+        stack.callback(session.close)
+        # Existing matches are read, not re-scored; rule-only pending rows are enough
+        session.add_all(
+            Match(user_a_id=ATHLETE_ID, user_b_id=other, pair_key=make_pair_key(ATHLETE_ID, other),
+                  rule_score=50.0, compatibility_score=50.0, status=MatchStatus.pending)
+            for other in user_ids[1: 1 + snapshot["pool"]["existing"]]
+        )
+        session.commit()
+
+        overrides = {"OPENAI_API_KEY": "sk-replay", "AI_CACHE_ENABLED": False, "LLM_RPM_LIMIT": 0, "LLM_TPM_LIMIT": 0}
+        for name, value in {**snapshot["settings"], **overrides}.items():
+            stack.enter_context(patch.object(settings, name, value))
+        llm_scheduler.reset()
+        stack.callback(llm_scheduler.reset)
+        stub = StubClient(latency=latency)
+        stack.enter_context(patch.object(ai_service, "_get_client", lambda: stub))
+
+        with collect_timings(), profiled("replay", ATHLETE_ID, directory=profile_dir) as run:
+            run_matchmaking(session, ATHLETE_ID, progress=run.progress)
+        replayed = json.loads((profile_dir / f"{run.run_id}.json").read_text())
+
+    keys = ("duration_ms", "stages_ms", "components_ms", "db_queries", "pool", "refinement")
+    return {
+        "recorded_run": snapshot["run_id"],
+        "replay_run": replayed["run_id"],
+        "llm_latency_s": round(latency, 4),
+        "llm_calls": stub.calls,
+        "recorded": {key: snapshot.get(key) for key in keys},
+        "replayed": {key: replayed.get(key) for key in keys},
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a profiled matchmaking run on synthetic data.")
+    parser.add_argument("snapshot", type=Path, help="the .json written next to a .prof by a profiled run")
+    parser.add_argument("--llm-latency", type=float, help="seconds per stub LLM call (default: derived from the run)")
+    parser.add_argument("--profile-dir", type=Path, default=Path("profiles/replays"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="write the comparison here instead of stdout")
+    args = parser.parse_args(argv)
+
+    result = replay(json.loads(args.snapshot.read_text()), args.llm_latency, args.profile_dir, args.seed)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
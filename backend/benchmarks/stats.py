@@ -0,0 +1,20 @@
+"""Shared reporting helpers for the benchmarks."""
+
+import numpy as np
+
+
+def latency_stats(samples: list[float]) -> dict:
+    """Latency summary in milliseconds for per-operation timings in seconds."""
+    if not samples:
+        return {"count": 0}
+    ms = np.array(samples) * 1000
+    return {
+        "count": len(samples),
+        "total_s": round(float(ms.sum()) / 1000, 4),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "ops_per_s": round(len(samples) / max(float(ms.sum()) / 1000, 1e-9), 2),
+    }
@@ -0,0 +1,58 @@
+"""
+In-process stand-in for the OpenAI client.
+
+Answers chat completions with well-formed refinement JSON after an
+optional fixed latency, so the AI stage can be timed without network
+access. Batch prompts get one entry per "Candidate <id>:" block, and
+brief prompts get tag lists instead of prose.
+"""
+
+import json
+import re
+import time
+from types import SimpleNamespace
+
+_CANDIDATE = re.compile(r"^Candidate (\S+):$", re.MULTILINE)
+
+
+def reply_for(prompt: str) -> str:
+    """The JSON a well-behaved model would return for `prompt`."""
+    brief = "risk tag" in prompt
+
+    def entry(candidate_id: str | None) -> dict:
+        if brief:
+            result = {
+                "compatibility_score": 70,
+                "risks": ["weight gap"],
+                "strengths": ["similar level", "shared evenings"],
+                "reasoning": "Solid regular sparring partner.",
+            }
+        else:
+            result = {
+                "compatibility_score": 70,
+                "risks": "Slight weight difference.",
+                "strengths": "Similar level and overlapping evenings.",
+                "reasoning": "A solid sparring partner for regular sessions.",
+            }
+        return {"candidate_id": candidate_id, **result} if candidate_id else result
+
+    candidates = _CANDIDATE.findall(prompt)
+    if candidates:
+        return json.dumps({"results": [entry(cid) for cid in candidates]})
+    return json.dumps(entry(None))
+
+
+class StubClient:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, *, messages, **_):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        prompt = messages[-1]["content"]
+        content = reply_for(prompt)
+        usage = SimpleNamespace(prompt_tokens=len(prompt) // 4, completion_tokens=len(content) // 4)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=usage)
@@ -0,0 +1,107 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+import app.models  # noqa: F401 — registers all models with Base
+from app.core.database import Base
+from app.core.metrics import instrument_engine
+
+
+@pytest.fixture(autouse=True)
+def _clear_active_users():
+    from app.core import active_users
+
+    active_users.clear()
+    yield
+    active_users.clear()
+
+
+@pytest.fixture(autouse=True)
+def _stop_rescoring():
+    from app.services import rescore_service
+
+    yield
+    rescore_service.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def _fresh_llm_scheduler(monkeypatch):
+    from app.core.config import settings
+    from app.services import llm_scheduler
+
+    # No retries (and no Retry-After sleeps) unless a test asks for them
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+    llm_scheduler.reset()
+    yield
+    llm_scheduler.reset()
+
+
+@pytest.fixture()
+def db_path(tmp_path):
+    # A file, so the sync and async engines see the same database
+    return tmp_path / "test.db"
+
+
+@pytest.fixture()
+def engine(db_path):
+    engine = create_engine(f"sqlite:///{db_path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    instrument_engine(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def async_engine(engine, db_path):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    instrument_engine(async_engine.sync_engine)
+    return async_engine
+
+
+@pytest.fixture()
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture()
+def client(db, async_engine):
+    from fastapi.testclient import TestClient
+
+    from app.core.database import get_async_db, get_db
+    from app.main import app
+
+    async_session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_async_db():
+        async with async_session() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_async_db] = override_async_db
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture()
+def query_counter(engine, async_engine):
+    """Collects every SQL statement executed on the test engines."""
+    from sqlalchemy import event
+
+    statements: list[str] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    for target in (engine, async_engine.sync_engine):
+        event.remove(target, "before_cursor_execute", before_cursor_execute)
+
@@ -0,0 +1,26 @@
+"""Helpers shared by API tests."""
+
+from app.core.security import create_access_token
+from app.models.availability import Availability
+from app.models.profile import Profile
+from app.models.user import User
+from app.services.feature_service import refresh_features
+
+
+def make_athlete(db, user_id: str, **kwargs) -> User:
+    """A user with a boxing profile in Paris, one evening slot and fresh features. Commits."""
+    user = User(id=user_id, email=f"{user_id}@example.com", hashed_password="x")
+    fields = dict(name=user_id, sport="boxing", skill_level=5, weight=70.0, city="Paris")
+    fields.update(kwargs)
+    db.add_all([
+        user,
+        Profile(user_id=user_id, **fields),
+        Availability(user_id=user_id, day_of_week=0, start_time="18:00", end_time="20:00"),
+    ])
+    refresh_features(db, user_id)
+    db.commit()
+    return user
+
+
+def auth_headers(user_id: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token(user_id)}"}
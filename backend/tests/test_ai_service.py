@@ -0,0 +1,221 @@
+"""Tests for the AI refinement service (no network calls)."""
+
+import json
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models.profile import Profile
+from app.services import ai_service
+
+
+def test_refine_many_without_api_key_uses_rule_score(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+    results = ai_service.refine_many(MagicMock(), [(MagicMock(), 61.6), (MagicMock(), 40.2)])
+    assert [r["compatibility_score"] for r in results] == [62, 40]
+
+
+def test_refine_many_falls_back_for_stragglers(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "AI_TOTAL_TIMEOUT", 0.2)
+    monkeypatch.setattr(settings, "AI_BATCH_MODE", False)
+
+    def fake_refine(a, b, rule_score, **_):
+        if b.slow:
+            time.sleep(1)
+        return {"compatibility_score": 99}
+
+    monkeypatch.setattr(ai_service, "refine_with_ai", fake_refine)
+    fast, slow = MagicMock(slow=False), MagicMock(slow=True)
+
+    started = time.monotonic()
+    results = ai_service.refine_many(MagicMock(), [(fast, 10.0), (slow, 20.0)])
+    assert time.monotonic() - started < 0.9
+    assert results[0]["compatibility_score"] == 99
+    assert results[1]["compatibility_score"] == 20
+
+
+def test_refinements_share_one_pool_with_per_caller_concurrency(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "AI_BATCH_MODE", False)
+    monkeypatch.setattr(settings, "AI_MAX_CONCURRENCY", 2)
+    monkeypatch.setattr(settings, "AI_EXECUTOR_WORKERS", 8)
+    ai_service.shutdown()
+    lock, running, peak, threads = threading.Lock(), [0], [0], set()
+
+    def fake_refine(a, b, rule_score, **_):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            threads.add(threading.current_thread().name)
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return {"compatibility_score": 99}
+
+    monkeypatch.setattr(ai_service, "refine_with_ai", fake_refine)
+    scored = [(MagicMock(), 50.0)] * 6
+    assert len(ai_service.refine_many(MagicMock(), scored)) == 6
+    pool = ai_service._executor
+    assert len(ai_service.refine_many(MagicMock(), scored)) == 6
+
+    assert ai_service._executor is pool
+    assert peak[0] == 2
+    assert all(name.startswith("ai-refine") for name in threads)
+    ai_service.shutdown()
+    assert ai_service._executor is None
+
+
+def _fake_client(content: str):
+    client = MagicMock()
+    client.chat.completions.create.return_value.choices = [MagicMock(message=MagicMock(content=content))]
+    return client
+
+
+def test_refine_batch_falls_back_per_item(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    reply = [
+        {"candidate_id": "u1", "compatibility_score": 88, "risks": "r", "strengths": "s", "reasoning": "ok"},
+        {"candidate_id": "u2", "compatibility_score": "high", "risks": "r", "strengths": "s", "reasoning": "?"},
+    ]
+    monkeypatch.setattr(ai_service, "_get_client", lambda: _fake_client(json.dumps(reply)))
+
+    scored = [(MagicMock(user_id=uid), score) for uid, score in (("u1", 10.0), ("u2", 20.0), ("u3", 30.0))]
+    results = ai_service.refine_batch(MagicMock(), scored)
+    assert [r["compatibility_score"] for r in results] == [88, 20, 30]
+    assert results[0]["reasoning"] == "ok"
+
+
+def test_chunk_by_budget_respects_max_size(monkeypatch):
+    monkeypatch.setattr(settings, "AI_BATCH_MAX_SIZE", 3)
+    monkeypatch.setattr(settings, "AI_BATCH_MAX_PROMPT_TOKENS", 100_000)
+    scored = [(MagicMock(user_id=str(i)), 50.0) for i in range(7)]
+    chunks = ai_service._chunk_by_budget(MagicMock(), scored)
+    assert chunks == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_refine_many_serves_repeats_from_cache(monkeypatch, db):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "AI_BATCH_MODE", False)
+    calls = []
+
+    def fake_refine(a, b, rule_score, **_):
+        calls.append(b.user_id)
+        return {"compatibility_score": 77, "risks": "r", "strengths": "s", "reasoning": "ok"}
+
+    monkeypatch.setattr(ai_service, "refine_with_ai", fake_refine)
+    a = Profile(user_id="a", name="Ann", sport="boxing", skill_level=5)
+    b = Profile(user_id="b", name="Bob", sport="Boxing ", skill_level=6)
+    hits_before = ai_service.cache_stats["hits"]
+
+    first = ai_service.refine_many(a, [(b, 61.0)], db)
+    second = ai_service.refine_many(a, [(b, 62.0)], db)  # same score bucket
+    assert calls == ["b"]
+    assert first[0]["compatibility_score"] == second[0]["compatibility_score"] == 77
+    assert ai_service.cache_stats["hits"] == hits_before + 1
+
+    assert ai_service.invalidate_profile_cache(db, ai_service.profile_fingerprint(b)) == 1
+    ai_service.refine_many(a, [(b, 61.0)], db)
+    assert calls == ["b", "b"]
+
+
+def test_extract_json_tolerates_fences_and_prose():
+    assert ai_service._extract_json('```json\n{"a": 1}\n```') == {"a": 1}
+    assert ai_service._extract_json('Here you go: [1, 2] Hope this helps.') == [1, 2]
+    with pytest.raises(ValueError):
+        ai_service._extract_json("Both athletes look like a good match.")
+
+
+def test_refine_with_ai_accepts_fenced_reply(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    reply = {"compatibility_score": 81, "risks": "r", "strengths": "s", "reasoning": "ok"}
+    monkeypatch.setattr(ai_service, "_get_client", lambda: _fake_client(f"```json\n{json.dumps(reply)}\n```"))
+    result = ai_service.refine_with_ai(MagicMock(), MagicMock(), 40.0)
+    assert result == reply
+
+
+def test_brief_batch_requests_structured_tags(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "AI_BRIEF_TOKENS_PER_ITEM", 60)
+    reply = {"results": [{"candidate_id": "u1", "compatibility_score": 75, "risks": ["reach gap"],
+                          "strengths": ["same level", " shared evenings "], "reasoning": "Good fit."}]}
+    client = _fake_client(json.dumps(reply))
+    monkeypatch.setattr(ai_service, "_get_client", lambda: client)
+
+    a = Profile(user_id="a", name="Ann", sport="boxing", skill_level=5)
+    b = Profile(user_id="u1", name="Bob", sport="boxing", skill_level=6)
+    [result] = ai_service.refine_batch(a, [(b, 50.0)], verbosity="brief")
+    assert result["strengths"] == "same level, shared evenings"
+    assert result["risks"] == "reach gap"
+
+    kwargs = client.chat.completions.create.call_args.kwargs
+    assert kwargs["max_tokens"] == 60
+    schema = kwargs["response_format"]["json_schema"]
+    assert schema["strict"] is True
+    item = schema["schema"]["properties"]["results"]["items"]
+    assert item["properties"]["risks"]["type"] == "array"
+    assert "risk tag" in kwargs["messages"][0]["content"]
+
+
+def test_structured_output_can_be_turned_off(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "AI_STRUCTURED_OUTPUT", False)
+    client = _fake_client("[]")
+    monkeypatch.setattr(ai_service, "_get_client", lambda: client)
+    ai_service.refine_batch(MagicMock(), [(MagicMock(user_id="u1"), 50.0)])
+    assert "response_format" not in client.chat.completions.create.call_args.kwargs
+
+
+def test_cache_keys_differ_by_verbosity():
+    assert ai_service.cache_key("a", "b", 50.0, "brief") != ai_service.cache_key("a", "b", 50.0, "full")
+
+
+def test_cache_eviction_runs_at_most_once_per_interval(monkeypatch, db):
+    from datetime import datetime, timedelta, timezone
+
+    from app.models.ai_cache import AICacheEntry
+
+    monkeypatch.setattr(settings, "AI_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(settings, "AI_CACHE_EVICT_INTERVAL_SECONDS", 3600)
+    monkeypatch.setattr(ai_service, "_last_eviction", None)
+    now = datetime.now(timezone.utc)
+    db.add_all(
+        AICacheEntry(key=f"k{i}", profile_a_hash="a", profile_b_hash="b", result="{}",
+                     created_at=now - timedelta(seconds=age), last_used_at=now - timedelta(seconds=age))
+        for i, age in enumerate([settings.AI_CACHE_TTL_SECONDS + 60, 30, 20, 10])
+    )
+    db.flush()
+
+    result = {"compatibility_score": 70, "risks": "r", "strengths": "s", "reasoning": "ok"}
+    ai_service._cache_put(db, [("new", "a", "b", result)])
+    # The sweep waits for the caller's commit and runs in its own transaction
+    assert len(list(db.scalars(select(AICacheEntry.key)))) == 5
+    db.commit()
+    # Expired k0 and least recently used k1, k2 are gone
+    assert sorted(db.scalars(select(AICacheEntry.key))) == ["k3", "new"]
+
+    ai_service._cache_put(db, [("newer", "a", "b", result)])
+    db.commit()
+    assert sorted(db.scalars(select(AICacheEntry.key))) == ["k3", "new", "newer"]
+
+
+def test_cache_eviction_keeps_exactly_max_entries_on_ties(monkeypatch, db):
+    from datetime import datetime, timezone
+
+    from app.models.ai_cache import AICacheEntry
+
+    now = datetime.now(timezone.utc)
+    db.add_all(
+        AICacheEntry(key=f"k{i}", profile_a_hash="a", profile_b_hash="b", result="{}",
+                     created_at=now, last_used_at=now)
+        for i in range(5)
+    )
+    db.flush()
+    monkeypatch.setattr(settings, "AI_CACHE_MAX_ENTRIES", 3)
+
+    assert ai_service.evict_cache(db) == 2
+    assert sorted(db.scalars(select(AICacheEntry.key))) == ["k2", "k3", "k4"]
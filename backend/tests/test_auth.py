@@ -0,0 +1,78 @@
+"""Tests for token authentication and the active-user cache."""
+
+import asyncio
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.models.user import User
+from app.services.auth_service import deactivate_user
+from tests.helpers import auth_headers
+
+
+def test_user_id_routes_skip_user_lookup_once_cached(client, db, query_counter):
+    db.add(User(id="me", email="me@example.com", hashed_password="x"))
+    db.commit()
+
+    query_counter.clear()
+    assert client.get("/api/availability", headers=auth_headers("me")).status_code == 200
+    assert sum("FROM users" in sql for sql in query_counter) == 1
+
+    query_counter.clear()
+    assert client.get("/api/availability", headers=auth_headers("me")).status_code == 200
+    assert not any("FROM users" in sql for sql in query_counter)
+
+
+def test_deactivation_invalidates_cached_user(client, db, async_engine):
+    db.add(User(id="me", email="me@example.com", hashed_password="x"))
+    db.commit()
+    assert client.get("/api/availability", headers=auth_headers("me")).status_code == 200
+
+    async def deactivate():
+        async with async_sessionmaker(async_engine)() as session:
+            await deactivate_user(session, await session.get(User, "me"))
+
+    asyncio.run(deactivate())
+    assert client.get("/api/availability", headers=auth_headers("me")).status_code == 401
+
+
+def test_unknown_user_and_bad_token_are_rejected(client):
+    assert client.get("/api/availability", headers=auth_headers("ghost")).status_code == 401
+    assert client.get("/api/availability", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def _context(rounds: int):
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def test_login_rehashes_outdated_cost(client, db, monkeypatch):
+    from app.core import security
+
+    db.add(User(id="me", email="me@example.com", hashed_password=_context(4).hash("s3cret!")))
+    db.commit()
+    monkeypatch.setattr(security, "pwd_context", _context(5))
+
+    resp = client.post("/api/auth/login", data={"username": "me@example.com", "password": "s3cret!"})
+    assert resp.status_code == 200
+    db.expire_all()
+    assert db.get(User, "me").hashed_password.startswith("$2b$05$")
+
+    bad = client.post("/api/auth/login", data={"username": "me@example.com", "password": "wrong"})
+    assert bad.status_code == 401
+
+
+def test_register_hashes_in_pool_and_sheds_load(client, monkeypatch):
+    import threading
+
+    from app.core import security
+
+    monkeypatch.setattr(security, "pwd_context", _context(4))
+    body = {"email": "new@example.com", "password": "s3cret!"}
+    assert client.post("/api/auth/register", json=body).status_code == 201
+
+    monkeypatch.setattr(security, "_pending", threading.BoundedSemaphore(1))
+    security._pending.acquire()  # the only slot is taken
+    resp = client.post("/api/auth/register", json={**body, "email": "other@example.com"})
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
@@ -0,0 +1,159 @@
+"""Tests for the offline all-pairs matchmaking run."""
+
+import os
+import random
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.batch import match_all, rebuild_features
+from app.core.database import Base
+from app.models.match import Match, MatchStatus
+from app.models.profile import Profile
+from app.models.profile_features import ProfileFeatures
+from app.models.user import User
+from app.services.feature_service import build_features, refresh_features
+from app.services.matching_service import features_pass_filters, score_features
+
+
+@pytest.fixture
+def batch_sessions(engine, monkeypatch):
+    monkeypatch.setattr(match_all, "session_factory", sessionmaker(bind=engine))
+
+
+@pytest.fixture
+def pg_db(monkeypatch):
+    """Session on TEST_POSTGRES_URL, a throwaway database whose tables are created and dropped here."""
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    engine = create_engine(url)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(match_all, "session_factory", factory)
+    session = factory()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+
+
+def _athlete(db, user_id: str, **kwargs) -> None:
+    fields = dict(name=user_id, sport="boxing", skill_level=5, city="Paris")
+    fields.update(kwargs)
+    db.add_all([User(id=user_id, email=f"{user_id}@example.com", hashed_password="x"), Profile(user_id=user_id, **fields)])
+    refresh_features(db, user_id)
+    db.commit()
+
+
+def test_score_pairs_matches_brute_force():
+    rng = random.Random(7)
+    profiles = [
+        Profile(
+            user_id=f"u{i}",
+            sport="boxing",
+            skill_level=rng.randint(1, 10),
+            weight=rng.choice([None, 60.0, 75.0]),
+            goals=rng.choice([None, "cardio", "cardio power"]),
+            city=rng.choice([None, "paris"]),
+        )
+        for i in range(40)
+    ]
+    features = [build_features(p) for p in profiles]
+
+    pairs = match_all.score_pairs(features, city_bucket=False)
+
+    expected = {
+        frozenset((a.user_id, b.user_id)): score_features(a, b)
+        for i, a in enumerate(features)
+        for b in features[i + 1:]
+        if features_pass_filters(a, b)
+    }
+    assert {frozenset((a, b)): score for a, b, score in pairs} == expected
+
+
+def test_run_scores_each_pair_once_and_resumes(db, batch_sessions):
+    _athlete(db, "p1")
+    _athlete(db, "p2", city="paris ")
+    _athlete(db, "nocity1", city=None)
+    _athlete(db, "nocity2", city="")
+    _athlete(db, "lyon", city="Lyon")
+    _athlete(db, "judo", sport="Judo")
+    _athlete(db, "gap", skill_level=9)
+
+    assert match_all.run("r1", workers=1) == 8
+    # City-less athletes pair with every city of their sport, and with each other once
+    assert sorted(m.pair_key for m in db.query(Match)) == [
+        "lyon:nocity1", "lyon:nocity2", "nocity1:nocity2",
+        "nocity1:p1", "nocity1:p2", "nocity2:p1", "nocity2:p2", "p1:p2",
+    ]
+
+    # Same run id: every bucket is checkpointed, nothing is rescored
+    assert match_all.run("r1", workers=1) == 0
+
+
+def test_run_keeps_ai_scores_and_refreshes_rule_scores(db, batch_sessions):
+    _athlete(db, "a")
+    _athlete(db, "b")
+    _athlete(db, "c")
+    db.add_all([
+        Match(user_a_id="a", user_b_id="b", compatibility_score=99.0, rule_score=1.0, ai_refined=True),
+        Match(user_a_id="a", user_b_id="c", compatibility_score=1.0, rule_score=1.0),
+    ])
+    db.commit()
+
+    match_all.run("r2", workers=1)
+    db.expire_all()
+    by_key = {m.pair_key: m for m in db.query(Match)}
+    assert by_key["a:b"].compatibility_score == 99.0 and by_key["a:b"].rule_score > 1.0
+    assert by_key["a:c"].compatibility_score == by_key["a:c"].rule_score > 1.0
+    assert by_key["b:c"].ai_refined is False
+
+
+def test_run_leaves_answered_matches_alone(db, batch_sessions):
+    _athlete(db, "a")
+    _athlete(db, "b")
+    db.add(Match(user_a_id="a", user_b_id="b", compatibility_score=1.0, rule_score=1.0, status=MatchStatus.accepted))
+    db.commit()
+
+    match_all.run("r3", workers=1)
+    db.expire_all()
+    [match] = db.query(Match).all()
+    assert (match.compatibility_score, match.rule_score, match.status) == (1.0, 1.0, MatchStatus.accepted)
+
+
+@pytest.mark.postgres
+def test_copy_upsert_on_postgres(pg_db):
+    for user_id in ("a", "b", "c", "d"):
+        _athlete(pg_db, user_id)
+    pg_db.add_all([
+        Match(user_a_id="a", user_b_id="b", compatibility_score=99.0, rule_score=1.0, ai_refined=True),
+        Match(user_a_id="a", user_b_id="c", compatibility_score=1.0, rule_score=1.0),
+        Match(user_a_id="a", user_b_id="d", compatibility_score=1.0, rule_score=1.0, status=MatchStatus.accepted),
+    ])
+    pg_db.commit()
+
+    assert match_all.run("pg", workers=1) == 6
+    pg_db.expire_all()
+    by_key = {m.pair_key: m for m in pg_db.query(Match)}
+    assert len(by_key) == 6
+    assert by_key["a:b"].compatibility_score == 99.0 and by_key["a:b"].rule_score > 1.0
+    assert by_key["a:c"].compatibility_score == by_key["a:c"].rule_score > 1.0
+    assert (by_key["a:d"].rule_score, by_key["a:d"].status) == (1.0, MatchStatus.accepted)
+    assert by_key["c:d"].status == MatchStatus.pending and by_key["c:d"].ai_refined is False
+
+
+def test_rebuild_features_backfills_profiles(db, engine, monkeypatch):
+    monkeypatch.setattr(rebuild_features, "session_factory", sessionmaker(bind=engine))
+    db.add_all([User(id="old", email="old@example.com", hashed_password="x"),
+                Profile(user_id="old", name="old", sport="Boxing", skill_level=5)])
+    db.commit()
+
+    rebuild_features.main()
+
+    db.expire_all()
+    assert db.get(ProfileFeatures, "old").sport_key == "boxing"
@@ -0,0 +1,99 @@
+"""Tests for the benchmark population generator and the mock OpenAI server."""
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from openai import OpenAI
+
+from app.core.config import settings
+from app.models.profile import Profile
+from app.services import ai_service
+from benchmarks.mock_openai import MockConfig, create_app, parse_latency
+from benchmarks.population import PopulationSpec, generate, generate_features, parse_weights
+
+
+def test_parse_weights_defaults_to_one():
+    assert parse_weights("boxing=5, judo=2,bjj") == {"boxing": 5.0, "judo": 2.0, "bjj": 1.0}
+
+
+def test_population_is_deterministic_per_seed():
+    spec = PopulationSpec(size=50)
+
+    def snapshot(seed):
+        return [
+            (p.user_id, p.sport, p.city, p.skill_level, [(s.day_of_week, s.start_time, s.end_time) for s in slots])
+            for p, slots in generate(spec, seed)
+        ]
+
+    assert snapshot(1) == snapshot(1)
+    assert snapshot(1) != snapshot(2)
+
+
+def test_generate_features_shares_identical_schedules():
+    spec = PopulationSpec(size=300, availability={"evening": 1}, sports={"boxing": 1})
+    features = generate_features(spec, seed=3)
+    assert {f.sport_key for f in features} == {"boxing"}
+    # Few distinct schedules, each decoded once and shared by reference
+    distinct = {id(f.schedule) for f in features}
+    assert len(distinct) < len(features) // 2
+    reference = generate_features(spec, seed=3)
+    assert all(np.array_equal(a.schedule, b.schedule) for a, b in zip(features, reference))
+
+
+def _mock_client(monkeypatch, **config) -> TestClient:
+    """Route ai_service's OpenAI client to an in-process mock server."""
+    server = TestClient(create_app(MockConfig(seed=0, **config)))
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-mock")
+    monkeypatch.setattr(ai_service, "_get_client", lambda: OpenAI(
+        api_key="sk-mock", base_url="http://testserver/v1", http_client=server, max_retries=0,
+    ))
+    return server
+
+
+def _athletes(n):
+    return [Profile(user_id=f"u{i}", name=f"A{i}", sport="boxing", skill_level=5) for i in range(n)]
+
+
+def test_client_uses_configured_base_url(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-mock")
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", "http://localhost:8100/v1")
+    monkeypatch.setattr(ai_service, "_client", None)
+    assert str(ai_service._get_client().base_url) == "http://localhost:8100/v1/"
+
+
+def test_mock_server_answers_batch_prompts(monkeypatch):
+    server = _mock_client(monkeypatch)
+    a, *candidates = _athletes(4)
+    results = ai_service.refine_batch(a, [(b, 50.0) for b in candidates])
+    assert [r["compatibility_score"] for r in results] == [70, 70, 70]
+    assert not any(r.get("_fallback") for r in results)
+    assert server.get("/stats").json() == {"ok": 1}
+
+
+@pytest.mark.parametrize("config", [{"malformed_rate": 1.0}, {"error_rate": 1.0}, {"rate_limit_rate": 1.0}])
+def test_mock_server_failures_fall_back_to_rule_score(monkeypatch, config):
+    _mock_client(monkeypatch, **config)
+    a, *candidates = _athletes(3)
+    results = ai_service.refine_batch(a, [(b, 42.0) for b in candidates])
+    assert all(r["compatibility_score"] == 70 or r.get("_fallback") for r in results)
+    assert any(r.get("_fallback") for r in results)
+
+
+def test_mock_server_rate_limits_with_retry_after():
+    server = TestClient(create_app(MockConfig(rpm=1, retry_after=2)))
+    body = {"model": "mock", "messages": [{"role": "user", "content": "hi"}]}
+    assert server.post("/v1/chat/completions", json=body).status_code == 200
+    limited = server.post("/v1/chat/completions", json=body)
+    assert limited.status_code == 429
+    assert limited.headers["retry-after"] == "2"
+    assert limited.json()["error"]["code"] == "rate_limit_exceeded"
+
+
+def test_parse_latency():
+    import random
+    rng = random.Random(0)
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert 0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2
+    assert parse_latency("lognormal:0.5,0.3")(rng) > 0
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1")
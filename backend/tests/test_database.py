@@ -0,0 +1,9 @@
+"""Tests for engine configuration."""
+
+from app.core.database import async_url
+
+
+def test_async_url_swaps_in_async_drivers():
+    assert async_url("postgresql://u:p@db:5432/arena") == "postgresql+asyncpg://u:p@db:5432/arena"
+    assert async_url("postgresql+psycopg2://u:p@db/arena") == "postgresql+asyncpg://u:p@db/arena"
+    assert async_url("sqlite:///./arena.db") == "sqlite+aiosqlite:///./arena.db"
@@ -0,0 +1,231 @@
+"""Tests for the shared LLM scheduler (fake clock, no network calls)."""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from openai import APIConnectionError, BadRequestError, RateLimitError
+
+from app.core.config import settings
+from app.services import ai_service, llm_scheduler
+from app.services.llm_scheduler import CircuitOpen, DeadlineExceeded, LLMScheduler, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _scheduler(clock: FakeClock, **overrides) -> LLMScheduler:
+    options = dict(rpm=0, tpm=0, max_retries=3, backoff_base=0.5, backoff_max=20,
+                   breaker_failures=3, breaker_cooldown=30)
+    return LLMScheduler(**{**options, **overrides}, clock=clock, sleep=clock.sleep)
+
+
+def _response(status: int, headers: dict | None = None) -> httpx.Response:
+    return httpx.Response(status, headers=headers or {}, request=httpx.Request("POST", "http://llm/v1"))
+
+
+def _rate_limited(retry_after: str | None = None) -> RateLimitError:
+    headers = {"retry-after": retry_after} if retry_after else {}
+    return RateLimitError("slow down", response=_response(429, headers), body=None)
+
+
+def _outage() -> APIConnectionError:
+    return APIConnectionError(request=httpx.Request("POST", "http://llm/v1"))
+
+
+def _failing(*errors):
+    """fn for LLMScheduler.call raising `errors` in turn, then returning "ok"."""
+    remaining = list(errors)
+
+    def fn(timeout):
+        if remaining:
+            raise remaining.pop(0)
+        return "ok"
+    return fn
+
+
+def test_token_bucket_refills_per_minute():
+    bucket = TokenBucket(60, now=0.0)
+    bucket.take(60)
+    assert bucket.wait_time(1, now=0.0) == pytest.approx(1.0)
+    assert bucket.wait_time(1, now=1.0) == 0.0
+    # Oversized requests wait for a full bucket rather than forever
+    assert bucket.wait_time(1000, now=1.0) == pytest.approx(59.0)
+    assert TokenBucket(0, now=0.0).wait_time(10**9, now=0.0) == 0.0
+
+
+def test_waits_for_tokens_per_minute():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, tpm=600)  # 10 tokens per second
+    scheduler.tokens.take(600)
+    started = clock.now
+
+    def fn(timeout):
+        return "ok"
+
+    # The condition wait advances the fake clock the way time would
+    scheduler._cond.wait = lambda timeout=None: clock.sleep(timeout)
+    assert scheduler.call(fn, tokens=50) == "ok"
+    assert clock.now - started == pytest.approx(5.0)
+
+
+def test_actual_usage_is_charged_to_the_token_bucket():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, tpm=1000)
+    scheduler.call(lambda timeout: MagicMock(usage=MagicMock(total_tokens=50)), tokens=400)
+    assert scheduler.tokens.level == pytest.approx(950)
+
+
+def test_retries_honour_retry_after():
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    assert scheduler.call(_failing(_rate_limited("2"), _outage()), tokens=10) == "ok"
+    assert len(clock.sleeps) == 2
+    assert 2.0 <= clock.sleeps[0] <= 2.5
+    assert 0 <= clock.sleeps[1] <= 1.0  # jittered base * 2
+
+
+def test_rate_limit_pauses_other_callers():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, max_retries=0)
+    with pytest.raises(RateLimitError):
+        scheduler.call(_failing(_rate_limited("5")), tokens=10)
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(_failing(), tokens=10, deadline=clock.now + 1)
+
+
+def test_gives_up_after_max_retries_and_on_client_errors():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, max_retries=2, breaker_failures=10)
+    with pytest.raises(APIConnectionError):
+        scheduler.call(_failing(_outage(), _outage(), _outage()), tokens=10)
+    assert len(clock.sleeps) == 2
+
+    bad_request = BadRequestError("bad", response=_response(400), body=None)
+    with pytest.raises(BadRequestError):
+        scheduler.call(_failing(bad_request), tokens=10)
+    assert len(clock.sleeps) == 2
+
+
+def test_no_retry_past_the_deadline():
+    clock = FakeClock()
+    scheduler = _scheduler(clock)
+    with pytest.raises(RateLimitError):
+        scheduler.call(_failing(_rate_limited("10")), tokens=10, deadline=clock.now + 5)
+    assert clock.sleeps == []
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, max_retries=0, breaker_failures=3, breaker_cooldown=30)
+    for _ in range(3):
+        with pytest.raises(APIConnectionError):
+            scheduler.call(_failing(_outage()), tokens=10)
+
+    calls = []
+    with pytest.raises(CircuitOpen):
+        scheduler.call(lambda timeout: calls.append(timeout), tokens=10)
+    assert calls == []
+
+    # After the cooldown one trial goes through; a failure reopens at once
+    clock.now += 30
+    with pytest.raises(APIConnectionError):
+        scheduler.call(_failing(_outage()), tokens=10)
+    with pytest.raises(CircuitOpen):
+        scheduler.call(_failing(), tokens=10)
+
+    clock.now += 30
+    assert scheduler.call(_failing(), tokens=10) == "ok"
+    assert scheduler.breaker.open_until is None
+    assert scheduler.call(_failing(), tokens=10) == "ok"
+
+
+def _half_open_with_empty_bucket(clock: FakeClock) -> LLMScheduler:
+    scheduler = _scheduler(clock, rpm=60, max_retries=0, breaker_failures=1, breaker_cooldown=30)
+    with pytest.raises(APIConnectionError):
+        scheduler.call(_failing(_outage()), tokens=10)
+    clock.now += 30
+    # The cooldown is over, but the next request slot is a second away
+    scheduler.requests.level, scheduler.requests.updated = 0.0, clock.now
+    return scheduler
+
+
+def test_trial_that_times_out_in_the_queue_does_not_wedge_the_breaker():
+    clock = FakeClock()
+    scheduler = _half_open_with_empty_bucket(clock)
+    with pytest.raises(DeadlineExceeded):
+        scheduler.call(_failing(), tokens=10, deadline=clock.now + 0.5)
+    assert not scheduler.breaker.trial_in_flight
+
+    clock.now += 2
+    assert scheduler.call(_failing(), tokens=10) == "ok"
+    assert scheduler.breaker.open_until is None
+
+
+def test_trial_that_waits_for_a_slot_goes_through():
+    clock = FakeClock()
+    scheduler = _half_open_with_empty_bucket(clock)
+    scheduler._cond.wait = lambda timeout=None: clock.sleep(timeout)
+    assert scheduler.call(_failing(), tokens=10) == "ok"
+    assert scheduler.breaker.open_until is None
+
+
+def test_rate_limits_do_not_open_the_breaker():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, max_retries=0, breaker_failures=1)
+    with pytest.raises(RateLimitError):
+        scheduler.call(_failing(_rate_limited()), tokens=10)
+    assert scheduler.breaker.open_until is None
+
+
+def test_interactive_lane_goes_first():
+    scheduler = LLMScheduler(rpm=600, tpm=0, max_retries=0, backoff_base=0.01, backoff_max=0.01,
+                             breaker_failures=5, breaker_cooldown=30)
+    scheduler.requests.take(600)  # one slot every 0.1s from now on
+    order = []
+
+    def call(name):
+        scheduler.call(lambda timeout: order.append(name), tokens=1)
+
+    def background_call():
+        with llm_scheduler.background():
+            call("background")
+
+    background = threading.Thread(target=background_call)
+    background.start()
+    while not scheduler._waiting["background"]:
+        time.sleep(0.001)
+    interactive = threading.Thread(target=call, args=("interactive",))
+    interactive.start()
+    interactive.join(timeout=2)
+    background.join(timeout=2)
+    assert order == ["interactive", "background"]
+
+
+def test_open_breaker_falls_back_to_rule_score(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(settings, "LLM_BREAKER_FAILURES", 1)
+    client = MagicMock()
+    client.chat.completions.create.side_effect = _outage()
+    monkeypatch.setattr(ai_service, "_get_client", lambda: client)
+
+    scored = [(MagicMock(user_id="u1"), 55.0)]
+    assert ai_service.refine_batch(MagicMock(), scored)[0]["compatibility_score"] == 55
+    assert client.chat.completions.create.call_count == 1
+
+    results = ai_service.refine_many(MagicMock(), scored * 3)
+    assert [r["compatibility_score"] for r in results] == [55, 55, 55]
+    assert all(r["_fallback"] for r in results)
+    assert client.chat.completions.create.call_count == 1
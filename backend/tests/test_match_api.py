@@ -0,0 +1,306 @@
+"""Tests for the /match endpoints against an in-memory SQLite database."""
+
+import pytest
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.models.match import Match
+from app.models.user import User
+from tests.helpers import auth_headers, make_athlete
+
+
+@pytest.fixture(autouse=True)
+def _no_openai(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+
+
+def test_find_matches_applies_hard_filters_in_sql(client, db):
+    make_athlete(db, "me")
+    make_athlete(db, "same-sport-other-case", sport="Boxing", city="paris")
+    make_athlete(db, "no-city", city=None)
+    make_athlete(db, "other-sport", sport="judo")
+    make_athlete(db, "skill-gap", skill_level=9)
+    make_athlete(db, "other-city", city="Lyon")
+
+    resp = client.post("/api/match/find", headers=auth_headers("me"))
+    assert resp.status_code == 200
+    assert sorted(m["user_b_id"] for m in resp.json()) == ["no-city", "same-sport-other-case"]
+
+
+@pytest.mark.parametrize("city", ["Paris", None])
+def test_candidate_query_uses_blocking_index(db, engine, city):
+    from sqlalchemy import event
+
+    from app.services.matchmaking_service import _load_scored
+
+    make_athlete(db, "me", sport="Boxing ", city=city)
+    make_athlete(db, "other", sport="boxing", city="paris")
+    executed = []
+    capture = lambda conn, cursor, sql, params, context, many: executed.append((sql, params))  # noqa: E731
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        _, scored, _ = _load_scored(db, "me")
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    assert [c.user_id for c, _ in scored] == ["other"]
+
+    sql, params = next((sql, params) for sql, params in executed if "FROM profile_features" in sql)
+    plan = " ".join(row[-1] for row in db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params))
+    assert "USING INDEX ix_profile_features_" in plan and "skill_level>" in plan
+
+
+def test_find_matches_query_count_does_not_grow_with_candidates(client, db, query_counter):
+    def run(n: int) -> int:
+        me = f"me{n}"
+        make_athlete(db, me, sport=f"sport{n}")
+        for i in range(n):
+            other = f"{me}-c{i}"
+            make_athlete(db, other, sport=f"sport{n}")
+            db.add(Match(user_a_id=other, user_b_id=me, compatibility_score=50.0))
+        db.commit()
+        query_counter.clear()
+        resp = client.post("/api/match/find", headers=auth_headers(me))
+        assert resp.status_code == 200
+        assert len(resp.json()) == n
+        return len(query_counter)
+
+    # user, profile, features, candidate profiles, existing matches
+    assert run(3) == run(12) == 5
+
+
+def test_find_matches_inserts_new_matches_in_one_statement(client, db, query_counter):
+    def run(n: int) -> int:
+        me = f"new{n}"
+        make_athlete(db, me, sport=f"sport{n}")
+        for i in range(n):
+            make_athlete(db, f"{me}-c{i}", sport=f"sport{n}")
+        query_counter.clear()
+        resp = client.post("/api/match/find", headers=auth_headers(me))
+        assert resp.status_code == 200
+        assert len(resp.json()) == n
+        return len(query_counter)
+
+    # user, profile, features, candidate profiles, existing matches, bulk insert
+    assert run(3) == run(12) == 6
+    assert db.query(Match).count() == 15
+
+
+def test_find_matches_skips_pairs_inserted_concurrently(db):
+    from app.services.matchmaking_service import insert_matches
+    from app.models.match import make_pair_key
+
+    make_athlete(db, "u1")
+    make_athlete(db, "u2")
+    make_athlete(db, "u3")
+    db.add(Match(user_a_id="u2", user_b_id="u1", compatibility_score=10.0))
+    db.commit()
+
+    rows = [
+        dict(user_a_id="u1", user_b_id=other, pair_key=make_pair_key("u1", other), compatibility_score=90.0)
+        for other in ("u2", "u3")
+    ]
+    matches = insert_matches(db, rows)
+    db.commit()
+    assert sorted(m.compatibility_score for m in matches) == [10.0, 90.0]
+    assert db.query(Match).count() == 2
+
+
+def test_match_pair_key_is_unique_in_either_direction(db):
+    make_athlete(db, "u1")
+    make_athlete(db, "u2")
+    db.add(Match(user_a_id="u2", user_b_id="u1"))
+    db.commit()
+    assert db.query(Match).one().pair_key == "u1:u2"
+
+    db.add(Match(user_a_id="u1", user_b_id="u2"))
+    with pytest.raises(IntegrityError):
+        db.commit()
+
+
+def test_stream_matches_emits_rule_scores_then_updates(client, db, engine, monkeypatch):
+    from sqlalchemy.orm import sessionmaker
+
+    from app.core import database
+
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(bind=engine))
+    make_athlete(db, "me")
+    make_athlete(db, "old")
+    make_athlete(db, "new")
+    db.add(Match(user_a_id="old", user_b_id="me", compatibility_score=42.0))
+    db.commit()
+
+    with client.stream("POST", "/api/match/find/stream", headers=auth_headers("me")) as resp:
+        assert resp.headers["content-type"].startswith("text/event-stream")
+        events = [line.split(": ", 1)[1] for line in resp.iter_lines() if line.startswith("event: ")]
+
+    assert events == ["match", "match", "update", "done"]
+    assert db.query(Match).filter(Match.pair_key == "me:new").one().ai_reasoning is not None
+
+
+def test_stream_matches_requires_profile(client, db):
+    db.add(User(id="me", email="me@example.com", hashed_password="x"))
+    db.commit()
+    assert client.post("/api/match/find/stream", headers=auth_headers("me")).status_code == 400
+
+
+def test_find_matches_refines_only_top_k(client, db, monkeypatch):
+    from app.services import matchmaking_service
+
+    monkeypatch.setattr(settings, "AI_REFINE_TOP_K", 2)
+    monkeypatch.setattr(settings, "AI_REFINE_MIN_SCORE", 0.0)
+    refined = []
+
+    def fake_refine_many(a, scored, db=None, *_):
+        refined.extend(b.user_id for b, _ in scored)
+        return [{"compatibility_score": 90, "reasoning": "ai", "risks": "", "strengths": ""} for _ in scored]
+
+    monkeypatch.setattr(matchmaking_service, "refine_many", fake_refine_many)
+    make_athlete(db, "me", weight=70.0)
+    for i, weight in enumerate([70.0, 72.0, 80.0, 90.0]):
+        make_athlete(db, f"c{i}", weight=weight)
+
+    body = client.post("/api/match/find", headers=auth_headers("me")).json()
+    assert sorted(refined) == ["c0", "c1"]
+    by_user = {m["user_b_id"]: m for m in body}
+    assert by_user["c0"]["ai_refined"] and by_user["c1"]["ai_refined"]
+    assert not by_user["c3"]["ai_refined"] and by_user["c3"]["ai_reasoning"] is None
+
+    resp = client.post(f"/api/match/{by_user['c3']['id']}/refine", headers=auth_headers("me"))
+    assert resp.json()["ai_refined"] is True
+    assert refined[-1] == "c3"
+
+
+def test_brief_matches_get_full_analysis_when_opened(client, db, monkeypatch):
+    from app.services import matchmaking_service
+
+    monkeypatch.setattr(settings, "AI_REFINE_MIN_SCORE", 0.0)
+    calls = []
+
+    def fake_refine_many(a, scored, db=None, verbosity="full"):
+        calls.append(verbosity)
+        reasoning = "A long paragraph." if verbosity == "full" else "Good fit."
+        return [{"compatibility_score": 80, "reasoning": reasoning, "risks": "", "strengths": ""} for _ in scored]
+
+    monkeypatch.setattr(matchmaking_service, "refine_many", fake_refine_many)
+    make_athlete(db, "me")
+    make_athlete(db, "other")
+
+    [match] = client.post("/api/match/find", headers=auth_headers("me")).json()
+    assert (match["prompt_version"], match["ai_reasoning"]) == ("2-brief", "Good fit.")
+
+    opened = client.post(f"/api/match/{match['id']}/refine", headers=auth_headers("me")).json()
+    assert (opened["prompt_version"], opened["ai_reasoning"]) == ("2-full", "A long paragraph.")
+    client.post(f"/api/match/{match['id']}/refine", headers=auth_headers("me"))
+    assert calls == ["brief", "full"]
+
+
+def test_brief_analysis_is_kept_when_full_refinement_falls_back(client, db, monkeypatch):
+    from app.services import matchmaking_service
+
+    monkeypatch.setattr(settings, "AI_REFINE_MIN_SCORE", 0.0)
+
+    def fake_refine_many(a, scored, db=None, verbosity="full"):
+        if verbosity == "full":
+            return [{"compatibility_score": 50, "_fallback": True} for _ in scored]
+        return [{"compatibility_score": 80, "reasoning": "Good fit.", "risks": "", "strengths": ""} for _ in scored]
+
+    monkeypatch.setattr(matchmaking_service, "refine_many", fake_refine_many)
+    make_athlete(db, "me")
+    make_athlete(db, "other")
+
+    [match] = client.post("/api/match/find", headers=auth_headers("me")).json()
+    opened = client.post(f"/api/match/{match['id']}/refine", headers=auth_headers("me")).json()
+    assert (opened["ai_refined"], opened["compatibility_score"], opened["prompt_version"]) == (True, 80, "2-brief")
+
+
+def test_add_availability_merges_overlapping_slots(client, db):
+    db.add(User(id="me", email="me@example.com", hashed_password="x"))
+    db.commit()
+    for start, end in (("18:00", "19:00"), ("20:00", "21:00"), ("07:00", "08:00")):
+        client.post("/api/availability", json={"day_of_week": 0, "start_time": start, "end_time": end}, headers=auth_headers("me"))
+
+    resp = client.post(
+        "/api/availability",
+        json={"day_of_week": 0, "start_time": "18:30", "end_time": "20:00"},
+        headers=auth_headers("me"),
+    )
+    assert resp.status_code == 201
+    assert (resp.json()["start_time"], resp.json()["end_time"]) == ("18:00", "21:00")
+    slots = client.get("/api/availability", headers=auth_headers("me")).json()
+    assert sorted((s["start_time"], s["end_time"]) for s in slots) == [("07:00", "08:00"), ("18:00", "21:00")]
+
+    bad = client.post(
+        "/api/availability",
+        json={"day_of_week": 0, "start_time": "21:00", "end_time": "20:00"},
+        headers=auth_headers("me"),
+    )
+    assert bad.status_code == 422
+
+
+def test_profile_and_availability_writes_refresh_features(client, db):
+    from app.models.profile_features import ProfileFeatures
+
+    db.add(User(id="me", email="me@example.com", hashed_password="x"))
+    db.commit()
+    profile = {"name": "Me", "sport": "  Boxing ", "skill_level": 5, "city": "Paris"}
+    assert client.post("/api/profiles", json=profile, headers=auth_headers("me")).status_code == 201
+
+    def features():
+        db.expire_all()
+        return db.get(ProfileFeatures, "me")
+
+    assert (features().sport_key, features().city_key, features().schedule_minutes) == ("boxing", "paris", 0)
+
+    client.patch("/api/profiles/me", json={"sport": "Judo"}, headers=auth_headers("me"))
+    assert features().sport_key == "judo"
+
+    slot = client.post(
+        "/api/availability",
+        json={"day_of_week": 2, "start_time": "18:00", "end_time": "19:30"},
+        headers=auth_headers("me"),
+    ).json()
+    assert features().schedule_minutes == 90
+
+    client.delete(f"/api/availability/{slot['id']}", headers=auth_headers("me"))
+    assert (features().schedule_minutes, features().schedule) == (0, b"")
+
+
+def test_recommended_pages_with_keyset_cursor(client, db, query_counter):
+    make_athlete(db, "me")
+    for i in range(25):
+        other = f"o{i:02d}"
+        db.add(User(id=other, email=f"{other}@example.com", hashed_password="x"))
+        # Both pair directions, and ties on score
+        a, b = ("me", other) if i % 2 else (other, "me")
+        db.add(Match(user_a_id=a, user_b_id=b, compatibility_score=float(i // 3), ai_reasoning="long text"))
+    db.add(Match(user_a_id="o00", user_b_id="o01", compatibility_score=99.0))
+    db.commit()
+
+    seen, cursor, counts = [], None, []
+    while True:
+        query_counter.clear()
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/api/match/recommended", params=params, headers=auth_headers("me")).json()
+        counts.append(len(query_counter))
+        seen += page["items"]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert len(seen) == 25 and len({m["id"] for m in seen}) == 25
+    keys = [(m["compatibility_score"], m["id"]) for m in seen]
+    assert keys == sorted(keys, reverse=True)
+    assert "ai_reasoning" not in seen[0]
+    # One range scan per pair direction on every page, plus the active-user
+    # check on the first request only
+    assert counts == [3, 2, 2]
+    assert not any("ai_reasoning" in sql for sql in query_counter)
+
+    full = client.get("/api/match/recommended", params={"view": "full"}, headers=auth_headers("me")).json()
+    assert full["items"][0]["ai_reasoning"] == "long text"
+    detail = client.get(f"/api/match/{seen[-1]['id']}", headers=auth_headers("me")).json()
+    assert detail["ai_reasoning"] == "long text"
+
+    assert client.get("/api/match/recommended", params={"cursor": "nope"}, headers=auth_headers("me")).status_code == 400
+    other_match = db.query(Match).filter(Match.pair_key == "o00:o01").one()
+    assert client.get(f"/api/match/{other_match.id}", headers=auth_headers("me")).status_code == 404
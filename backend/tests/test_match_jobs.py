@@ -0,0 +1,77 @@
+"""Tests for background matchmaking jobs."""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.security import create_access_token
+from app.models.user import User
+from app.schemas.match import MatchOut
+from app.services import job_service
+
+
+@pytest.fixture()
+def fake_run(monkeypatch):
+    release = threading.Event()
+
+    def run_matchmaking(db, user_id, progress):
+        partial = [MatchOut(id="m1", user_a_id=user_id, user_b_id="x", compatibility_score=80.0,
+                            ai_reasoning=None, risks=None, strengths=None, status="pending")]
+        progress("refining", 1, 3, partial)
+        release.wait(5)
+        return partial
+
+    monkeypatch.setattr(job_service, "run_matchmaking", run_matchmaking)
+    monkeypatch.setattr(job_service, "session_factory", MagicMock)
+    monkeypatch.setattr(job_service, "_jobs", {})
+    monkeypatch.setattr(job_service, "_active_by_user", {})
+    yield release
+    release.set()
+
+
+def _wait_for(client, job_id, headers, status):
+    for _ in range(100):
+        body = client.get(f"/api/match/jobs/{job_id}", headers=headers).json()
+        if body["status"] == status:
+            return body
+        time.sleep(0.02)
+    raise AssertionError(f"job never reached {status}: {body}")
+
+
+def test_match_job_reports_progress_and_dedupes(client, db, fake_run):
+    db.add(User(id="u1", email="u1@example.com", hashed_password="x"))
+    db.commit()
+    headers = {"Authorization": f"Bearer {create_access_token('u1')}"}
+
+    first = client.post("/api/match/jobs", headers=headers)
+    assert first.status_code == 202
+    job_id = first.json()["id"]
+    assert client.post("/api/match/jobs", headers=headers).json()["id"] == job_id
+
+    for _ in range(100):
+        body = client.get(f"/api/match/jobs/{job_id}", headers=headers).json()
+        if body["stage"] == "refining":
+            break
+        time.sleep(0.02)
+    assert body["status"] == "running"
+    assert (body["progress_done"], body["progress_total"]) == (1, 3)
+    assert [m["id"] for m in body["results"]] == ["m1"]
+
+    fake_run.set()
+    done = _wait_for(client, job_id, headers, "done")
+    assert len(done["results"]) == 1
+    assert client.post("/api/match/jobs", headers=headers).json()["id"] != job_id
+
+
+def test_match_job_is_private(client, db, fake_run):
+    db.add_all([User(id=uid, email=f"{uid}@example.com", hashed_password="x") for uid in ("u1", "u2")])
+    db.commit()
+    job_id = client.post(
+        "/api/match/jobs", headers={"Authorization": f"Bearer {create_access_token('u1')}"}
+    ).json()["id"]
+    resp = client.get(
+        f"/api/match/jobs/{job_id}", headers={"Authorization": f"Bearer {create_access_token('u2')}"}
+    )
+    assert resp.status_code == 404
@@ -1,9 +1,20 @@
 """Basic tests for the matching service."""
 
+import random
+from types import SimpleNamespace
+
+import numpy as np
 import pytest
 from unittest.mock import MagicMock
 
-from app.services.matching_service import compute_rule_score, passes_hard_filters
+from app.services.feature_service import build_features
+from app.services.matching_service import (
+    CandidatePool,
+    compute_rule_score,
+    passes_hard_filters,
+    score_many,
+    split_for_refinement,
+)
 
 
 def _make_profile(**kwargs):
@@ -53,3 +64,66 @@ def test_rule_score_range():
     b = _make_profile(skill_level=5, weight=80, experience_years=5)
     score = compute_rule_score(a, b, [], [])
     assert 0 <= score <= 100
+
+
+# ── score_many must agree exactly with the scalar path ────────────────────────
+
+_WORDS = ["cardio", "power", "speed", "technique", "fight", "prep", "weight", "loss", "Cardio"]
+_SLOTS = [(d, s, e) for d in range(3) for s, e in (("08:00", "10:00"), ("18:00", "20:00"), ("18:30", "19:30"))]
+
+
+def _random_profile(rng: random.Random):
+    return SimpleNamespace(
+        user_id=str(rng.random()),
+        sport=rng.choice(["boxing", "Boxing", "judo"]),
+        skill_level=rng.randint(1, 10),
+        experience_years=rng.choice([None, *range(0, 15)]),
+        weight=rng.choice([None, round(rng.uniform(50, 110), 1), 70]),
+        goals=rng.choice([None, "", "   ", " ".join(rng.choices(_WORDS, k=rng.randint(1, 4)))]),
+        city=rng.choice([None, "", "paris", "Paris", "lyon"]),
+    )
+
+
+def _random_slot(rng: random.Random):
+    if rng.random() < 0.5:
+        return rng.choice(_SLOTS)
+    start = rng.randint(0, 1380)
+    end = min(start + rng.randint(15, 240), 1439)
+    return rng.randint(0, 6), f"{start // 60:02d}:{start % 60:02d}", f"{end // 60:02d}:{end % 60:02d}"
+
+
+def _random_slots(rng: random.Random):
+    return [
+        SimpleNamespace(day_of_week=d, start_time=s, end_time=e)
+        for d, s, e in (_random_slot(rng) for _ in range(rng.randint(0, 4)))
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_score_many_matches_scalar_path(seed):
+    rng = random.Random(seed)
+    a, a_slots = _random_profile(rng), _random_slots(rng)
+    candidates = [_random_profile(rng) for _ in range(50)]
+    candidate_slots = [_random_slots(rng) for _ in candidates]
+
+    pool = CandidatePool([build_features(b, s) for b, s in zip(candidates, candidate_slots)])
+    passes, scores = score_many(build_features(a, a_slots), pool)
+
+    assert passes.tolist() == [passes_hard_filters(a, b) for b in candidates]
+    expected = [compute_rule_score(a, b, a_slots, s) for b, s in zip(candidates, candidate_slots)]
+    assert np.array_equal(scores, np.array(expected))
+
+
+def test_score_many_empty_pool():
+    passes, scores = score_many(build_features(_make_profile()), CandidatePool([]))
+    assert len(passes) == len(scores) == 0
+
+
+def test_split_for_refinement_takes_top_k_above_threshold():
+    scored = [(MagicMock(name=str(i)), score) for i, score in enumerate([10.0, 90.0, 55.0, 70.0, 30.0])]
+    to_refine, rule_only = split_for_refinement(scored, top_k=2, min_score=50.0)
+    assert [score for _, score in to_refine] == [90.0, 70.0]
+    assert [score for _, score in rule_only] == [10.0, 55.0, 30.0]
+
+    to_refine, _ = split_for_refinement(scored, top_k=10, min_score=60.0)
+    assert [score for _, score in to_refine] == [90.0, 70.0]
@@ -0,0 +1,91 @@
+"""Tests for request timing, Server-Timing headers and the /metrics endpoint."""
+
+import re
+
+import pytest
+
+from app.core.config import settings
+from tests.helpers import auth_headers, make_athlete
+
+
+@pytest.fixture(autouse=True)
+def _no_openai(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+
+
+def _server_timing(header: str) -> dict[str, str]:
+    return {part.split(";")[0].strip(): part for part in header.split(",")}
+
+
+def test_find_reports_component_timings(client, db, query_counter):
+    make_athlete(db, "me")
+    make_athlete(db, "other")
+    query_counter.clear()
+
+    resp = client.post("/api/match/find", headers=auth_headers("me"))
+    assert resp.status_code == 200
+
+    timings = _server_timing(resp.headers["server-timing"])
+    assert {"db", "scoring", "ai", "total"} <= set(timings)
+    # Statements from the threadpool and the event loop are attributed to the request
+    assert f'desc="{len(query_counter)} queries"' in timings["db"]
+    durations = {name: float(re.search(r"dur=([\d.]+)", part).group(1)) for name, part in timings.items()}
+    assert durations["db"] <= durations["total"]
+
+
+def test_async_routes_count_queries_too(client, db, query_counter):
+    make_athlete(db, "me")
+    query_counter.clear()
+    resp = client.get("/api/profiles/me", headers=auth_headers("me"))
+    assert resp.status_code == 200
+    assert f'desc="{len(query_counter)} queries"' in resp.headers["server-timing"]
+
+
+def test_metrics_endpoint_exposes_route_histograms(client, db):
+    make_athlete(db, "me")
+    client.post("/api/match/find", headers=auth_headers("me"))
+    client.get("/api/match/does-not-exist", headers=auth_headers("me"))
+
+    body = client.get("/metrics").text
+    assert re.search(r'arena_http_requests_total\{method="POST",route="/api/match/find",status="200"\} [1-9]', body)
+    # Route templates, not raw paths, keep label cardinality bounded
+    assert 'route="/api/match/{match_id}"' in body
+    assert "does-not-exist" not in body
+    assert 'arena_db_queries_per_request_bucket{le="+Inf",route="/api/match/find"}' in body
+    assert 'arena_ai_fallbacks_total{reason="no_key"}' in body
+    assert 'route="/metrics"' not in body
+
+
+def test_ai_calls_record_latency_tokens_and_fallbacks(monkeypatch):
+    from unittest.mock import MagicMock
+
+    from openai import APIConnectionError
+    from prometheus_client import REGISTRY
+
+    from app.services import ai_service
+
+    def sample(name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0.0
+
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "sk-test")
+    client = MagicMock()
+    client.chat.completions.create.return_value.choices = [MagicMock(message=MagicMock(content="[]"))]
+    client.chat.completions.create.return_value.usage = MagicMock(prompt_tokens=120, completion_tokens=30)
+    monkeypatch.setattr(ai_service, "_get_client", lambda: client)
+
+    before = {
+        "calls": sample("arena_ai_call_duration_seconds_count", kind="batch", outcome="ok"),
+        "prompt": sample("arena_ai_tokens_total", type="prompt"),
+        "malformed": sample("arena_ai_fallbacks_total", reason="malformed"),
+        "error": sample("arena_ai_fallbacks_total", reason="error"),
+    }
+    # An empty array is a valid reply that answers nobody
+    ai_service.refine_batch(MagicMock(), [(MagicMock(user_id="u1"), 50.0), (MagicMock(user_id="u2"), 50.0)])
+    client.chat.completions.create.side_effect = APIConnectionError(request=MagicMock())
+    ai_service.refine_batch(MagicMock(), [(MagicMock(user_id="u1"), 50.0)])
+
+    assert sample("arena_ai_call_duration_seconds_count", kind="batch", outcome="ok") == before["calls"] + 1
+    assert sample("arena_ai_call_duration_seconds_count", kind="batch", outcome="error") >= 1
+    assert sample("arena_ai_tokens_total", type="prompt") == before["prompt"] + 120
+    assert sample("arena_ai_fallbacks_total", reason="malformed") == before["malformed"] + 2
+    assert sample("arena_ai_fallbacks_total", reason="error") == before["error"] + 1
@@ -0,0 +1,78 @@
+"""Tests for opt-in matchmaking profiling and offline replay."""
+
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.core.profiling import PROFILE_HEADER
+from tests.helpers import auth_headers, make_athlete
+
+
+@pytest.fixture(autouse=True)
+def _profiling(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+    monkeypatch.setattr(settings, "PROFILING_ADMIN_TOKEN", "let-me-profile")
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "PROFILING_DIR", str(tmp_path / "profiles"))
+    return tmp_path / "profiles"
+
+
+def _find(client, **headers):
+    resp = client.post("/api/match/find", headers={**auth_headers("me"), **headers})
+    assert resp.status_code == 200
+    return resp
+
+
+def test_admin_header_writes_redacted_profile(client, db, _profiling):
+    make_athlete(db, "me", goals="cardio technique")
+    for i in range(3):
+        make_athlete(db, f"other{i}")
+
+    _find(client)
+    assert not _profiling.exists()
+    _find(client, **{PROFILE_HEADER: "wrong"})
+    assert not _profiling.exists()
+
+    _find(client, **{PROFILE_HEADER: "let-me-profile"})
+    [snapshot_file] = _profiling.glob("*.json")
+    assert snapshot_file.with_suffix(".prof").exists()
+    raw = snapshot_file.read_text()
+    snapshot = json.loads(raw)
+    assert snapshot["reason"] == "header"
+    assert snapshot["pool"] == {"candidates": 3, "eligible": 3, "existing": 3}
+    assert snapshot["athlete"]["goal_count"] == 2
+    assert list(snapshot["stages_ms"]) == ["scoring", "refining", "saving"]
+    assert snapshot["db_queries"] > 0
+    assert any("run_matchmaking" in f["function"] for f in snapshot["top_functions"])
+    # Ids and free text never reach the snapshot
+    assert '"me"' not in raw and "other0" not in raw and "cardio" not in raw
+
+
+def test_sampling_and_rotation(client, db, monkeypatch, _profiling):
+    make_athlete(db, "me")
+    monkeypatch.setattr(settings, "PROFILING_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "PROFILING_MAX_RUNS", 2)
+    for _ in range(4):
+        _find(client)
+    snapshots = sorted(_profiling.glob("*.json"))
+    assert len(snapshots) == 2
+    assert len(list(_profiling.glob("*.prof"))) == 2
+    assert json.loads(snapshots[0].read_text())["reason"] == "sampled"
+
+
+def test_replay_reproduces_pool_shape(client, db, _profiling, tmp_path):
+    from benchmarks.replay import replay
+
+    make_athlete(db, "me")
+    for i in range(5):
+        make_athlete(db, f"other{i}")
+    _find(client, **{PROFILE_HEADER: "let-me-profile"})
+    make_athlete(db, "late")
+    _find(client, **{PROFILE_HEADER: "let-me-profile"})
+    snapshot = json.loads(max(_profiling.glob("*.json")).read_text())
+
+    result = replay(snapshot, llm_latency=0.0, profile_dir=tmp_path / "replays")
+    assert result["replayed"]["pool"] == result["recorded"]["pool"] == {"candidates": 6, "eligible": 6, "existing": 5}
+    assert result["replayed"]["refinement"] == result["recorded"]["refinement"]
+    assert list((tmp_path / "replays").glob("*.prof"))
@@ -0,0 +1,165 @@
+"""Tests for incremental rescoring of pending matches after profile edits."""
+
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.models.match import Match, MatchStatus
+from app.models.profile import Profile
+from app.services import rescore_service
+from app.services.feature_service import refresh_features
+from app.services.matchmaking_service import rescore_user
+from tests.helpers import auth_headers, make_athlete
+
+
+@pytest.fixture(autouse=True)
+def _no_openai(monkeypatch):
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "")
+
+
+def _match(db, other_id: str) -> Match:
+    db.expire_all()
+    return db.query(Match).filter(Match.user_b_id == other_id).one()
+
+
+def _edit(db, user_id: str, **fields) -> None:
+    profile = db.query(Profile).filter(Profile.user_id == user_id).one()
+    for name, value in fields.items():
+        setattr(profile, name, value)
+    refresh_features(db, user_id)
+    db.commit()
+
+
+@pytest.fixture()
+def matched(client, db):
+    make_athlete(db, "me", skill_level=5)
+    make_athlete(db, "rule-only", skill_level=6)
+    make_athlete(db, "refined", skill_level=6)
+    make_athlete(db, "switches-sport", skill_level=5)
+    assert client.post("/api/match/find", headers=auth_headers("me")).status_code == 200
+    refined = _match(db, "refined")
+    refined.ai_refined, refined.compatibility_score, refined.ai_reasoning = True, 91.0, "Great pair."
+    db.commit()
+    return {m.user_b_id: m.rule_score for m in db.query(Match)}
+
+
+def test_rescore_updates_rule_scores_and_keeps_small_ai_moves(db, matched, monkeypatch):
+    monkeypatch.setattr(settings, "RESCORE_AI_DELTA", 50.0)
+    _edit(db, "me", skill_level=4)
+    _edit(db, "switches-sport", sport="judo")
+
+    assert rescore_user(db, "me") == {"rescored": 2, "refined": 0, "filtered": 1}
+
+    rule_only = _match(db, "rule-only")
+    assert rule_only.rule_score != matched["rule-only"]
+    assert rule_only.compatibility_score == rule_only.rule_score
+    refined = _match(db, "refined")
+    assert refined.rule_score != matched["refined"]
+    assert (refined.compatibility_score, refined.ai_refined) == (91.0, True)
+    # Pairs that fail the filters now are kept, rescored and left pending
+    switched = _match(db, "switches-sport")
+    assert switched.status == MatchStatus.pending
+    assert switched.compatibility_score == switched.rule_score != matched["switches-sport"]
+
+
+def test_rescore_refines_again_past_the_delta(db, matched, monkeypatch):
+    monkeypatch.setattr(settings, "RESCORE_AI_DELTA", 0.1)
+    calls = []
+
+    def fake_refine_many(a, scored, db=None, *_):
+        calls.append([b.user_id for b, _ in scored])
+        return [{"compatibility_score": 55, "risks": "r", "strengths": "s", "reasoning": "Less of a fit now."}]
+
+    monkeypatch.setattr("app.services.matchmaking_service.refine_many", fake_refine_many)
+    _edit(db, "me", skill_level=4)
+
+    assert rescore_user(db, "me")["refined"] == 1
+    assert calls == [["refined"]]
+    refined = _match(db, "refined")
+    assert (refined.compatibility_score, refined.ai_reasoning) == (55, "Less of a fit now.")
+
+
+def test_rescore_keeps_the_verbosity_matches_were_refined_with(db, matched, monkeypatch):
+    monkeypatch.setattr(settings, "RESCORE_AI_DELTA", 0.1)
+    monkeypatch.setattr(settings, "AI_BULK_VERBOSITY", "brief")
+    _match(db, "refined").prompt_version = "2-full"
+    db.commit()
+    verbosities = []
+
+    def fake_refine_many(a, scored, db=None, verbosity="full"):
+        verbosities.append(verbosity)
+        return [{"compatibility_score": 55, "risks": "r", "strengths": "s", "reasoning": "Still full."}]
+
+    monkeypatch.setattr("app.services.matchmaking_service.refine_many", fake_refine_many)
+    _edit(db, "me", skill_level=4)
+
+    assert rescore_user(db, "me")["refined"] == 1
+    assert verbosities == ["full"]
+    assert _match(db, "refined").prompt_version == "2-full"
+
+
+def test_missing_rule_score_becomes_the_baseline(db, matched, monkeypatch):
+    monkeypatch.setattr(settings, "RESCORE_AI_DELTA", 0.1)
+    _match(db, "refined").rule_score = None
+    db.commit()
+    monkeypatch.setattr("app.services.matchmaking_service.refine_many", pytest.fail)
+
+    assert rescore_user(db, "me")["refined"] == 0
+    refined = _match(db, "refined")
+    assert refined.rule_score == matched["refined"]
+    assert refined.compatibility_score == 91.0
+
+
+def test_rescore_ignores_answered_matches(db, matched):
+    answered = _match(db, "rule-only")
+    answered.status = MatchStatus.accepted
+    db.commit()
+    _edit(db, "me", skill_level=4)
+    rescore_user(db, "me")
+    assert _match(db, "rule-only").rule_score == matched["rule-only"]
+
+
+def test_edits_mark_user_dirty_and_drain_rescores(client, db, engine, matched, monkeypatch):
+    monkeypatch.setattr(settings, "RESCORE_DEBOUNCE_SECONDS", 60.0)
+    monkeypatch.setattr(rescore_service, "session_factory", sessionmaker(bind=engine))
+
+    assert client.patch("/api/profiles/me", json={"skill_level": 4}, headers=auth_headers("me")).status_code == 200
+    slot = {"day_of_week": 2, "start_time": "07:00", "end_time": "08:00"}
+    assert client.post("/api/availability", json=slot, headers=auth_headers("me")).status_code == 201
+    assert rescore_service.pending() == ["me"]
+    assert _match(db, "rule-only").rule_score == matched["rule-only"]
+
+    assert rescore_service.drain() == 1
+    assert rescore_service.pending() == []
+    assert _match(db, "rule-only").rule_score != matched["rule-only"]
+
+
+def test_worker_rescores_after_debounce(db, engine, matched, monkeypatch):
+    monkeypatch.setattr(settings, "RESCORE_DEBOUNCE_SECONDS", 0.05)
+    monkeypatch.setattr(rescore_service, "session_factory", sessionmaker(bind=engine))
+    _edit(db, "me", skill_level=4)
+
+    rescore_service.mark_dirty("me")
+    deadline = time.monotonic() + 5
+    while _match(db, "rule-only").rule_score == matched["rule-only"]:
+        assert time.monotonic() < deadline, "worker did not rescore"
+        time.sleep(0.02)
+
+
+def test_debounce_waits_for_quiet_but_not_forever(monkeypatch):
+    monkeypatch.setattr(settings, "RESCORE_DEBOUNCE_SECONDS", 5.0)
+    monkeypatch.setattr(settings, "RESCORE_MAX_DELAY_SECONDS", 60.0)
+    monkeypatch.setattr(rescore_service, "_dirty", {"quiet": (0.0, 1.0), "busy": (0.0, 58.0), "new": (10.0, 10.0)})
+
+    assert rescore_service._pop_due(4.0) == ([], 6.0)
+    assert rescore_service._pop_due(6.0) == (["quiet"], 15.0)
+    assert rescore_service._pop_due(15.0) == (["new"], 60.0)
+    assert rescore_service._pop_due(60.0) == (["busy"], None)
+
+
+def test_disabled_rescoring_ignores_edits(monkeypatch):
+    monkeypatch.setattr(settings, "RESCORE_ENABLED", False)
+    rescore_service.mark_dirty("me")
+    assert rescore_service.pending() == []
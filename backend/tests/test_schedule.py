@@ -0,0 +1,46 @@
+"""Tests for the interval-based schedule representation."""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.services.schedule import (
+    merge_intervals,
+    overlap_minutes,
+    parse_hhmm,
+    popcount64,
+    schedule_bitmap,
+    to_intervals,
+)
+
+
+def _slot(day, start, end):
+    return SimpleNamespace(day_of_week=day, start_time=start, end_time=end)
+
+
+def test_parse_hhmm():
+    assert parse_hhmm("00:00") == 0
+    assert parse_hhmm("18:30") == 1110
+    for bad in ("24:00", "12:60", "1230", "12:3", "noon"):
+        with pytest.raises(ValueError):
+            parse_hhmm(bad)
+
+
+def test_partial_overlap_counts_shared_minutes():
+    a = to_intervals([_slot(0, "18:00", "20:00")])
+    b = to_intervals([_slot(0, "18:30", "19:30")])
+    assert overlap_minutes(a, b) == 60
+    assert overlap_minutes(a, to_intervals([_slot(1, "18:00", "20:00")])) == 0
+
+
+def test_merge_intervals_joins_overlapping_and_touching():
+    assert merge_intervals([(60, 120), (0, 30), (30, 45), (100, 200), (300, 300)]) == [(0, 45), (60, 200)]
+
+
+def test_bitmap_popcount_matches_sweep():
+    a = to_intervals([_slot(0, "06:00", "07:15"), _slot(6, "22:00", "23:59")])
+    b = to_intervals([_slot(0, "07:00", "09:00"), _slot(6, "23:00", "23:59")])
+    shared = popcount64(schedule_bitmap(a) & schedule_bitmap(b)).sum()
+    assert shared == overlap_minutes(a, b) == 15 + 59
+    assert popcount64(np.array([2**64 - 1], dtype=np.uint64))[0] == 64
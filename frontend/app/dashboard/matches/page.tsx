@@ -1,21 +1,16 @@
 "use client";
 
 import { useState } from "react";
-import { matchApi } from "@/lib/api";
-import { useAuthStore } from "@/lib/store/auth";
 import { useMatches } from "@/hooks/useArena";
 
 export default function MatchesPage() {
-  const token = useAuthStore((s) => s.accessToken);
-  const { matches, loading, respond, refresh } = useMatches();
+  const { matches, loading, hasMore, loadMore, respond, findMatches, loadDetails } = useMatches();
   const [finding, setFinding] = useState(false);
 
   const handleFindMatches = async () => {
-    if (!token) return;
     setFinding(true);
     try {
-      await matchApi.findMatches(token);
-      await refresh();
+      await findMatches();
     } finally {
       setFinding(false);
     }
@@ -55,9 +50,18 @@ export default function MatchesPage() {
                 match={match}
                 onAccept={() => respond(match.id, "accepted")}
                 onSkip={() => respond(match.id, "rejected")}
+                onOpen={() => loadDetails(match.id)}
               />
             ))}
           </div>
+          {hasMore && (
+            <button
+              onClick={loadMore}
+              className="mt-4 w-full py-2 border border-border rounded-lg text-sm hover:bg-accent transition"
+            >
+              Load more
+            </button>
+          )}
         </section>
       )}
 
@@ -66,7 +70,7 @@ export default function MatchesPage() {
           <h2 className="text-lg font-semibold mb-4">Your Partners</h2>
           <div className="space-y-4">
             {accepted.map((match) => (
-              <MatchCard key={match.id} match={match} accepted />
+              <MatchCard key={match.id} match={match} onOpen={() => loadDetails(match.id)} accepted />
             ))}
           </div>
         </section>
@@ -79,6 +83,7 @@ function MatchCard({
   match,
   onAccept,
   onSkip,
+  onOpen,
   accepted,
 }: {
   match: {
@@ -89,12 +94,32 @@ function MatchCard({
     risks?: string;
     strengths?: string;
     status: string;
+    ai_refined: boolean;
+    prompt_version?: string | null;
   };
   onAccept?: () => void;
   onSkip?: () => void;
+  onOpen?: () => Promise<void>;
   accepted?: boolean;
 }) {
   const [expanded, setExpanded] = useState(false);
+  const [refining, setRefining] = useState(false);
+
+  const toggleDetails = async () => {
+    const opening = !expanded;
+    setExpanded(opening);
+    // Summary items have no analysis fields until the details are loaded
+    const needsDetails =
+      !match.ai_refined || match.ai_reasoning === undefined || !!match.prompt_version?.endsWith("-brief");
+    if (opening && needsDetails && onOpen) {
+      setRefining(true);
+      try {
+        await onOpen();
+      } finally {
+        setRefining(false);
+      }
+    }
+  };
   const score = match.compatibility_score ?? 0;
   const scoreColor =
     score >= 75 ? "text-green-600" : score >= 50 ? "text-yellow-600" : "text-red-500";
@@ -130,7 +155,7 @@ function MatchCard({
       </div>
 
       <button
-        onClick={() => setExpanded((prev) => !prev)}
+        onClick={toggleDetails}
         className="mt-3 text-xs text-muted-foreground hover:text-foreground transition"
       >
         {expanded ? "Hide details ▲" : "Show AI analysis ▼"}
@@ -138,6 +163,7 @@ function MatchCard({
 
       {expanded && (
         <div className="mt-3 space-y-2 text-sm">
+          {refining && <div className="text-muted-foreground">Analyzing match…</div>}
           {match.ai_reasoning && (
             <div>
               <span className="font-medium">Reasoning: </span>
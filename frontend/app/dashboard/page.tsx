@@ -6,7 +6,7 @@ import { useMatches } from "@/hooks/useArena";
 
 export default function DashboardPage() {
   const { profile, loading: profileLoading } = useProfile();
-  const { matches, loading: matchesLoading } = useMatches();
+  const { matches, loading: matchesLoading, hasMore } = useMatches();
 
   const pendingMatches = matches.filter((m) => m.status === "pending");
   const acceptedMatches = matches.filter((m) => m.status === "accepted");
@@ -23,7 +23,7 @@ export default function DashboardPage() {
       <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
         <StatCard
           title="Pending Matches"
-          value={matchesLoading ? "…" : String(pendingMatches.length)}
+          value={matchesLoading ? "…" : `${pendingMatches.length}${hasMore ? "+" : ""}`}
           href="/dashboard/matches"
           color="text-yellow-500"
         />
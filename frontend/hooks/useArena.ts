@@ -24,14 +24,19 @@ export function useProfile() {
 export function useMatches() {
   const token = useAuthStore((s) => s.accessToken);
   const [matches, setMatches] = useState<MatchResult[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
 
+  const replaceMatch = (match: MatchResult) =>
+    setMatches((prev) => prev.map((m) => (m.id === match.id ? { ...m, ...match } : m)));
+
   const fetchMatches = async () => {
     if (!token) return;
     setLoading(true);
     try {
-      const data = await matchApi.recommended(token);
-      setMatches(data);
+      const page = await matchApi.recommended(token);
+      setMatches(page.items);
+      setNextCursor(page.next_cursor);
     } finally {
       setLoading(false);
     }
@@ -39,11 +44,56 @@ export function useMatches() {
 
   useEffect(() => { fetchMatches(); }, [token]);
 
+  const loadMore = async () => {
+    if (!token || !nextCursor) return;
+    const page = await matchApi.recommended(token, nextCursor);
+    setMatches((prev) => [...prev, ...page.items.filter((m) => !prev.some((p) => p.id === m.id))]);
+    setNextCursor(page.next_cursor);
+  };
+
+  // Only the answered match changes, so it is updated in place
   const respond = async (matchId: string, status: "accepted" | "rejected") => {
     if (!token) return;
-    await matchApi.respond(token, matchId, status);
-    await fetchMatches();
+    replaceMatch(await matchApi.respond(token, matchId, status));
   };
 
-  return { matches, loading, respond, refresh: fetchMatches };
+  // Runs matchmaking and merges each streamed match into the list as it arrives
+  const findMatches = async () => {
+    if (!token) return;
+    await matchApi.streamMatches(token, (match) => {
+      setMatches((prev) => {
+        const next = prev.some((m) => m.id === match.id)
+          ? prev.map((m) => (m.id === match.id ? match : m))
+          : [...prev, match];
+        return next.sort((x, y) => (y.compatibility_score ?? 0) - (x.compatibility_score ?? 0));
+      });
+    });
+  };
+
+  // Rule-only matches get their AI analysis on demand
+  const refine = async (matchId: string) => {
+    if (!token) return;
+    replaceMatch(await matchApi.refine(token, matchId));
+  };
+
+  // List pages leave out the analysis text; fetch it (refining first if needed) when a card is opened.
+  // Bulk matching stores brief tags only, so those are refined into the full analysis too.
+  const loadDetails = async (matchId: string) => {
+    if (!token) return;
+    const match = matches.find((m) => m.id === matchId);
+    if (match && (!match.ai_refined || match.prompt_version?.endsWith("-brief"))) return refine(matchId);
+    replaceMatch(await matchApi.get(token, matchId));
+  };
+
+  return {
+    matches,
+    loading,
+    hasMore: nextCursor !== null,
+    loadMore,
+    respond,
+    refresh: fetchMatches,
+    findMatches,
+    refine,
+    loadDetails,
+  };
 }
@@ -22,6 +22,45 @@ async function request<T>(path: string, options: RequestOptions = {}): Promise<T
   return resp.json() as Promise<T>;
 }
 
+// Reads a text/event-stream response body and calls onEvent for each event.
+async function streamEvents(
+  path: string,
+  token: string,
+  onEvent: (event: string, data: unknown) => void
+): Promise<void> {
+  const resp = await fetch(`${BASE_URL}${path}`, {
+    method: "POST",
+    headers: { Authorization: `Bearer ${token}`, Accept: "text/event-stream" },
+  });
+
+  if (!resp.ok || !resp.body) {
+    const error = await resp.json().catch(() => ({ detail: resp.statusText }));
+    throw new Error(error.detail ?? "Request failed");
+  }
+
+  const reader = resp.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary: number;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const raw = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = "message";
+      let data = "";
+      for (const line of raw.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      onEvent(event, data ? JSON.parse(data) : null);
+    }
+  }
+}
+
 // ── Auth ──────────────────────────────────────────────────────────────────────
 export const authApi = {
   register: (email: string, password: string) =>
@@ -55,7 +94,17 @@ export const profileApi = {
 // ── Match ─────────────────────────────────────────────────────────────────────
 export const matchApi = {
   findMatches: (token: string) => request<MatchResult[]>("/match/find", { method: "POST", token }),
-  recommended: (token: string) => request<MatchResult[]>("/match/recommended", { token }),
+  // Rule-scored matches arrive as "match" events, AI refinements as "update" events
+  streamMatches: (token: string, onMatch: (match: MatchResult, refined: boolean) => void) =>
+    streamEvents("/match/find/stream", token, (event, data) => {
+      if (event === "match" || event === "update") onMatch(data as MatchResult, event === "update");
+    }),
+  // One page of pending matches without AI analysis text; pass next_cursor for the next page
+  recommended: (token: string, cursor?: string | null) =>
+    request<MatchPage>(`/match/recommended${cursor ? `?cursor=${encodeURIComponent(cursor)}` : ""}`, { token }),
+  get: (token: string, matchId: string) => request<MatchResult>(`/match/${matchId}`, { token }),
+  refine: (token: string, matchId: string) =>
+    request<MatchResult>(`/match/${matchId}/refine`, { method: "POST", token }),
   respond: (token: string, matchId: string, status: "accepted" | "rejected") =>
     request<MatchResult>(`/match/${matchId}`, {
       method: "PATCH",
@@ -98,6 +147,13 @@ export interface MatchResult {
   risks?: string;
   strengths?: string;
   status: "pending" | "accepted" | "rejected";
+  ai_refined: boolean;
+  prompt_version?: string | null;
+}
+
+export interface MatchPage {
+  items: MatchResult[];
+  next_cursor: string | null;
 }
 
 export interface Availability {